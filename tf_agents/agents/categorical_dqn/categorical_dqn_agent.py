@@ -257,7 +257,10 @@ class CategoricalDqnAgent(dqn_agent.DqnAgent):
       td_errors_loss_fn: A function(td_targets, predictions) to compute loss.
       gamma: Discount for future rewards.
       reward_scale_factor: Multiplicative factor to scale rewards.
-      weights: Optional weights used for importance sampling.
+      weights: Optional scalar or elementwise (per-batch-entry) importance
+        weights, e.g. the `importance_weights` returned by a
+        `TFPrioritizedReplayBuffer`. The per-example critic loss is scaled by
+        these weights.
       training: Whether the loss is being used for training.
     Returns:
       critic_loss: A scalar critic loss.
@@ -413,6 +416,7 @@ class CategoricalDqnAgent(dqn_agent.DqnAgent):
 
       agg_loss = common.aggregate_losses(
           per_example_loss=critic_loss,
+          sample_weight=weights,
           regularization_loss=self._q_network.losses)
       total_loss = agg_loss.total_loss
 
@@ -447,10 +451,15 @@ class CategoricalDqnAgent(dqn_agent.DqnAgent):
               'target_distribution', target_distribution,
               step=self.train_step_counter)
 
-      # TODO(b/127318640): Give appropriate values for td_loss and td_error for
-      # prioritized replay.
-      return tf_agent.LossInfo(total_loss, dqn_agent.DqnLossInfo(td_loss=(),
-                                                                 td_error=()))
+      # The td_error is the difference between the expected values of the
+      # target and predicted distributions. The per-example cross-entropy loss
+      # is the usual priority for prioritized replay with distributional RL.
+      td_error = (
+          tf.reduce_sum(target_distribution * self._support, axis=-1) -
+          tf.reduce_sum(tf.nn.softmax(chosen_action_logits) * self._support,
+                        axis=-1))
+      return tf_agent.LossInfo(total_loss, dqn_agent.DqnLossInfo(
+          td_loss=critic_loss, td_error=td_error))
 
   def _next_q_distribution(self, next_time_steps):
     """Compute the q distribution of the next state for TD error computation.
@@ -495,6 +504,73 @@ def project_distribution(supports, weights, target_support,
 
   Based on equation (7) in (Bellemare et al., 2017):
     https://arxiv.org/abs/1707.06887
+
+  Each clipped support point lies between two consecutive atoms of
+  target_support, `z_l <= x < z_{l+1}`, and Eq7 splits its weight between them
+  proportionally to its distance to the other one. Instead of evaluating Eq7
+  for every (target atom, support point) pair, which takes
+  O(batch_size * num_dims**2) time and memory, this computes `l` for each
+  support point and sums the two shares of its weight into the projection with
+  `tf.math.unsorted_segment_sum`, in O(batch_size * num_dims).
+
+  See `project_distribution_reference` for a direct evaluation of Eq7, with a
+  worked example.
+
+  Args:
+    supports: Tensor of shape (batch_size, num_dims) defining supports for the
+      distribution.
+    weights: Tensor of shape (batch_size, num_dims) defining weights on the
+      original support points. Although for the CategoricalDQN agent these
+      weights are probabilities, it is not required that they are.
+    target_support: Tensor of shape (num_dims) defining support of the projected
+      distribution. The values must be monotonically increasing. Vmin and Vmax
+      will be inferred from the first and last elements of this tensor,
+      respectively. The values in this tensor must be equally spaced.
+    validate_args: Whether we will verify the contents of the
+      target_support parameter.
+
+  Returns:
+    A Tensor of shape (batch_size, num_dims) with the projection of a batch of
+    (support, weights) onto target_support.
+
+  Raises:
+    ValueError: If target_support has no dimensions, or if shapes of supports,
+      weights, and target_support are incompatible.
+  """
+  delta_z, validate_deps = _check_projection_args(
+      supports, weights, target_support, validate_args)
+  with tf.control_dependencies(validate_deps):
+    v_min, v_max = target_support[0], target_support[-1]
+    batch_size = tf.shape(supports)[0]
+    num_dims = tf.shape(target_support)[0]
+    clipped_support = tf.clip_by_value(supports, v_min, v_max)
+    # Position of each support point in units of atoms, in [0, num_dims - 1].
+    position = (clipped_support - v_min) / delta_z
+    lower = tf.clip_by_value(
+        tf.cast(tf.floor(position), tf.int32), 0, num_dims - 1)
+    upper = tf.minimum(lower + 1, num_dims - 1)
+    # Eq7 gives `1 - |x - z_l| / delta_z` of the weight to z_l and the rest to
+    # z_{l+1}. When x == v_max, lower == upper and the upper share is 0.
+    upper_share = tf.clip_by_value(
+        position - tf.cast(lower, position.dtype), 0, 1)
+    upper_weights = weights * upper_share
+    lower_weights = weights - upper_weights
+    row_offsets = (tf.range(batch_size) * num_dims)[:, None]
+    projection = tf.math.unsorted_segment_sum(
+        tf.concat([lower_weights, upper_weights], axis=1),
+        tf.concat([lower + row_offsets, upper + row_offsets], axis=1),
+        num_segments=batch_size * num_dims)
+    return tf.reshape(projection, [batch_size, num_dims])
+
+
+def project_distribution_reference(supports, weights, target_support,
+                                   validate_args=False):
+  """Projects a batch of (support, weights) onto target_support.
+
+  Reference implementation of `project_distribution`, which evaluates equation
+  (7) in (Bellemare et al., 2017) for all (target atom, support point) pairs,
+  using O(batch_size * num_dims**2) time and memory:
+    https://arxiv.org/abs/1707.06887
   In the rest of the comments we will refer to this equation simply as Eq7.
 
   This code is not easy to digest, so we will use a running example to clarify
@@ -530,38 +606,8 @@ def project_distribution(supports, weights, target_support,
     ValueError: If target_support has no dimensions, or if shapes of supports,
       weights, and target_support are incompatible.
   """
-  target_support_deltas = target_support[1:] - target_support[:-1]
-  # delta_z = `\Delta z` in Eq7.
-  delta_z = target_support_deltas[0]
-  validate_deps = []
-  supports.shape.assert_is_compatible_with(weights.shape)
-  supports[0].shape.assert_is_compatible_with(target_support.shape)
-  target_support.shape.assert_has_rank(1)
-  if validate_args:
-    # Assert that supports and weights have the same shapes.
-    validate_deps.append(
-        tf.Assert(
-            tf.reduce_all(tf.equal(tf.shape(supports), tf.shape(weights))),
-            [supports, weights]))
-    # Assert that elements of supports and target_support have the same shape.
-    validate_deps.append(
-        tf.Assert(
-            tf.reduce_all(
-                tf.equal(tf.shape(supports)[1], tf.shape(target_support))),
-            [supports, target_support]))
-    # Assert that target_support has a single dimension.
-    validate_deps.append(
-        tf.Assert(
-            tf.equal(tf.size(tf.shape(target_support)), 1), [target_support]))
-    # Assert that the target_support is monotonically increasing.
-    validate_deps.append(
-        tf.Assert(tf.reduce_all(target_support_deltas > 0), [target_support]))
-    # Assert that the values in target_support are equally spaced.
-    validate_deps.append(
-        tf.Assert(
-            tf.reduce_all(tf.equal(target_support_deltas, delta_z)),
-            [target_support]))
-
+  delta_z, validate_deps = _check_projection_args(
+      supports, weights, target_support, validate_args)
   with tf.control_dependencies(validate_deps):
     # Ex: `v_min, v_max = 4, 8`.
     v_min, v_max = target_support[0], target_support[-1]
@@ -644,3 +690,57 @@ def project_distribution(supports, weights, target_support,
     projection = tf.reduce_sum(inner_prod, 3)
     projection = tf.reshape(projection, [batch_size, num_dims])
     return projection
+
+
+def _check_projection_args(supports, weights, target_support,
+                           validate_args):
+  """Checks the arguments of `project_distribution`.
+
+  Args:
+    supports: See `project_distribution`.
+    weights: See `project_distribution`.
+    target_support: See `project_distribution`.
+    validate_args: Whether to also return runtime assertions on the contents of
+      target_support.
+
+  Returns:
+    A tuple `(delta_z, validate_deps)` with the spacing of target_support and
+    a list of assertion ops to run before the projection.
+
+  Raises:
+    ValueError: If target_support has no dimensions, or if shapes of supports,
+      weights, and target_support are incompatible.
+  """
+  target_support_deltas = target_support[1:] - target_support[:-1]
+  # delta_z = `\Delta z` in Eq7.
+  delta_z = target_support_deltas[0]
+  validate_deps = []
+  supports.shape.assert_is_compatible_with(weights.shape)
+  supports[0].shape.assert_is_compatible_with(target_support.shape)
+  target_support.shape.assert_has_rank(1)
+  if validate_args:
+    # Assert that supports and weights have the same shapes.
+    validate_deps.append(
+        tf.Assert(
+            tf.reduce_all(tf.equal(tf.shape(supports), tf.shape(weights))),
+            [supports, weights]))
+    # Assert that elements of supports and target_support have the same shape.
+    validate_deps.append(
+        tf.Assert(
+            tf.reduce_all(
+                tf.equal(tf.shape(supports)[1], tf.shape(target_support))),
+            [supports, target_support]))
+    # Assert that target_support has a single dimension.
+    validate_deps.append(
+        tf.Assert(
+            tf.equal(tf.size(tf.shape(target_support)), 1), [target_support]))
+    # Assert that the target_support is monotonically increasing.
+    validate_deps.append(
+        tf.Assert(tf.reduce_all(target_support_deltas > 0), [target_support]))
+    # Assert that the values in target_support are equally spaced.
+    validate_deps.append(
+        tf.Assert(
+            tf.reduce_all(tf.equal(target_support_deltas, delta_z)),
+            [target_support]))
+
+  return delta_z, validate_deps
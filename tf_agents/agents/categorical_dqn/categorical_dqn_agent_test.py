@@ -19,6 +19,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+from absl.testing import parameterized
 import numpy as np
 import tensorflow as tf  # pylint: disable=g-explicit-tensorflow-version-import
 from tf_agents.agents.categorical_dqn import categorical_dqn_agent
@@ -253,6 +254,37 @@ class CategoricalDqnAgentTest(tf.test.TestCase):
     evaluated_loss = self.evaluate(loss_info).loss
     self.assertAllClose(evaluated_loss, expected_loss, atol=1e-4)
 
+  def testCriticLossWithWeights(self):
+    agent = categorical_dqn_agent.CategoricalDqnAgent(
+        self._time_step_spec,
+        self._action_spec,
+        self._dummy_categorical_net,
+        self._optimizer)
+
+    observations = tf.constant([[1, 2], [3, 4]], dtype=tf.float32)
+    time_steps = ts.restart(observations, batch_size=2)
+    actions = tf.constant([0, 1], dtype=tf.int32)
+    action_steps = policy_step.PolicyStep(actions)
+    rewards = tf.constant([10, 20], dtype=tf.float32)
+    discounts = tf.constant([0.9, 0.9], dtype=tf.float32)
+    next_observations = tf.constant([[5, 6], [7, 8]], dtype=tf.float32)
+    next_time_steps = ts.transition(next_observations, rewards, discounts)
+    experience = test_utils.stacked_trajectory_from_transition(
+        time_steps, action_steps, next_time_steps)
+
+    loss_info = agent._loss(experience)
+    weighted_loss_info = agent._loss(
+        experience, weights=tf.constant([0.5, 0.], dtype=tf.float32))
+
+    self.evaluate(tf.compat.v1.global_variables_initializer())
+    loss_info, weighted_loss_info = self.evaluate(
+        (loss_info, weighted_loss_info))
+    td_loss = loss_info.extra.td_loss
+    self.assertEqual((2,), td_loss.shape)
+    self.assertEqual((2,), loss_info.extra.td_error.shape)
+    self.assertAllClose(np.mean(td_loss), loss_info.loss)
+    self.assertAllClose(0.25 * td_loss[0], weighted_loss_info.loss)
+
   def testCriticLossWithMaskedActions(self):
     # Observations are now a tuple of the usual observation and an action mask.
     observation_spec_with_mask = (
@@ -505,5 +537,50 @@ class CategoricalDqnAgentTest(tf.test.TestCase):
     self.evaluate(loss)
 
 
+
+class ProjectDistributionTest(tf.test.TestCase, parameterized.TestCase):
+
+  def testProjectDistribution(self):
+    # The example in the docstring of project_distribution_reference.
+    supports = tf.constant([[0, 2, 4, 6, 8], [1, 3, 4, 5, 6]], tf.float32)
+    weights = tf.constant([[0.1, 0.6, 0.1, 0.1, 0.1],
+                           [0.1, 0.2, 0.5, 0.1, 0.1]])
+    target_support = tf.constant([4, 5, 6, 7, 8], tf.float32)
+    projection = categorical_dqn_agent.project_distribution(
+        supports, weights, target_support, validate_args=True)
+    self.assertAllClose([[0.8, 0.0, 0.1, 0.0, 0.1],
+                         [0.8, 0.1, 0.1, 0.0, 0.0]],
+                        self.evaluate(projection))
+
+  @parameterized.parameters(2, 5, 51, 201)
+  def testMatchesReference(self, num_atoms):
+    batch_size = 16
+    target_support = tf.linspace(-3.0, 7.0, num_atoms)
+    # Shifted and scaled supports, partly outside [v_min, v_max], plus the
+    # target support itself to hit atoms exactly.
+    rewards = tf.random.uniform([batch_size, 1], -4.0, 4.0, seed=1)
+    discounts = tf.random.uniform([batch_size, 1], 0.0, 1.0, seed=2)
+    supports = tf.concat(
+        [rewards + discounts * target_support[None, :],
+         target_support[None, :]], axis=0)
+    weights = tf.nn.softmax(
+        tf.random.normal([batch_size + 1, num_atoms], seed=3))
+    projection = categorical_dqn_agent.project_distribution(
+        supports, weights, target_support)
+    expected = categorical_dqn_agent.project_distribution_reference(
+        supports, weights, target_support)
+    projection_, expected_ = self.evaluate((projection, expected))
+    self.assertAllClose(expected_, projection_, atol=1e-4)
+    self.assertAllClose(np.ones(batch_size + 1), projection_.sum(axis=1))
+
+  def testValidateArgs(self):
+    supports = tf.constant([[0, 1, 2]], tf.float32)
+    weights = tf.constant([[0.2, 0.3, 0.5]])
+    target_support = tf.constant([0, 1, 3], tf.float32)
+    with self.assertRaises(tf.errors.InvalidArgumentError):
+      self.evaluate(categorical_dqn_agent.project_distribution(
+          supports, weights, target_support, validate_args=True))
+
+
 if __name__ == '__main__':
   tf.test.main()
@@ -64,6 +64,7 @@ from tf_agents.networks import q_network
 from tf_agents.networks import q_rnn_network
 from tf_agents.policies import random_tf_policy
 from tf_agents.replay_buffers import tf_uniform_replay_buffer
+from tf_agents.utils import actor_learner
 from tf_agents.utils import common
 
 flags.DEFINE_string('root_dir', os.getenv('TEST_UNDECLARED_OUTPUTS_DIR'),
@@ -94,6 +95,8 @@ def train_eval(
     collect_steps_per_iteration=1,
     epsilon_greedy=0.1,
     replay_buffer_capacity=100000,
+    concurrent_collect=False,
+    samples_per_insert=None,
     # Params for target update
     target_update_tau=0.05,
     target_update_period=5,
@@ -120,7 +123,13 @@ def train_eval(
     debug_summaries=False,
     summarize_grads_and_vars=False,
     eval_metrics_callback=None):
-  """A simple train and eval for DQN."""
+  """A simple train and eval for DQN.
+
+  If `concurrent_collect` is True, collection runs in a background thread with
+  an `actor_learner.ActorLearnerRunner` instead of alternating with training.
+  `samples_per_insert` then sets the ratio of sampled to collected steps; it
+  defaults to the ratio of the sequential loop.
+  """
   root_dir = os.path.expanduser(root_dir)
   train_dir = os.path.join(root_dir, 'train')
   eval_dir = os.path.join(root_dir, 'eval')
@@ -269,12 +278,41 @@ def train_eval(
     if use_tf_functions:
       train_step = common.function(train_step)
 
+    runner = None
+    if concurrent_collect:
+      if samples_per_insert is None:
+        samples_per_insert = (
+            train_steps_per_iteration * batch_size / collect_steps_per_iteration)
+      collect_state = {'time_step': time_step, 'policy_state': policy_state}
+
+      def collect():
+        collect_state['time_step'], collect_state['policy_state'] = (
+            collect_driver.run(
+                time_step=collect_state['time_step'],
+                policy_state=collect_state['policy_state'],
+            ))
+
+      # The collect policy shares its variables with the agent, so the actor
+      # always sees the latest weights and needs no `update_actor_fn`.
+      runner = actor_learner.ActorLearnerRunner(
+          collect_fn=collect,
+          train_fn=train_step,
+          rate_limiter=actor_learner.SamplesPerInsertRateLimiter(
+              samples_per_insert,
+              error_buffer=max(batch_size,
+                               samples_per_insert * collect_steps_per_iteration)),
+          inserts_per_collect=collect_steps_per_iteration,
+          samples_per_train=batch_size)
+      runner.start()
+      train_step = runner.train_step
+
     for _ in range(num_iterations):
       start_time = time.time()
-      time_step, policy_state = collect_driver.run(
-          time_step=time_step,
-          policy_state=policy_state,
-      )
+      if runner is None:
+        time_step, policy_state = collect_driver.run(
+            time_step=time_step,
+            policy_state=policy_state,
+        )
       for _ in range(train_steps_per_iteration):
         train_loss = train_step()
       time_acc += time.time() - start_time
@@ -315,6 +353,9 @@ def train_eval(
         if eval_metrics_callback is not None:
           eval_metrics_callback(results, global_step.numpy())
         metric_utils.log_metrics(eval_metrics)
+
+    if runner is not None:
+      runner.stop()
     return train_loss
 
 
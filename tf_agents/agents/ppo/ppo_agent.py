@@ -135,7 +135,10 @@ class PPOAgent(tf_agent.TFAgent):
                debug_summaries=False,
                summarize_grads_and_vars=False,
                train_step_counter=None,
-               name=None):
+               name=None,
+               use_associative_scan=False,
+               num_minibatches=None,
+               minibatch_size=None):
     """Creates a PPO Agent.
 
     Args:
@@ -228,16 +231,41 @@ class PPOAgent(tf_agent.TFAgent):
         op is run.  Defaults to the global_step.
       name: The name of this agent. All variables in this module will fall under
         that name. Defaults to the class name.
+      use_associative_scan: If True, returns and advantages are computed with
+        a parallel prefix scan taking O(log(T)) sequential steps instead of a
+        `tf.scan` taking T steps. See `value_ops.discounted_return`.
+      num_minibatches: If set, each epoch shuffles the experience and splits it
+        into `num_minibatches` minibatches, with one gradient update per
+        minibatch, instead of doing a single full-batch update. With
+        feed-forward networks the timesteps of all the trajectories are
+        shuffled individually; with recurrent networks whole trajectories are
+        shuffled, to preserve the sequences. Returns and advantages are
+        computed once, before the first epoch. Must not exceed the number of
+        timesteps (feed-forward networks) or trajectories (recurrent networks)
+        in the experience.
+      minibatch_size: Alternative to `num_minibatches`: the maximum number of
+        timesteps (feed-forward networks) or trajectories (recurrent networks)
+        per minibatch. The batch and time dimensions of the experience must
+        then be statically known.
 
     Raises:
       ValueError: If the actor_net is not a DistributionNetwork or value_net is
         not a Network..
+      ValueError: If both num_minibatches and minibatch_size are set, or one of
+        them is not positive.
     """
     if not isinstance(actor_net, network.DistributionNetwork):
       raise ValueError(
           'actor_net must be an instance of a network.DistributionNetwork.')
     if not isinstance(value_net, network.Network):
       raise ValueError('value_net must be an instance of a network.Network.')
+    if num_minibatches is not None and minibatch_size is not None:
+      raise ValueError(
+          'Only one of num_minibatches and minibatch_size can be set.')
+    if (num_minibatches or 1) < 1 or (minibatch_size or 1) < 1:
+      raise ValueError(
+          'num_minibatches and minibatch_size must be positive, got {} and '
+          '{}.'.format(num_minibatches, minibatch_size))
     actor_net.create_variables()
     value_net.create_variables()
 
@@ -255,6 +283,8 @@ class PPOAgent(tf_agent.TFAgent):
     self._shared_vars_l2_reg = shared_vars_l2_reg
     self._value_pred_loss_coef = value_pred_loss_coef
     self._num_epochs = num_epochs
+    self._num_minibatches = num_minibatches
+    self._minibatch_size = minibatch_size
     self._use_gae = use_gae
     self._use_td_lambda_return = use_td_lambda_return
     self._reward_norm_clipping = reward_norm_clipping
@@ -265,6 +295,7 @@ class PPOAgent(tf_agent.TFAgent):
     self._adaptive_kl_tolerance = adaptive_kl_tolerance
     self._gradient_clipping = gradient_clipping or 0.0
     self._check_numerics = check_numerics
+    self._use_associative_scan = use_associative_scan
 
     if initial_adaptive_kl_beta > 0.0:
       # TODO(kbanoop): Rename create_variable.
@@ -355,7 +386,8 @@ class PPOAgent(tf_agent.TFAgent):
           rewards=rewards,
           discounts=discounts,
           td_lambda=self._lambda,
-          time_major=False)
+          time_major=False,
+          use_associative_scan=self._use_associative_scan)
 
     return advantages
 
@@ -513,7 +545,8 @@ class PPOAgent(tf_agent.TFAgent):
         rewards,
         discounts,
         time_major=False,
-        final_value=final_value_bootstrapped)
+        final_value=final_value_bootstrapped,
+        use_associative_scan=self._use_associative_scan)
     if self._debug_summaries:
       tf.compat.v2.summary.histogram(
           name='returns', data=returns, step=self.train_step_counter)
@@ -541,6 +574,69 @@ class PPOAgent(tf_agent.TFAgent):
 
     return returns, normalized_advantages
 
+  def _prepare_minibatch_data(self, train_data):
+    """Reshapes the training data for minibatching, if enabled.
+
+    Args:
+      train_data: A tuple of the arguments of `get_epoch_loss` preceding
+        `train_step`, all nests of `[batch_size, time, ...]` Tensors.
+
+    Returns:
+      A tuple `(num_minibatches, minibatch_data)`, or `(None, None)` if
+      minibatching is disabled. With feed-forward networks `minibatch_data` has
+      every timestep as a sequence of length one, `[batch_size * time, 1, ...]`;
+      with recurrent networks it is `train_data`.
+
+    Raises:
+      ValueError: If `minibatch_size` is set but the number of items to split
+        is not statically known, or if `num_minibatches` exceeds the statically
+        known number of items.
+    """
+    if self._num_minibatches is None and self._minibatch_size is None:
+      return None, None
+    outer_shape = tf.nest.flatten(train_data)[0].shape[:2]
+    if self._actor_net.state_spec or self._value_net.state_spec:
+      minibatch_data = train_data
+      num_items = tf.compat.dimension_value(outer_shape[0])
+    else:
+      def _flatten_time(t):
+        flat_t = tf.reshape(
+            t, tf.concat([[-1, 1], tf.shape(t)[2:]], axis=0))
+        flat_t.set_shape(
+            tf.TensorShape([None, 1]).concatenate(t.shape[2:]))
+        return flat_t
+      minibatch_data = tf.nest.map_structure(_flatten_time, train_data)
+      num_items = outer_shape.num_elements()
+    if self._num_minibatches is not None:
+      if num_items is not None and self._num_minibatches > num_items:
+        raise ValueError(
+            'num_minibatches ({}) exceeds the number of items to split ({}), '
+            'which would leave some minibatches empty.'.format(
+                self._num_minibatches, num_items))
+      return self._num_minibatches, minibatch_data
+    if num_items is None:
+      raise ValueError(
+          'minibatch_size requires statically known experience shapes, saw '
+          'outer shape {}. Use num_minibatches instead.'.format(outer_shape))
+    return -(-num_items // self._minibatch_size), minibatch_data
+
+  def _split_minibatches(self, minibatch_data, num_minibatches):
+    """Shuffles the outer dimension of `minibatch_data` into minibatches."""
+    num_items = tf.shape(tf.nest.flatten(minibatch_data)[0])[0]
+    # An empty minibatch would make the losses NaN.
+    assert_enough_items = tf.debugging.assert_greater_equal(
+        num_items, num_minibatches,
+        message='num_minibatches exceeds the number of items to split.')
+    with tf.control_dependencies([assert_enough_items]):
+      permutation = tf.random.shuffle(tf.range(num_items))
+    minibatches = []
+    for i in range(num_minibatches):
+      indices = permutation[i * num_items // num_minibatches:
+                            (i + 1) * num_items // num_minibatches]
+      minibatches.append(tf.nest.map_structure(
+          lambda t: tf.gather(t, indices), minibatch_data))  # pylint: disable=cell-var-from-loop
+    return minibatches
+
   def _train(self, experience, weights):
     # Get individual tensors from transitions.
     (time_steps, policy_steps_,
@@ -603,52 +699,62 @@ class PPOAgent(tf_agent.TFAgent):
     variables_to_train = list(
         object_identity.ObjectIdentitySet(self._actor_net.trainable_weights +
                                           self._value_net.trainable_weights))
+    train_data = (time_steps, actions, act_log_probs, returns,
+                  normalized_advantages, action_distribution_parameters,
+                  tf.broadcast_to(weights, tf.shape(valid_mask)))
+    num_minibatches, minibatch_data = self._prepare_minibatch_data(train_data)
+
     # For each epoch, create its own train op that depends on the previous one.
     for i_epoch in range(self._num_epochs):
-      with tf.name_scope('epoch_%d' % i_epoch):
-        # Only save debug summaries for first and last epochs.
-        debug_summaries = (
-            self._debug_summaries and
-            (i_epoch == 0 or i_epoch == self._num_epochs - 1))
-
-        # Build one epoch train op.
-        with tf.GradientTape() as tape:
-          loss_info = self.get_epoch_loss(
-              time_steps,
-              actions,
-              act_log_probs,
-              returns,
-              normalized_advantages,
-              action_distribution_parameters,
-              weights,
-              self.train_step_counter,
-              debug_summaries,
-              training=True)
-
-        grads = tape.gradient(loss_info.loss, variables_to_train)
-        # Tuple is used for py3, where zip is a generator producing values once.
-        grads_and_vars = tuple(zip(grads, variables_to_train))
-        if self._gradient_clipping > 0:
-          grads_and_vars = eager_utils.clip_gradient_norms(
-              grads_and_vars, self._gradient_clipping)
-
-        # If summarize_gradients, create functions for summarizing both
-        # gradients and variables.
-        if self._summarize_grads_and_vars and debug_summaries:
-          eager_utils.add_gradients_summaries(grads_and_vars,
-                                              self.train_step_counter)
-          eager_utils.add_variables_summaries(grads_and_vars,
-                                              self.train_step_counter)
-
-        self._optimizer.apply_gradients(
-            grads_and_vars, global_step=self.train_step_counter)
-
-        policy_gradient_losses.append(loss_info.extra.policy_gradient_loss)
-        value_estimation_losses.append(loss_info.extra.value_estimation_loss)
-        l2_regularization_losses.append(loss_info.extra.l2_regularization_loss)
-        entropy_regularization_losses.append(
-            loss_info.extra.entropy_regularization_loss)
-        kl_penalty_losses.append(loss_info.extra.kl_penalty_loss)
+      if num_minibatches is None:
+        minibatches = [train_data]
+      else:
+        minibatches = self._split_minibatches(minibatch_data, num_minibatches)
+      for i_minibatch, minibatch in enumerate(minibatches):
+        scope = 'epoch_%d' % i_epoch
+        if num_minibatches is not None:
+          scope += '_minibatch_%d' % i_minibatch
+        with tf.name_scope(scope):
+          # Only save debug summaries for first and last epochs.
+          debug_summaries = (
+              self._debug_summaries and i_minibatch == 0 and
+              (i_epoch == 0 or i_epoch == self._num_epochs - 1))
+
+          # Build one minibatch train op.
+          with tf.GradientTape() as tape:
+            loss_info = self.get_epoch_loss(
+                *minibatch,
+                train_step=self.train_step_counter,
+                debug_summaries=debug_summaries,
+                training=True)
+
+          grads = tape.gradient(loss_info.loss, variables_to_train)
+          # Tuple is used for py3, where zip is a generator producing values
+          # once.
+          grads_and_vars = tuple(zip(grads, variables_to_train))
+          if self._gradient_clipping > 0:
+            grads_and_vars = eager_utils.clip_gradient_norms(
+                grads_and_vars, self._gradient_clipping)
+
+          # If summarize_gradients, create functions for summarizing both
+          # gradients and variables.
+          if self._summarize_grads_and_vars and debug_summaries:
+            eager_utils.add_gradients_summaries(grads_and_vars,
+                                                self.train_step_counter)
+            eager_utils.add_variables_summaries(grads_and_vars,
+                                                self.train_step_counter)
+
+          self._optimizer.apply_gradients(
+              grads_and_vars, global_step=self.train_step_counter)
+
+          policy_gradient_losses.append(loss_info.extra.policy_gradient_loss)
+          value_estimation_losses.append(
+              loss_info.extra.value_estimation_loss)
+          l2_regularization_losses.append(
+              loss_info.extra.l2_regularization_loss)
+          entropy_regularization_losses.append(
+              loss_info.extra.entropy_regularization_loss)
+          kl_penalty_losses.append(loss_info.extra.kl_penalty_loss)
 
     # After update epochs, update adaptive kl beta, then update observation
     #   normalizer and reward normalizer.
@@ -672,19 +778,20 @@ class PPOAgent(tf_agent.TFAgent):
 
     loss_info = tf.nest.map_structure(tf.identity, loss_info)
 
-    # Make summaries for total loss averaged across all epochs.
+    # Make summaries for total loss averaged across all updates.
     # The *_losses lists will have been populated by
     #   calls to self.get_epoch_loss. Assumes all the losses have same length.
     with tf.name_scope('Losses/'):
-      num_epochs = len(policy_gradient_losses)
-      total_policy_gradient_loss = tf.add_n(policy_gradient_losses) / num_epochs
+      num_updates = len(policy_gradient_losses)
+      total_policy_gradient_loss = (
+          tf.add_n(policy_gradient_losses) / num_updates)
       total_value_estimation_loss = tf.add_n(
-          value_estimation_losses) / num_epochs
+          value_estimation_losses) / num_updates
       total_l2_regularization_loss = tf.add_n(
-          l2_regularization_losses) / num_epochs
+          l2_regularization_losses) / num_updates
       total_entropy_regularization_loss = tf.add_n(
-          entropy_regularization_losses) / num_epochs
-      total_kl_penalty_loss = tf.add_n(kl_penalty_losses) / num_epochs
+          entropy_regularization_losses) / num_updates
+      total_kl_penalty_loss = tf.add_n(kl_penalty_losses) / num_updates
       tf.compat.v2.summary.scalar(
           name='policy_gradient_loss',
           data=total_policy_gradient_loss,
@@ -206,7 +206,11 @@ class PPOAgentTest(parameterized.TestCase, test_utils.TestCase):
                                           value_preds)
     self.assertAllClose(expected_advantages, advantages)
 
-  def testComputeAdvantagesWithGae(self):
+  @parameterized.named_parameters([
+      ('Scan', False),
+      ('AssociativeScan', True),
+  ])
+  def testComputeAdvantagesWithGae(self, use_associative_scan):
     gae_lambda = 0.95
     agent = ppo_agent.PPOAgent(
         self._time_step_spec,
@@ -219,7 +223,8 @@ class PPOAgentTest(parameterized.TestCase, test_utils.TestCase):
         value_net=DummyValueNet(self._obs_spec),
         normalize_observations=False,
         use_gae=True,
-        lambda_value=gae_lambda)
+        lambda_value=gae_lambda,
+        use_associative_scan=use_associative_scan)
     rewards = tf.constant([[1.0] * 9, [1.0] * 9])
     discounts = tf.constant([[1.0, 1.0, 1.0, 1.0, 0.0, 0.9, 0.9, 0.9, 0.0],
                              [1.0, 1.0, 1.0, 1.0, 0.0, 0.9, 0.9, 0.9, 0.0]])
@@ -306,6 +311,126 @@ class PPOAgentTest(parameterized.TestCase, test_utils.TestCase):
     # Assert that train_op ran increment_counter num_epochs times.
     self.assertEqual(num_epochs, self.evaluate(counter))
 
+  @parameterized.named_parameters([
+      ('NumMinibatches', False, dict(num_minibatches=3), 3),
+      ('MinibatchSize', False, dict(minibatch_size=3), 2),
+      ('RnnNumMinibatches', True, dict(num_minibatches=2), 2),
+      ('RnnMinibatchSize', True, dict(minibatch_size=1), 2),
+  ])
+  def testTrainWithMinibatches(self, use_rnn, minibatch_kwargs,
+                               num_minibatches):
+    counter = common.create_variable('test_train_counter')
+    if use_rnn:
+      actor_net = actor_distribution_rnn_network.ActorDistributionRnnNetwork(
+          self._obs_spec,
+          self._action_spec,
+          input_fc_layer_params=None,
+          output_fc_layer_params=None,
+          lstm_size=(4,))
+      value_net = value_rnn_network.ValueRnnNetwork(
+          self._obs_spec,
+          input_fc_layer_params=None,
+          output_fc_layer_params=None,
+          lstm_size=(4,))
+    else:
+      actor_net = DummyActorNet(self._obs_spec, self._action_spec)
+      value_net = DummyValueNet(self._obs_spec)
+    num_epochs = 2
+    agent = ppo_agent.PPOAgent(
+        self._time_step_spec,
+        self._action_spec,
+        tf.compat.v1.train.AdamOptimizer(),
+        actor_net=actor_net,
+        value_net=value_net,
+        normalize_observations=False,
+        num_epochs=num_epochs,
+        train_step_counter=counter,
+        **minibatch_kwargs)
+    observations = tf.constant([
+        [[1, 2], [3, 4], [5, 6]],
+        [[1, 2], [3, 4], [5, 6]],
+    ],
+                               dtype=tf.float32)
+    mid_time_step_val = ts.StepType.MID.tolist()
+    step_type = tf.constant([[mid_time_step_val] * 3] * 2, dtype=tf.int32)
+    reward = tf.constant([[1] * 3] * 2, dtype=tf.float32)
+    discount = tf.constant([[1] * 3] * 2, dtype=tf.float32)
+    actions = tf.constant([[[0], [1], [1]], [[0], [1], [1]]], dtype=tf.float32)
+    policy_info = {
+        'dist_params': {
+            'loc': tf.constant([[[0.0]] * 3] * 2, dtype=tf.float32),
+            'scale': tf.constant([[[1.0]] * 3] * 2, dtype=tf.float32),
+        }
+    }
+    experience = trajectory.Trajectory(step_type, observations, actions,
+                                       policy_info, step_type, reward, discount)
+
+    if tf.executing_eagerly():
+      loss = lambda: agent.train(experience)
+    else:
+      loss = agent.train(experience)
+
+    self.evaluate(tf.compat.v1.initialize_all_variables())
+    self.assertEqual(0, self.evaluate(counter))
+    loss_numpy = self.evaluate(loss).loss
+    self.assertTrue(np.isfinite(loss_numpy))
+    # One update per minibatch and epoch.
+    self.assertEqual(num_epochs * num_minibatches, self.evaluate(counter))
+
+  def testMinibatchArgsRaiseError(self):
+    with self.assertRaisesRegexp(ValueError, 'Only one of'):
+      ppo_agent.PPOAgent(
+          self._time_step_spec,
+          self._action_spec,
+          tf.compat.v1.train.AdamOptimizer(),
+          actor_net=DummyActorNet(self._obs_spec, self._action_spec),
+          value_net=DummyValueNet(self._obs_spec),
+          num_minibatches=2,
+          minibatch_size=2)
+
+  def testTooManyMinibatchesRaisesError(self):
+    actor_net = actor_distribution_rnn_network.ActorDistributionRnnNetwork(
+        self._obs_spec,
+        self._action_spec,
+        input_fc_layer_params=None,
+        output_fc_layer_params=None,
+        lstm_size=(4,))
+    value_net = value_rnn_network.ValueRnnNetwork(
+        self._obs_spec,
+        input_fc_layer_params=None,
+        output_fc_layer_params=None,
+        lstm_size=(4,))
+    agent = ppo_agent.PPOAgent(
+        self._time_step_spec,
+        self._action_spec,
+        tf.compat.v1.train.AdamOptimizer(),
+        actor_net=actor_net,
+        value_net=value_net,
+        normalize_observations=False,
+        num_minibatches=3)
+    observations = tf.constant([
+        [[1, 2], [3, 4], [5, 6]],
+        [[1, 2], [3, 4], [5, 6]],
+    ],
+                               dtype=tf.float32)
+    mid_time_step_val = ts.StepType.MID.tolist()
+    step_type = tf.constant([[mid_time_step_val] * 3] * 2, dtype=tf.int32)
+    reward = tf.constant([[1] * 3] * 2, dtype=tf.float32)
+    discount = tf.constant([[1] * 3] * 2, dtype=tf.float32)
+    actions = tf.constant([[[0], [1], [1]], [[0], [1], [1]]], dtype=tf.float32)
+    policy_info = {
+        'dist_params': {
+            'loc': tf.constant([[[0.0]] * 3] * 2, dtype=tf.float32),
+            'scale': tf.constant([[[1.0]] * 3] * 2, dtype=tf.float32),
+        }
+    }
+    experience = trajectory.Trajectory(step_type, observations, actions,
+                                       policy_info, step_type, reward, discount)
+
+    # Only two trajectories can be split between the three minibatches.
+    with self.assertRaisesRegexp(ValueError, 'num_minibatches'):
+      agent.train(experience)
+
   def testGetEpochLoss(self):
     agent = ppo_agent.PPOAgent(
         self._time_step_spec,
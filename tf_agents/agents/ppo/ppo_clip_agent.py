@@ -89,7 +89,10 @@ class PPOClipAgent(ppo_agent.PPOAgent):
                debug_summaries=False,
                summarize_grads_and_vars=False,
                train_step_counter=None,
-               name='PPOClipAgent'):
+               name='PPOClipAgent',
+               use_associative_scan=False,
+               num_minibatches=None,
+               minibatch_size=None):
     """Creates a PPO Agent implementing the clipped probability ratios.
 
     Args:
@@ -138,6 +141,12 @@ class PPOClipAgent(ppo_agent.PPOAgent):
         op is run.  Defaults to the global_step.
       name: The name of this agent. All variables in this module will fall under
         that name. Defaults to the class name.
+      use_associative_scan: If True, returns and advantages are computed with
+        a parallel prefix scan taking O(log(T)) sequential steps instead of a
+        `tf.scan` taking T steps. See `value_ops.discounted_return`.
+      num_minibatches: If set, the number of minibatches per epoch. See
+        `PPOAgent`.
+      minibatch_size: If set, the size of the minibatches. See `PPOAgent`.
 
     Raises:
       ValueError: If the actor_net is not a DistributionNetwork.
@@ -162,12 +171,15 @@ class PPOClipAgent(ppo_agent.PPOAgent):
         normalize_rewards,
         reward_norm_clipping,
         normalize_observations,
+        num_minibatches=num_minibatches,
+        minibatch_size=minibatch_size,
         gradient_clipping=gradient_clipping,
         check_numerics=check_numerics,
         debug_summaries=debug_summaries,
         summarize_grads_and_vars=summarize_grads_and_vars,
         train_step_counter=train_step_counter,
         name=name,
+        use_associative_scan=use_associative_scan,
         # Skips parameters used for the adaptive KL loss penalty version of PPO.
         log_prob_clipping=0.0,
         kl_cutoff_factor=0.0,
@@ -90,7 +90,10 @@ class PPOKLPenaltyAgent(ppo_agent.PPOAgent):
                debug_summaries=False,
                summarize_grads_and_vars=False,
                train_step_counter=None,
-               name=None):
+               name=None,
+               use_associative_scan=False,
+               num_minibatches=None,
+               minibatch_size=None):
     """Creates a PPO Agent implementing the KL penalty loss.
 
     Args:
@@ -181,6 +184,12 @@ class PPOKLPenaltyAgent(ppo_agent.PPOAgent):
         op is run.  Defaults to the global_step.
       name: The name of this agent. All variables in this module will fall under
         that name. Defaults to the class name.
+      use_associative_scan: If True, returns and advantages are computed with
+        a parallel prefix scan taking O(log(T)) sequential steps instead of a
+        `tf.scan` taking T steps. See `value_ops.discounted_return`.
+      num_minibatches: If set, the number of minibatches per epoch. See
+        `PPOAgent`.
+      minibatch_size: If set, the size of the minibatches. See `PPOAgent`.
 
     Raises:
       ValueError: If the actor_net is not a DistributionNetwork or value_net is
@@ -217,12 +226,15 @@ class PPOKLPenaltyAgent(ppo_agent.PPOAgent):
         initial_adaptive_kl_beta=initial_adaptive_kl_beta,
         adaptive_kl_target=adaptive_kl_target,
         adaptive_kl_tolerance=adaptive_kl_tolerance,
+        num_minibatches=num_minibatches,
+        minibatch_size=minibatch_size,
         gradient_clipping=gradient_clipping,
         check_numerics=check_numerics,
         debug_summaries=debug_summaries,
         summarize_grads_and_vars=summarize_grads_and_vars,
         train_step_counter=train_step_counter,
         name=name,
+        use_associative_scan=use_associative_scan,
         # Skips parameters specific to PPOClipAgent.
         importance_ratio_clipping=0.0,
     )
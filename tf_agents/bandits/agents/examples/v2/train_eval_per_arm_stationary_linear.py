@@ -29,6 +29,7 @@ import tensorflow as tf  # pylint: disable=g-explicit-tensorflow-version-import
 
 from tf_agents.bandits.agents import neural_epsilon_greedy_agent
 from tf_agents.bandits.agents.examples.v2 import trainer
+from tf_agents.bandits.environments import environment_utilities as env_util
 from tf_agents.bandits.environments import stationary_stochastic_per_arm_py_environment as sspe
 from tf_agents.bandits.metrics import tf_metrics as tf_bandit_metrics
 from tf_agents.bandits.networks import global_and_arm_feature_network
@@ -81,22 +82,16 @@ def optimal_action(observation, hidden_param):
 def main(unused_argv):
   tf.compat.v1.enable_v2_behavior()  # The trainer only runs with V2 enabled.
 
-  class LinearNormalReward(object):
+  @env_util.batched_fn
+  def _global_context_sampling_fn(batch_size):
+    return np.random.randint(-10, 10, [batch_size, 4]).astype(np.float32)
 
-    def __init__(self, theta):
-      self.theta = theta
+  @env_util.batched_fn
+  def _arm_context_sampling_fn(batch_size, num_actions):
+    return np.random.randint(
+        -2, 3, [batch_size, num_actions, 5]).astype(np.float32)
 
-    def __call__(self, x):
-      mu = np.dot(x, self.theta)
-      return np.random.normal(mu, 1)
-
-  def _global_context_sampling_fn():
-    return np.random.randint(-10, 10, [4]).astype(np.float32)
-
-  def _arm_context_sampling_fn():
-    return np.random.randint(-2, 3, [5]).astype(np.float32)
-
-  reward_fn = LinearNormalReward(HIDDEN_PARAM)
+  reward_fn = env_util.LinearNormalReward(HIDDEN_PARAM, 1)
 
   env = sspe.StationaryStochasticPerArmPyEnvironment(
       _global_context_sampling_fn,
@@ -55,7 +55,9 @@ class LinearUCBAgent(lin_agent.LinearBanditAgent):
                summarize_grads_and_vars=False,
                enable_summaries=True,
                dtype=tf.float32,
-               name=None):
+               name=None,
+               use_cached_inverse=False,
+               use_woodbury_update=False):
     """Initialize an instance of `LinearUCBAgent`.
 
     Args:
@@ -92,6 +94,12 @@ class LinearUCBAgent(lin_agent.LinearBanditAgent):
       dtype: The type of the parameters stored and updated by the agent. Should
         be one of `tf.float32` and `tf.float64`. Defaults to `tf.float32`.
       name: a name for this instance of `LinearUCBAgent`.
+      use_cached_inverse: If true, the inverses of the regularized covariance
+        matrices are cached and refreshed after every training step, so that
+        the policy does not solve a linear system per arm on every call.
+      use_woodbury_update: If true, the cached inverses are maintained with
+        rank-1 Sherman-Morrison updates instead of being recomputed after
+        every training step. Implies `use_cached_inverse`.
 
     Raises:
       ValueError if dtype is not one of `tf.float32` or `tf.float64`.
@@ -105,6 +113,8 @@ class LinearUCBAgent(lin_agent.LinearBanditAgent):
         use_eigendecomp=use_eigendecomp,
         tikhonov_weight=tikhonov_weight,
         add_bias=add_bias,
+        use_cached_inverse=use_cached_inverse,
+        use_woodbury_update=use_woodbury_update,
         emit_policy_info=emit_policy_info,
         emit_log_probability=emit_log_probability,
         observation_and_action_constraint_splitter=(
@@ -49,7 +49,9 @@ class LinearBanditVariableCollection(tf.Module):
                num_actions,
                use_eigendecomp=False,
                dtype=tf.float32,
-               name=None):
+               name=None,
+               use_cached_inverse=False,
+               tikhonov_weight=1.0):
     """Initializes an instance of `LinearBanditVariableCollection`.
 
     It creates all the variables needed for `LinearBanditAgent`.
@@ -63,6 +65,10 @@ class LinearBanditVariableCollection(tf.Module):
       dtype: The type of the variables. Should be one of `tf.float32` and
         `tf.float64`.
       name:  (string) the name of this instance.
+      use_cached_inverse: (bool) Whether the agent keeps the inverses of the
+        regularized covariance matrices of all arms in a single variable.
+      tikhonov_weight: (float) tikhonov regularization term. Only used to
+        initialize the cached inverses.
     """
     tf.Module.__init__(self, name=name)
     self.cov_matrix_list = []
@@ -97,6 +103,13 @@ class LinearBanditVariableCollection(tf.Module):
         self.eig_vals_list.append(
             tf.compat.v2.Variable(
                 tf.constant([], dtype=dtype), name='eig_vals{}'.format(k)))
+    # The inverses of `a_k + tikhonov_weight * I`, stacked over the arms.
+    self.inverse_cov_matrix = None
+    if use_cached_inverse:
+      self.inverse_cov_matrix = tf.compat.v2.Variable(
+          tf.eye(context_dim, batch_shape=[num_actions], dtype=dtype) /
+          tikhonov_weight,
+          name='inverse_cov_matrix')
 
 
 def update_a_and_b_with_forgetting(
@@ -152,7 +165,9 @@ class LinearBanditAgent(tf_agent.TFAgent):
                summarize_grads_and_vars=False,
                enable_summaries=True,
                dtype=tf.float32,
-               name=None):
+               name=None,
+               use_cached_inverse=False,
+               use_woodbury_update=False):
     """Initialize an instance of `LinearBanditAgent`.
 
     Args:
@@ -195,13 +210,33 @@ class LinearBanditAgent(tf_agent.TFAgent):
       dtype: The type of the parameters stored and updated by the agent. Should
         be one of `tf.float32` and `tf.float64`. Defaults to `tf.float32`.
       name: a name for this instance of `LinearBanditAgent`.
+      use_cached_inverse: If true, the agent keeps the inverses of the
+        regularized covariance matrices of all arms in a variable that is
+        refreshed after every training step. The policy then scores all arms
+        with a single batched matmul instead of solving a linear system per
+        arm on every call.
+      use_woodbury_update: If true, the cached inverses are maintained with
+        rank-1 Sherman-Morrison updates on every training step instead of
+        being recomputed from the covariance matrices. A batch of `n`
+        observations then costs O(n * context_dim^2), plus one copy of the
+        stacked inverses for each observation of the most pulled arm, instead
+        of O(num_actions * context_dim^3). Implies `use_cached_inverse`. With
+        `gamma < 1`, forgetting keeps the Tikhonov regularization intact at
+        the cost of one O(context_dim^3) solve per pulled arm, so the savings
+        are mostly realized with `gamma == 1`. The distributed training step
+        only sees the reduced updates of the covariance matrices, so it
+        recomputes the inverses instead.
 
     Raises:
       ValueError if dtype is not one of `tf.float32` or `tf.float64`.
       TypeError if variable_collection is not an instance of
         `LinearBanditVariableCollection`.
+      ValueError if `use_cached_inverse` is set but `variable_collection` does
+        not hold the cached inverses.
+      ValueError if `use_woodbury_update` is set and `gamma` is 0.
     """
     tf.Module.__init__(self, name=name)
+    use_cached_inverse = use_cached_inverse or use_woodbury_update
     common.tf_agents_gauge.get_cell('TFABandit').set(True)
     self._num_actions = bandit_utils.get_num_actions_from_tensor_spec(
         action_spec)
@@ -222,10 +257,16 @@ class LinearBanditAgent(tf_agent.TFAgent):
           context_dim=self._context_dim,
           num_actions=self._num_actions,
           use_eigendecomp=use_eigendecomp,
-          dtype=dtype)
+          dtype=dtype,
+          use_cached_inverse=use_cached_inverse,
+          tikhonov_weight=tikhonov_weight)
     elif not isinstance(variable_collection, LinearBanditVariableCollection):
       raise TypeError('Parameter `variable_collection` should be '
                       'of type `LinearBanditVariableCollection`.')
+    if use_cached_inverse and variable_collection.inverse_cov_matrix is None:
+      raise ValueError('Parameter `variable_collection` must hold the cached '
+                       'inverse covariance matrices when '
+                       '`use_cached_inverse` is True.')
     self._variable_collection = variable_collection
     self._cov_matrix_list = variable_collection.cov_matrix_list
     self._data_vector_list = variable_collection.data_vector_list
@@ -233,15 +274,21 @@ class LinearBanditAgent(tf_agent.TFAgent):
     self._eig_vals_list = variable_collection.eig_vals_list
     # We keep track of the number of samples per arm.
     self._num_samples_list = variable_collection.num_samples_list
+    self._inverse_cov_matrix = (
+        variable_collection.inverse_cov_matrix if use_cached_inverse else None)
     self._gamma = gamma
     if self._gamma < 0.0 or self._gamma > 1.0:
       raise ValueError('Forgetting factor `gamma` must be in [0.0, 1.0].')
+    if use_woodbury_update and self._gamma == 0.0:
+      raise ValueError('Forgetting factor `gamma` must be positive when '
+                       '`use_woodbury_update` is True.')
     self._dtype = dtype
     if dtype not in (tf.float32, tf.float64):
       raise ValueError(
           'Agent dtype should be either `tf.float32 or `tf.float64`.')
     self._use_eigendecomp = use_eigendecomp
     self._tikhonov_weight = tikhonov_weight
+    self._use_woodbury_update = use_woodbury_update
     self._observation_and_action_constraint_splitter = (
         observation_and_action_constraint_splitter)
 
@@ -268,7 +315,8 @@ class LinearBanditAgent(tf_agent.TFAgent):
         emit_policy_info=emit_policy_info,
         emit_log_probability=emit_log_probability,
         observation_and_action_constraint_splitter=(
-            observation_and_action_constraint_splitter))
+            observation_and_action_constraint_splitter),
+        inverse_cov_matrix=self._inverse_cov_matrix)
     super(LinearBanditAgent, self).__init__(
         time_step_spec=time_step_spec,
         action_spec=action_spec,
@@ -317,6 +365,9 @@ class LinearBanditAgent(tf_agent.TFAgent):
     The returned matrix has shape (num_actions, context_dim).
     It's equivalent to a stacking of theta vectors from the paper.
     """
+    if self._inverse_cov_matrix is not None:
+      return tf.einsum('kij,kj->ki', self._inverse_cov_matrix,
+                       tf.stack(self._data_vector_list))
     thetas = []
     for k in range(self._num_actions):
       thetas.append(
@@ -329,6 +380,15 @@ class LinearBanditAgent(tf_agent.TFAgent):
 
     return tf.stack(thetas, axis=0)
 
+  def _compute_inverse_cov_matrix(self, cov_matrix):
+    """Returns the inverses of the regularized `cov_matrix` of all arms."""
+    regularized_cov_matrix = cov_matrix + self._tikhonov_weight * tf.eye(
+        self._context_dim, dtype=self._dtype)
+    return tf.linalg.cholesky_solve(
+        tf.linalg.cholesky(regularized_cov_matrix),
+        tf.eye(self._context_dim, batch_shape=[self._num_actions],
+               dtype=self._dtype))
+
   def _initialize(self):
     tf.compat.v1.variables_initializer(self.variables)
 
@@ -382,58 +442,59 @@ class LinearBanditAgent(tf_agent.TFAgent):
         tf.compat.dimension_value(tf.shape(reward)[0]), dtype=tf.int64)
     self._train_step_counter.assign_add(batch_size)
 
-    for k in range(self._num_actions):
-      diag_mask = tf.linalg.tensor_diag(
-          tf.cast(tf.equal(action, k), self._dtype))
-      observations_for_arm = tf.matmul(diag_mask, observation)
-      rewards_for_arm = tf.matmul(diag_mask, tf.reshape(reward, [-1, 1]))
-
-      # Compute local updates for the matrix A and b of this arm.
-      cov_matrix_local_udpate = tf.matmul(
-          observations_for_arm, observations_for_arm, transpose_a=True)
-      data_vector_local_update = bandit_utils.sum_reward_weighted_observations(
-          rewards_for_arm, observations_for_arm)
-
-      def _merge_fn(strategy, per_replica_cov_matrix_update,
-                    per_replica_data_vector_update):
-        """Merge the per-replica-updates."""
-        # Reduce the per-replica-updates using SUM.
-        reduced_cov_matrix_updates = strategy.reduce(
-            tf.distribute.ReduceOp.SUM,
-            per_replica_cov_matrix_update, axis=None)
-        reduced_data_vector_updates = strategy.reduce(
-            tf.distribute.ReduceOp.SUM, per_replica_data_vector_update,
-            axis=None)
-
-        def update_fn(v, t):
-          v.assign(v + t)
-        def assign_fn(v, t):
-          v.assign(t)
-
-        # Update the model variables.
-        # pylint: disable=cell-var-from-loop
+    # Compute the local updates of the matrices A and vectors b of all arms.
+    cov_matrix_local_updates, data_vector_local_updates, _ = (
+        bandit_utils.sum_outer_products_and_weighted_observations_per_arm(
+            reward, observation, action, self._num_actions))
+
+    def _merge_fn(strategy, per_replica_cov_matrix_updates,
+                  per_replica_data_vector_updates):
+      """Merge the per-replica-updates."""
+      # Reduce the per-replica-updates using SUM.
+      reduced_cov_matrix_updates = strategy.reduce(
+          tf.distribute.ReduceOp.SUM,
+          per_replica_cov_matrix_updates, axis=None)
+      reduced_data_vector_updates = strategy.reduce(
+          tf.distribute.ReduceOp.SUM, per_replica_data_vector_updates,
+          axis=None)
+
+      def update_fn(v, t):
+        v.assign(v + t)
+      def assign_fn(v, t):
+        v.assign(t)
+
+      # Update the model variables.
+      for k in range(self._num_actions):
         strategy.extended.update(
             self._cov_matrix_list[k], update_fn,
-            args=(reduced_cov_matrix_updates,))
+            args=(reduced_cov_matrix_updates[k],))
         strategy.extended.update(
             self._data_vector_list[k], update_fn,
-            args=(reduced_data_vector_updates,))
-        # Compute the eigendecomposition, if needed.
-        if self._use_eigendecomp:
-          eig_vals, eig_matrix = tf.linalg.eigh(self._cov_matrix_list[k])
+            args=(reduced_data_vector_updates[k],))
+      # Compute the eigendecomposition, if needed.
+      if self._use_eigendecomp:
+        eig_vals, eig_matrix = tf.linalg.eigh(
+            tf.stack(self._cov_matrix_list))
+        for k in range(self._num_actions):
           strategy.extended.update(
-              self._eig_vals_list[k], assign_fn, args=(eig_vals,))
+              self._eig_vals_list[k], assign_fn, args=(eig_vals[k],))
           strategy.extended.update(
-              self._eig_matrix_list[k], assign_fn, args=(eig_matrix,))
-
-      # Passes the local_updates to the _merge_fn() above that performs custom
-      # computation on the per-replica values.
-      # All replicas pause their execution until merge_call() is done and then,
-      # execution is resumed.
-      replica_context = tf.distribute.get_replica_context()
-      replica_context.merge_call(
-          _merge_fn,
-          args=(cov_matrix_local_udpate, data_vector_local_update))
+              self._eig_matrix_list[k], assign_fn, args=(eig_matrix[k],))
+      # Refresh the cached inverses read by the policy, if needed.
+      if self._inverse_cov_matrix is not None:
+        strategy.extended.update(
+            self._inverse_cov_matrix, assign_fn,
+            args=(self._compute_inverse_cov_matrix(
+                tf.stack(self._cov_matrix_list)),))
+
+    # Passes the local_updates to the _merge_fn() above that performs custom
+    # computation on the per-replica values.
+    # All replicas pause their execution until merge_call() is done and then,
+    # execution is resumed.
+    replica_context = tf.distribute.get_replica_context()
+    replica_context.merge_call(
+        _merge_fn,
+        args=(cov_matrix_local_updates, data_vector_local_updates))
 
     loss = -1. * tf.reduce_sum(experience.reward)
     return tf_agent.LossInfo(loss=(loss), extra=())
@@ -488,33 +549,63 @@ class LinearBanditAgent(tf_agent.TFAgent):
     observation = tf.reshape(observation, [-1, self._context_dim])
     reward = tf.cast(reward, self._dtype)
 
+    # Compute the updates of all the arms at once.
+    cov_matrix_updates, data_vector_updates, num_samples_current = (
+        bandit_utils.sum_outer_products_and_weighted_observations_per_arm(
+            reward, observation, action, self._num_actions))
     for k in range(self._num_actions):
-      diag_mask = tf.linalg.tensor_diag(
-          tf.cast(tf.equal(action, k), self._dtype))
-      observations_for_arm = tf.matmul(diag_mask, observation)
-      rewards_for_arm = tf.matmul(diag_mask, tf.reshape(reward, [-1, 1]))
-
-      num_samples_for_arm_current = tf.reduce_sum(diag_mask)
       tf.compat.v1.assign_add(self._num_samples_list[k],
-                              num_samples_for_arm_current)
-      num_samples_for_arm_total = self._num_samples_list[k].read_value()
-
-      # Update the matrix A and b.
-      # pylint: disable=cell-var-from-loop,g-long-lambda
-      def update(cov_matrix, data_vector):
-        return update_a_and_b_with_forgetting(
-            cov_matrix, data_vector, rewards_for_arm, observations_for_arm,
-            self._gamma, self._use_eigendecomp)
-      a_new, b_new, eig_vals, eig_matrix = tf.cond(
-          tf.squeeze(num_samples_for_arm_total) > 0,
-          lambda: update(self._cov_matrix_list[k], self._data_vector_list[k]),
-          lambda: (self._cov_matrix_list[k], self._data_vector_list[k],
-                   self._eig_vals_list[k], self._eig_matrix_list[k]))
-
-      tf.compat.v1.assign(self._cov_matrix_list[k], a_new)
-      tf.compat.v1.assign(self._data_vector_list[k], b_new)
-      tf.compat.v1.assign(self._eig_vals_list[k], eig_vals)
-      tf.compat.v1.assign(self._eig_matrix_list[k], eig_matrix)
+                              num_samples_current[k])
+    num_samples_total = tf.stack(
+        [num_samples.read_value() for num_samples in self._num_samples_list])
+    # Arms that have never been pulled keep their initial values.
+    pulled = num_samples_total > 0
+
+    cov_matrix = tf.stack(self._cov_matrix_list)
+    data_vector = tf.stack(self._data_vector_list)
+    a_new = tf.compat.v1.where(
+        pulled, self._gamma * cov_matrix + cov_matrix_updates, cov_matrix)
+    b_new = tf.compat.v1.where(
+        pulled, self._gamma * data_vector + data_vector_updates, data_vector)
+    for k in range(self._num_actions):
+      tf.compat.v1.assign(self._cov_matrix_list[k], a_new[k])
+      tf.compat.v1.assign(self._data_vector_list[k], b_new[k])
+    if self._use_eigendecomp:
+      eig_vals, eig_matrix = tf.linalg.eigh(a_new)
+      eig_vals = tf.compat.v1.where(
+          pulled, eig_vals, tf.stack(self._eig_vals_list))
+      eig_matrix = tf.compat.v1.where(
+          pulled, eig_matrix, tf.stack(self._eig_matrix_list))
+      for k in range(self._num_actions):
+        tf.compat.v1.assign(self._eig_vals_list[k], eig_vals[k])
+        tf.compat.v1.assign(self._eig_matrix_list[k], eig_matrix[k])
+    if self._use_woodbury_update:
+      inverse_cov_matrix = self._inverse_cov_matrix
+      if self._gamma != 1.0:
+        # Forgetting turns `a_k + w * I` into `gamma * (a_k + w * I) +
+        # (1 - gamma) * w * I`, where `w` is the Tikhonov weight. With
+        # `P = inverse(a_k + w * I)`, its inverse is
+        # `inverse(gamma * I + (1 - gamma) * w * P) P`.
+        # Only the inverses of the pulled arms are solved for.
+        pulled_arms = tf.where(pulled)
+        pulled_inverse_cov_matrix = tf.gather_nd(inverse_cov_matrix,
+                                                 pulled_arms)
+        forgotten_inverse_cov_matrix = tf.linalg.solve(
+            self._gamma * tf.eye(self._context_dim, dtype=self._dtype) +
+            (1. - self._gamma) * self._tikhonov_weight *
+            pulled_inverse_cov_matrix, pulled_inverse_cov_matrix)
+        inverse_cov_matrix = tf.tensor_scatter_nd_update(
+            inverse_cov_matrix, pulled_arms, forgotten_inverse_cov_matrix)
+      # The new observations are then folded in with rank-1 updates.
+      tf.compat.v1.assign(
+          self._inverse_cov_matrix,
+          inverse_cov_matrix + linalg.update_inverse_per_arm(
+              inverse_cov_matrix, observation, action))
+    elif self._inverse_cov_matrix is not None:
+      # The inverses are refreshed once per training step, so that serving
+      # does not need to solve any linear system.
+      tf.compat.v1.assign(self._inverse_cov_matrix,
+                          self._compute_inverse_cov_matrix(a_new))
 
     loss = -1. * tf.reduce_sum(experience.reward)
     self.compute_summaries(loss)
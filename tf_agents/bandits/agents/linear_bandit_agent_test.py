@@ -291,6 +291,168 @@ class LinearBanditAgentTest(tf.test.TestCase, parameterized.TestCase):
         atol=0.1,
         rtol=0.05)
 
+  @test_cases()
+  def testLinearAgentUpdateWithCachedInverse(self,
+                                             batch_size,
+                                             context_dim,
+                                             exploration_policy,
+                                             dtype,
+                                             use_eigendecomp=False):
+    """Check that the cached inverses are refreshed by the training step."""
+
+    # Construct a `Trajectory` for the given action, observation, reward.
+    num_actions = 5
+    initial_step, final_step = _get_initial_and_final_steps(
+        batch_size, context_dim)
+    action = np.random.randint(num_actions, size=batch_size, dtype=np.int32)
+    action_step = _get_action_step(action)
+    experience = _get_experience(initial_step, action_step, final_step)
+
+    # Construct an agent and perform the update.
+    observation_spec = tensor_spec.TensorSpec([context_dim], tf.float32)
+    time_step_spec = time_step.time_step_spec(observation_spec)
+    action_spec = tensor_spec.BoundedTensorSpec(
+        dtype=tf.int32, shape=(), minimum=0, maximum=num_actions - 1)
+    agent = linear_agent.LinearBanditAgent(
+        exploration_policy=exploration_policy,
+        time_step_spec=time_step_spec,
+        action_spec=action_spec,
+        use_eigendecomp=use_eigendecomp,
+        tikhonov_weight=2.0,
+        use_cached_inverse=True,
+        dtype=dtype)
+    self.evaluate(agent.initialize())
+    loss_info = agent.train(experience)
+    self.evaluate(loss_info)
+    final_a = self.evaluate(agent.cov_matrix)
+    final_b = self.evaluate(agent.data_vector)
+    final_inverse = self.evaluate(agent._inverse_cov_matrix)
+    final_theta = self.evaluate(agent.theta)
+
+    expected_inverse = np.linalg.inv(
+        np.stack(final_a) + 2.0 * np.eye(context_dim))
+    expected_theta = np.einsum('kij,kj->ki', expected_inverse,
+                               np.stack(final_b))
+    self.assertAllClose(expected_inverse, final_inverse, atol=0.1, rtol=0.05)
+    self.assertAllClose(expected_theta, final_theta, atol=0.1, rtol=0.05)
+
+    # The policy scores the arms with the cached inverses.
+    policy_step_ = agent.policy.action(final_step)
+    self.assertEqual(self.evaluate(policy_step_.action).shape, (batch_size,))
+
+  @test_cases()
+  def testLinearAgentUpdateWithWoodbury(self,
+                                        batch_size,
+                                        context_dim,
+                                        exploration_policy,
+                                        dtype,
+                                        use_eigendecomp=False):
+    """Check that the Woodbury updates keep the inverses in sync with `a`."""
+
+    # Construct a `Trajectory` for the given action, observation, reward.
+    num_actions = 5
+    initial_step, final_step = _get_initial_and_final_steps(
+        batch_size, context_dim)
+    action = np.random.randint(num_actions, size=batch_size, dtype=np.int32)
+    action_step = _get_action_step(action)
+    experience = _get_experience(initial_step, action_step, final_step)
+
+    # Construct an agent and perform two updates.
+    observation_spec = tensor_spec.TensorSpec([context_dim], tf.float32)
+    time_step_spec = time_step.time_step_spec(observation_spec)
+    action_spec = tensor_spec.BoundedTensorSpec(
+        dtype=tf.int32, shape=(), minimum=0, maximum=num_actions - 1)
+    agent = linear_agent.LinearBanditAgent(
+        exploration_policy=exploration_policy,
+        time_step_spec=time_step_spec,
+        action_spec=action_spec,
+        use_eigendecomp=use_eigendecomp,
+        use_woodbury_update=True,
+        dtype=dtype)
+    self.evaluate(agent.initialize())
+    self.evaluate(agent.train(experience).loss)
+    self.evaluate(agent.train(experience).loss)
+    final_a = self.evaluate(agent.cov_matrix)
+    final_inverse = self.evaluate(agent._inverse_cov_matrix)
+
+    expected_inverse = np.linalg.inv(np.stack(final_a) + np.eye(context_dim))
+    self.assertAllClose(expected_inverse, final_inverse, atol=0.1, rtol=0.05)
+
+  @test_cases()
+  def testWoodburyUpdateWithForgettingMatchesRecompute(self,
+                                                       batch_size,
+                                                       context_dim,
+                                                       exploration_policy,
+                                                       dtype,
+                                                       use_eigendecomp=False):
+    """Check that forgetting keeps the Tikhonov term of the Woodbury inverses."""
+    num_actions = 5
+    observation_spec = tensor_spec.TensorSpec([context_dim], tf.float32)
+    time_step_spec = time_step.time_step_spec(observation_spec)
+    action_spec = tensor_spec.BoundedTensorSpec(
+        dtype=tf.int32, shape=(), minimum=0, maximum=num_actions - 1)
+    agents = [
+        linear_agent.LinearBanditAgent(
+            exploration_policy=exploration_policy,
+            time_step_spec=time_step_spec,
+            action_spec=action_spec,
+            gamma=0.5,
+            tikhonov_weight=2.0,
+            use_eigendecomp=use_eigendecomp,
+            use_cached_inverse=True,
+            use_woodbury_update=use_woodbury_update,
+            dtype=dtype) for use_woodbury_update in (False, True)
+    ]
+    for agent in agents:
+      self.evaluate(agent.initialize())
+
+    for _ in range(4):
+      initial_step, final_step = _get_initial_and_final_steps(
+          batch_size, context_dim)
+      # The last arm is never pulled.
+      action = np.random.randint(
+          num_actions - 1, size=batch_size, dtype=np.int32)
+      experience = _get_experience(initial_step, _get_action_step(action),
+                                   final_step)
+      for agent in agents:
+        self.evaluate(agent.train(experience).loss)
+
+    recomputed_inverse, woodbury_inverse = [
+        self.evaluate(agent._inverse_cov_matrix) for agent in agents]
+    # Losing the Tikhonov term would change the inverses by a factor of 16 in
+    # the directions without observations.
+    self.assertAllClose(recomputed_inverse, woodbury_inverse, atol=1e-2,
+                        rtol=1e-2)
+    self.assertAllClose(np.eye(context_dim) / 2.0, woodbury_inverse[-1])
+
+  def testWoodburyUpdateRequiresPositiveGamma(self):
+    observation_spec = tensor_spec.TensorSpec([2], tf.float32)
+    time_step_spec = time_step.time_step_spec(observation_spec)
+    action_spec = tensor_spec.BoundedTensorSpec(
+        dtype=tf.int32, shape=(), minimum=0, maximum=2)
+    with self.assertRaisesRegexp(ValueError, r'must be positive'):
+      linear_agent.LinearBanditAgent(
+          exploration_policy=linear_agent.ExplorationPolicy.linear_ucb_policy,
+          time_step_spec=time_step_spec,
+          action_spec=action_spec,
+          gamma=0.0,
+          use_woodbury_update=True)
+
+  def testCachedInverseRequiresVariable(self):
+    observation_spec = tensor_spec.TensorSpec([2], tf.float32)
+    time_step_spec = time_step.time_step_spec(observation_spec)
+    action_spec = tensor_spec.BoundedTensorSpec(
+        dtype=tf.int32, shape=(), minimum=0, maximum=2)
+    variable_collection = linear_agent.LinearBanditVariableCollection(
+        context_dim=2, num_actions=3)
+    with self.assertRaisesRegexp(ValueError, r'must hold the cached inverse'):
+      linear_agent.LinearBanditAgent(
+          exploration_policy=linear_agent.ExplorationPolicy.linear_ucb_policy,
+          time_step_spec=time_step_spec,
+          action_spec=action_spec,
+          variable_collection=variable_collection,
+          use_cached_inverse=True)
+
   @test_cases()
   def testLinearAgentUpdateWithBias(self,
                                     batch_size,
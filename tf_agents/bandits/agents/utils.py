@@ -48,6 +48,41 @@ def sum_reward_weighted_observations(r, x):
   return tf.reduce_sum(tf.reshape(r, [batch_size, 1]) * x, axis=0)
 
 
+def sum_outer_products_and_weighted_observations_per_arm(r, x, actions,
+                                                          num_actions):
+  """Calculates the updates of `A`, `b` and the sample counts of every arm.
+
+  This is the batched version of computing, for every arm `k` separately,
+  `x_k^T x_k` and `sum_reward_weighted_observations(r_k, x_k)` where `x_k` and
+  `r_k` are the observations and rewards whose action is `k`. All arms are
+  updated with one segment sum, without building per-arm masks.
+
+  Args:
+    r: a `Tensor` of shape [`batch_size`]. This is the rewards of the batched
+      observations.
+    x: a `Tensor` of shape [`batch_size`, `context_dim`]. This is the matrix
+      with the (batched) observations.
+    actions: an int `Tensor` of shape [`batch_size`] with values in
+      [0, `num_actions`).
+    num_actions: (int) the number of actions (arms).
+
+  Returns:
+    A tuple of `Tensor`s `(cov_matrix_updates, data_vector_updates,
+    num_samples)` with shapes [`num_actions`, `context_dim`, `context_dim`],
+    [`num_actions`, `context_dim`] and [`num_actions`].
+  """
+  r = tf.reshape(r, [-1])
+  actions = tf.reshape(actions, [-1])
+  outer_products = tf.einsum('bi,bj->bij', x, x)
+  cov_matrix_updates = tf.math.unsorted_segment_sum(
+      outer_products, actions, num_actions)
+  data_vector_updates = tf.math.unsorted_segment_sum(
+      tf.expand_dims(r, axis=-1) * x, actions, num_actions)
+  num_samples = tf.math.unsorted_segment_sum(
+      tf.ones_like(r), actions, num_actions)
+  return cov_matrix_updates, data_vector_updates, num_samples
+
+
 def get_num_actions_from_tensor_spec(action_spec):
   """Validates `action_spec` and returns number of actions.
 
@@ -82,6 +82,23 @@ class UtilsTest(tf.test.TestCase, parameterized.TestCase):
     expected_b_update_array = np.zeros([context_dim], dtype=np.float32)
     self.assertAllClose(expected_b_update_array, self.evaluate(b_update))
 
+  @test_cases()
+  def testPerArmUpdates(self, batch_size, context_dim):
+    num_actions = 3
+    r_array = np.random.rand(batch_size).astype(np.float32)
+    x_array = np.random.rand(batch_size, context_dim).astype(np.float32)
+    actions = np.random.randint(num_actions, size=batch_size)
+    cov_updates, data_updates, num_samples = self.evaluate(
+        utils.sum_outer_products_and_weighted_observations_per_arm(
+            r_array, x_array, actions, num_actions))
+    for k in range(num_actions):
+      x_k = x_array[actions == k]
+      r_k = r_array[actions == k]
+      self.assertAllClose(cov_updates[k], np.matmul(x_k.T, x_k))
+      self.assertAllClose(data_updates[k],
+                          np.sum(r_k[:, np.newaxis] * x_k, axis=0))
+      self.assertEqual(num_samples[k], np.sum(actions == k))
+
   def testLaplacian1D(self):
     action_spec = tensor_spec.BoundedTensorSpec(
         dtype=tf.int32, shape=(), minimum=0, maximum=4)
@@ -30,9 +30,33 @@ from tf_agents.bandits.agents import utils
 from tf_agents.bandits.environments import wheel_py_environment
 
 
+def batched_fn(fn):
+  """Marks `fn` as operating on whole batches.
+
+  Bandit Python environments check for the `batched` attribute set here and
+  prefer calling such functions once per batch instead of once per sample. See
+  `StationaryStochasticPyEnvironment` and
+  `StationaryStochasticPerArmPyEnvironment` for the expected signatures.
+
+  Args:
+    fn: A function or callable object that accepts attributes.
+
+  Returns:
+    `fn` itself, with `fn.batched` set to `True`.
+  """
+  fn.batched = True
+  return fn
+
+
 @gin.configurable
 class LinearNormalReward(object):
-  """A class that acts as linear reward function when called."""
+  """A class that acts as linear reward function when called.
+
+  It accepts a single observation as well as a batch of observations, so it is
+  marked as `batched`.
+  """
+
+  batched = True
 
   def __init__(self, theta, sigma):
     self.theta = theta
@@ -42,11 +66,13 @@ class LinearNormalReward(object):
     """Outputs reward given observation.
 
     Args:
-      x: Observation vector.
+      x: Observation vector, or a batch of observations with shape
+        [batch_size, context_dim].
       enable_noise: Whether to add normal noise to the reward or not.
 
     Returns:
-      A scalar value: the reward.
+      A scalar value: the reward. For batched observations, an array of shape
+      [batch_size] with one reward per observation.
     """
     mu = np.dot(x, self.theta)
     if enable_noise:
@@ -70,19 +70,41 @@ class StationaryStochasticPerArmPyEnvironment(
       reward_fn: A function that generates a reward when called with an
         observation.
       batch_size: The batch size.
+
+    Any of the three functions can instead be marked as batched (see
+    `environment_utilities.batched_fn`), in which case it is called once per
+    step for the whole batch: `global_context_sampling_fn(batch_size)` returns
+    a [batch_size, global_dim] array, `arm_context_sampling_fn(batch_size,
+    num_actions)` returns a [batch_size, num_actions, arm_dim] array, and
+    `reward_fn` is called with the [batch_size, global_dim + arm_dim]
+    concatenated observations of the chosen arms and returns [batch_size]
+    rewards.
     """
     self._global_context_sampling_fn = global_context_sampling_fn
     self._arm_context_sampling_fn = arm_context_sampling_fn
     self._num_actions = num_actions
     self._reward_fn = reward_fn
     self._batch_size = batch_size
-
+    self._batched_global_context_sampling = getattr(
+        global_context_sampling_fn, 'batched', False)
+    self._batched_arm_context_sampling = getattr(
+        arm_context_sampling_fn, 'batched', False)
+    self._batched_reward = getattr(reward_fn, 'batched', False)
+
+    if self._batched_global_context_sampling:
+      example_global_context = np.asarray(global_context_sampling_fn(1))[0]
+    else:
+      example_global_context = global_context_sampling_fn()
+    if self._batched_arm_context_sampling:
+      example_arm_context = np.asarray(arm_context_sampling_fn(1, 1))[0, 0]
+    else:
+      example_arm_context = arm_context_sampling_fn()
     observation_spec = {
         GLOBAL_KEY:
-            array_spec.ArraySpec.from_array(global_context_sampling_fn()),
+            array_spec.ArraySpec.from_array(example_global_context),
         PER_ARM_KEY:
             array_spec.add_outer_dims_nest(
-                array_spec.ArraySpec.from_array(arm_context_sampling_fn()),
+                array_spec.ArraySpec.from_array(example_arm_context),
                 (num_actions,))
     }
 
@@ -104,12 +126,21 @@ class StationaryStochasticPerArmPyEnvironment(
     return self._batch_size
 
   def _observe(self):
-    global_obs = np.stack(
-        [self._global_context_sampling_fn() for _ in range(self._batch_size)])
-    arm_obs = np.reshape([
-        self._arm_context_sampling_fn()
-        for _ in range(self._batch_size * self._num_actions)
-    ], (self._batch_size, self._num_actions, -1))
+    if self._batched_global_context_sampling:
+      global_obs = np.asarray(
+          self._global_context_sampling_fn(self._batch_size))
+    else:
+      global_obs = np.stack([
+          self._global_context_sampling_fn() for _ in range(self._batch_size)
+      ])
+    if self._batched_arm_context_sampling:
+      arm_obs = np.asarray(
+          self._arm_context_sampling_fn(self._batch_size, self._num_actions))
+    else:
+      arm_obs = np.reshape([
+          self._arm_context_sampling_fn()
+          for _ in range(self._batch_size * self._num_actions)
+      ], (self._batch_size, self._num_actions, -1))
     self._observation = {GLOBAL_KEY: global_obs, PER_ARM_KEY: arm_obs}
     return self._observation
 
@@ -119,6 +150,9 @@ class StationaryStochasticPerArmPyEnvironment(
     global_obs = self._observation[GLOBAL_KEY]
     batch_size_range = range(self.batch_size)
     arm_obs = self._observation[PER_ARM_KEY][batch_size_range, action, :]
+    if self._batched_reward:
+      return np.asarray(
+          self._reward_fn(np.concatenate((global_obs, arm_obs), axis=-1)))
     reward = np.stack([
         self._reward_fn(np.concatenate((global_obs[b, :], arm_obs[b, :])))
         for b in batch_size_range
@@ -21,6 +21,7 @@ from __future__ import print_function
 
 import numpy as np
 import tensorflow as tf  # pylint: disable=g-explicit-tensorflow-version-import
+from tf_agents.bandits.environments import environment_utilities
 from tf_agents.bandits.environments import stationary_stochastic_per_arm_py_environment as sspe
 from tf_agents.policies import random_py_policy
 from tf_agents.specs import array_spec
@@ -88,6 +89,46 @@ class StationaryStochasticPerArmBanditPyEnvironmentTest(tf.test.TestCase):
       self.assertAllLess(action, 6)
       time_step = env.step(action)
 
+  def test_with_batched_sampling_and_reward_fns(self):
+
+    @environment_utilities.batched_fn
+    def _global_context_sampling_fn(batch_size):
+      return np.random.randint(-10, 10, [batch_size, 4])
+
+    @environment_utilities.batched_fn
+    def _arm_context_sampling_fn(batch_size, num_actions):
+      return np.random.randint(-2, 3, [batch_size, num_actions, 5])
+
+    theta = np.arange(9)
+    reward_fn = environment_utilities.batched_fn(lambda x: np.dot(x, theta))
+
+    env = sspe.StationaryStochasticPerArmPyEnvironment(
+        _global_context_sampling_fn,
+        _arm_context_sampling_fn,
+        6,
+        reward_fn,
+        batch_size=3)
+    time_step_spec = env.time_step_spec()
+    self.assertEqual(time_step_spec.observation[sspe.GLOBAL_KEY].shape, (4,))
+    self.assertEqual(time_step_spec.observation[sspe.PER_ARM_KEY].shape,
+                     (6, 5))
+
+    for _ in range(5):
+      time_step = env.reset()
+      self.assertTrue(
+          check_unbatched_time_step_spec(
+              time_step=time_step,
+              time_step_spec=time_step_spec,
+              batch_size=env.batch_size))
+
+      action = np.array([0, 5, 2], dtype=np.int32)
+      global_obs = time_step.observation[sspe.GLOBAL_KEY]
+      arm_obs = time_step.observation[sspe.PER_ARM_KEY][range(3), action]
+      expected_reward = np.dot(
+          np.concatenate((global_obs, arm_obs), axis=-1), theta)
+      time_step = env.step(action)
+      self.assertAllClose(time_step.reward, expected_reward)
+
 
 if __name__ == '__main__':
   tf.test.main()
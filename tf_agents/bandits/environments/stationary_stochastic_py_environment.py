@@ -49,13 +49,19 @@ class StationaryStochasticPyEnvironment(
       context_sampling_fn: A function that outputs a random 2d array or list of
         ints or floats, where the first dimension is batch size.
       reward_fns: A function that generates a (perhaps non-scalar) reward when
-        called with an observation.
+        called with an observation. If every reward function is marked as
+        batched (see `environment_utilities.batched_fn`), it is instead called
+        once per step with all the observations of the rows that chose its
+        arm, stacked into a [num_rows, ...] array, and must return the
+        [num_rows, ...] rewards.
       batch_size: The batch size. Must match the outer dimension of the output
         of context_sampling_fn.
     """
     self._context_sampling_fn = context_sampling_fn
     self._reward_fns = reward_fns
     self._num_actions = len(reward_fns)
+    self._batched_reward_fns = all(
+        getattr(fn, 'batched', False) for fn in reward_fns)
     self._batch_size = batch_size
 
     action_spec = array_spec.BoundedArraySpec(
@@ -73,7 +79,10 @@ class StationaryStochasticPyEnvironment(
       )
 
     # Figure out the reward spec.
-    example_reward = np.asarray(reward_fns[0](example_observation[0]))
+    if self._batched_reward_fns:
+      example_reward = np.asarray(reward_fns[0](example_observation))[0]
+    else:
+      example_reward = np.asarray(reward_fns[0](example_observation[0]))
     reward_spec = array_spec.ArraySpec(
         example_reward.shape, np.float32, name='reward')
 
@@ -94,6 +103,20 @@ class StationaryStochasticPyEnvironment(
   def _apply_action(self, action):
     if len(action) != self.batch_size:
       raise ValueError('Number of actions must match batch size.')
+    if self._batched_reward_fns:
+      return self._apply_action_batched(np.asarray(action))
     reward = np.stack(
         [self._reward_fns[a](o) for a, o in zip(action, self._observation)])
     return reward
+
+  def _apply_action_batched(self, action):
+    """Calls every batched reward function once, on the rows of its arm."""
+    reward = None
+    for a in np.unique(action):
+      rows = action == a
+      arm_reward = np.asarray(self._reward_fns[a](self._observation[rows]))
+      if reward is None:
+        reward = np.zeros((self.batch_size,) + arm_reward.shape[1:],
+                          dtype=arm_reward.dtype)
+      reward[rows] = arm_reward
+    return reward
@@ -21,6 +21,7 @@ from __future__ import print_function
 
 import numpy as np
 import tensorflow as tf  # pylint: disable=g-explicit-tensorflow-version-import
+from tf_agents.bandits.environments import environment_utilities
 from tf_agents.bandits.environments import stationary_stochastic_py_environment as sspe
 from tf_agents.policies import random_py_policy
 from tf_agents.specs import array_spec
@@ -152,6 +153,24 @@ class StationaryStochasticBanditPyEnvironmentTest(tf.test.TestCase):
     time_step = env.step([2, 3])
     self.assertAllEqual(time_step.reward, [17, 24])
 
+  def test_deterministic_with_batched_reward_fns(self):
+
+    def _context_sampling_fn():
+      return np.array([[4, 3], [4, 3], [5, 6]])
+
+    reward_fns = [
+        environment_utilities.batched_fn(LinearDeterministicReward(theta))
+        for theta in ([0, 1], [1, 2], [2, 3], [3, 4])
+    ]
+    env = sspe.StationaryStochasticPyEnvironment(
+        _context_sampling_fn, reward_fns, batch_size=3)
+    time_step = env.reset()
+    time_step = env.step(np.array([0, 1, 0]))
+    self.assertAllEqual(time_step.reward, [3, 10, 6])
+    env.reset()
+    time_step = env.step(np.array([3, 3, 2]))
+    self.assertAllEqual(time_step.reward, [24, 24, 28])
+
   def test_non_scalar_rewards(self):
 
     def _context_sampling_fn():
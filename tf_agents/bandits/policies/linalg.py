@@ -208,3 +208,57 @@ def update_inverse(a_inv, x):
 
   a_inv_update = tf.cond(tf.equal(batch_size, 0), true_fn, false_fn)
   return a_inv_update
+
+
+def update_inverse_per_arm(a_inv, x, actions):
+  """Updates the inverses of all arms with rank-1 Sherman-Morrison updates.
+
+  Given matrices `A_k` of size d-by-d for every arm `k` and observations `x`
+  with their actions, this function computes the updates of the inverses of
+  `B_k = A_k + X_k^T X_k`, where `X_k` holds the rows of `x` whose action is
+  `k`, assuming that the inverses of all `A_k` are available.
+
+  The rows are grouped by arm and folded in one at a time. Round `j` applies
+  the `j`-th row of every arm that has one, gathering only the inverses of
+  those arms, so the whole update costs O(batch_size * d^2) compute and
+  O(min(num_actions, batch_size) * d^2) extra memory.
+
+  Args:
+    a_inv: a `Tensor` of shape [`num_actions`, `d`, `d`]. These are the current
+      inverses of the SYMMETRIC matrices `A_k`.
+    x: a `Tensor` of shape [`batch_size`, `d`].
+    actions: an int `Tensor` of shape [`batch_size`] with values in
+      [0, `num_actions`).
+
+  Returns:
+    The updates that need to be added to `a_inv` to compute the inverses. Arms
+    without observations get a zero update.
+  """
+  num_actions = tf.compat.dimension_value(a_inv.shape[0]) or tf.shape(a_inv)[0]
+  actions = tf.cast(tf.reshape(actions, [-1]), tf.int32)
+  order = tf.argsort(actions, stable=True)
+  sorted_actions = tf.gather(actions, order)
+  sorted_x = tf.gather(x, order)
+  # Rank of every row among the rows of its arm.
+  positions = tf.range(tf.shape(sorted_actions)[0])
+  first_positions = tf.math.unsorted_segment_min(positions, sorted_actions,
+                                                 num_actions)
+  ranks = positions - tf.gather(first_positions, sorted_actions)
+  num_rounds = tf.reduce_max(tf.concat([ranks + 1, [0]], axis=0))
+
+  def body(j, b_inv):
+    indices = tf.reshape(tf.where(tf.equal(ranks, j)), [-1])
+    arms = tf.gather(sorted_actions, indices)
+    x_j = tf.gather(sorted_x, indices)
+    b_inv_j = tf.gather(b_inv, arms)
+    # Since the inverses are symmetric, `x B^-1` equals `B^-1 x`.
+    b_inv_x = tf.einsum('kij,kj->ki', b_inv_j, x_j)
+    denominator = 1. + tf.reduce_sum(x_j * b_inv_x, axis=-1)
+    b_inv_j -= (tf.einsum('ki,kj->kij', b_inv_x, b_inv_x) /
+                denominator[:, tf.newaxis, tf.newaxis])
+    return j + 1, tf.tensor_scatter_nd_update(
+        b_inv, tf.expand_dims(arms, axis=-1), b_inv_j)
+
+  _, b_inv = tf.while_loop(
+      lambda j, _: j < num_rounds, body, [tf.constant(0), a_inv])
+  return b_inv - a_inv
@@ -80,6 +80,30 @@ class LinalgTest(tf.test.TestCase, parameterized.TestCase):
     self.assertAllClose(expected_a_inv_update_array,
                         self.evaluate(a_inv_update))
 
+  @test_cases()
+  def testAInvUpdatePerArm(self, batch_size, context_dim):
+    num_actions = 3
+    a_array = 2 * np.eye(context_dim) + np.array(
+        range(context_dim * context_dim)).reshape((context_dim, context_dim))
+    a_array = a_array + a_array.T
+    a_arrays = [a_array + k * np.eye(context_dim) for k in range(num_actions)]
+    a_inv_arrays = np.stack([np.linalg.inv(a) for a in a_arrays])
+    x_array = np.array(range(batch_size * context_dim)).reshape(
+        (batch_size, context_dim))
+    actions_array = np.arange(batch_size) % 2
+    expected_a_inv_updated_array = []
+    for k in range(num_actions):
+      x_k = x_array[actions_array == k]
+      expected_a_inv_updated_array.append(
+          np.linalg.inv(a_arrays[k] + np.matmul(np.transpose(x_k), x_k)))
+
+    a_inv = tf.constant(a_inv_arrays, dtype=tf.float32)
+    x = tf.constant(x_array, dtype=tf.float32, shape=[batch_size, context_dim])
+    actions = tf.constant(actions_array, dtype=tf.int32)
+    a_inv_update = linalg.update_inverse_per_arm(a_inv, x, actions)
+    self.assertAllClose(np.stack(expected_a_inv_updated_array),
+                        self.evaluate(a_inv + a_inv_update))
+
 
 def cg_test_cases():
   return parameterized.named_parameters(
@@ -59,7 +59,8 @@ class LinearBanditPolicy(tf_policy.Base):
                emit_policy_info=(),
                emit_log_probability=False,
                observation_and_action_constraint_splitter=None,
-               name=None):
+               name=None,
+               inverse_cov_matrix=None):
     """Initializes `LinearBanditPolicy`.
 
     The `a` and `b` arguments may be either `Tensor`s or `tf.Variable`s.
@@ -97,6 +98,11 @@ class LinearBanditPolicy(tf_policy.Base):
         input, and should output `TensorSpec` objects for the observation and
         mask.
       name: The name of this policy.
+      inverse_cov_matrix: optional `Tensor` or `tf.Variable` of shape
+        [num_actions, context_dim, context_dim] holding the inverses of
+        `cov_matrix[k] + tikhonov_weight * I` for every arm. If set, it is used
+        instead of solving a linear system per arm, so scoring all arms is a
+        single batched matmul. It must be kept in sync with `cov_matrix`.
     """
     if not isinstance(cov_matrix, (list, tuple)):
       raise ValueError('cov_matrix must be a list of matrices (Tensors).')
@@ -123,6 +129,8 @@ class LinearBanditPolicy(tf_policy.Base):
       # We do not have a way to calculate log probabilities for TS yet.
       emit_log_probability = False
 
+    self._inverse_cov_matrix = inverse_cov_matrix
+
     self._alpha = alpha
     self._use_eigendecomp = False
     if eig_matrix:
@@ -173,6 +181,13 @@ class LinearBanditPolicy(tf_policy.Base):
                        'Got {} for `data_vector`.'.format(
                            self._context_dim, data_vector_dim))
 
+    if inverse_cov_matrix is not None:
+      expected_shape = [self._num_actions, self._context_dim, self._context_dim]
+      if not inverse_cov_matrix.shape.is_compatible_with(expected_shape):
+        raise ValueError('The shape of `inverse_cov_matrix` must be {}. '
+                         'Got {}.'.format(expected_shape,
+                                          inverse_cov_matrix.shape))
+
     self._dtype = self._data_vector[0].dtype
     self._emit_policy_info = emit_policy_info
     predicted_rewards_mean = ()
@@ -199,7 +214,8 @@ class LinearBanditPolicy(tf_policy.Base):
 
   def _variables(self):
     all_vars = (self._cov_matrix + self._data_vector + self._num_samples +
-                list(self._eig_matrix) + list(self._eig_vals))
+                list(self._eig_matrix) + list(self._eig_vals) +
+                [self._inverse_cov_matrix])
     return [v for v in all_vars if isinstance(v, tf.Variable)]
 
   def _distribution(self, time_step, policy_state):
@@ -224,46 +240,37 @@ class LinearBanditPolicy(tf_policy.Base):
           [None, self._context_dim], observation.shape.as_list()))
     observation = tf.reshape(observation, [-1, self._context_dim])
 
-    est_rewards = []
-    confidence_intervals = []
-    for k in range(self._num_actions):
-      if self._use_eigendecomp:
-        q_t_b = tf.matmul(
-            self._eig_matrix[k],
-            tf.linalg.matrix_transpose(observation),
-            transpose_a=True)
-        lambda_inv = tf.divide(
-            tf.ones_like(self._eig_vals[k]),
-            self._eig_vals[k] + self._tikhonov_weight)
-        a_inv_x = tf.matmul(
-            self._eig_matrix[k], tf.einsum('j,jk->jk', lambda_inv, q_t_b))
-      else:
-        a_inv_x = linalg.conjugate_gradient_solve(
-            self._cov_matrix[k] +
-            self._tikhonov_weight * tf.eye(
-                self._context_dim, dtype=self._dtype),
-            tf.linalg.matrix_transpose(observation))
-      est_mean_reward = tf.einsum('j,jk->k', self._data_vector[k], a_inv_x)
-      est_rewards.append(est_mean_reward)
-
-      ci = tf.reshape(
-          tf.linalg.tensor_diag_part(tf.matmul(observation, a_inv_x)),
-          [-1, 1])
-      confidence_intervals.append(ci)
+    # All the arms are scored at once: `a_inv_x[k]` holds
+    # `(A_k + tikhonov_weight * I)^-1 x^T` and has shape [context_dim, B].
+    if self._inverse_cov_matrix is not None:
+      a_inv_x = tf.einsum('kij,bj->kib', self._inverse_cov_matrix, observation)
+    elif self._use_eigendecomp:
+      eig_matrix = tf.stack(self._eig_matrix)
+      lambda_inv = tf.math.reciprocal(
+          tf.stack(self._eig_vals) + self._tikhonov_weight)
+      q_t_b = tf.einsum('kji,bj->kib', eig_matrix, observation)
+      a_inv_x = tf.einsum('kij,kjb->kib', eig_matrix,
+                          tf.expand_dims(lambda_inv, axis=-1) * q_t_b)
+    else:
+      a_inv_x = tf.stack([
+          linalg.conjugate_gradient_solve(
+              self._cov_matrix[k] +
+              self._tikhonov_weight * tf.eye(
+                  self._context_dim, dtype=self._dtype),
+              tf.linalg.matrix_transpose(observation))
+          for k in range(self._num_actions)
+      ])
+    # Both have shape [B, num_actions]. The confidence intervals are the
+    # quadratic forms `x^T (A_k + tikhonov_weight * I)^-1 x`, computed rowwise.
+    est_rewards = tf.einsum('kj,kjb->bk', tf.stack(self._data_vector), a_inv_x)
+    confidence_intervals = tf.einsum('bj,kjb->bk', observation, a_inv_x)
 
     if self._exploration_strategy == ExplorationStrategy.optimistic:
-      optimistic_estimates = [
-          tf.reshape(mean_reward, [-1, 1]) + self._alpha * tf.sqrt(confidence)
-          for mean_reward, confidence in zip(est_rewards, confidence_intervals)
-      ]
-      # Keeping the batch dimension during the squeeze, even if batch_size == 1.
-      rewards_for_argmax = tf.squeeze(
-          tf.stack(optimistic_estimates, axis=-1), axis=[1])
+      rewards_for_argmax = (
+          est_rewards + self._alpha * tf.sqrt(confidence_intervals))
     elif self._exploration_strategy == ExplorationStrategy.sampling:
       mu_sampler = tfd.Normal(
-          loc=tf.stack(est_rewards, axis=-1),
-          scale=self._alpha *
-          tf.sqrt(tf.squeeze(tf.stack(confidence_intervals, axis=-1), axis=1)))
+          loc=est_rewards, scale=self._alpha * tf.sqrt(confidence_intervals))
       rewards_for_argmax = mu_sampler.sample()
     else:
       raise ValueError('Exploraton strategy %s not implemented.' %
@@ -282,7 +289,7 @@ class LinearBanditPolicy(tf_policy.Base):
             rewards_for_argmax if policy_utilities.InfoFields
             .PREDICTED_REWARDS_SAMPLED in self._emit_policy_info else ()),
         predicted_rewards_mean=(
-            tf.stack(est_rewards, axis=-1) if policy_utilities.InfoFields
+            est_rewards if policy_utilities.InfoFields
             .PREDICTED_REWARDS_MEAN in self._emit_policy_info else ()))
 
     return policy_step.PolicyStep(
@@ -359,6 +359,63 @@ class LinearBanditPolicyTest(parameterized.TestCase, test_utils.TestCase):
         [batch_size])
     self.assertAllEqual(actions_.reshape([batch_size]), actions_numpy)
 
+  @test_cases()
+  def testComparisonWithNumpyUsingInverse(self, batch_size,
+                                          exploration_strategy):
+    inverse_cov_matrix = tf.linalg.inv(
+        tf.stack(self._a) + tf.eye(self._obs_dim, dtype=tf.float32))
+    policy = linear_policy.LinearBanditPolicy(
+        self._action_spec,
+        self._a,
+        self._b,
+        self._num_samples_per_arm,
+        self._time_step_spec,
+        exploration_strategy,
+        inverse_cov_matrix=inverse_cov_matrix,
+        emit_policy_info=(policy_utilities.InfoFields.PREDICTED_REWARDS_MEAN,))
+
+    action_step = policy.action(self._time_step_batch(batch_size=batch_size))
+    self.assertEqual(action_step.action.shape.as_list(), [batch_size])
+    actions_, p_info = self.evaluate([action_step.action, action_step.info])
+
+    observation_numpy = np.array(
+        range(batch_size * self._obs_dim), dtype=np.float32).reshape(
+            [batch_size, self._obs_dim])
+
+    p_values = []
+    predicted_rewards_expected = []
+    for k in range(self._num_actions):
+      a_inv = np.linalg.inv(self._a_numpy[k] + np.eye(self._obs_dim))
+      theta = np.matmul(
+          a_inv, self._b_numpy[k].reshape([self._obs_dim, 1]))
+      confidence_intervals = np.sqrt(np.diag(
+          np.matmul(observation_numpy,
+                    np.matmul(a_inv, np.transpose(observation_numpy)))))
+      est_mean_reward = np.matmul(observation_numpy, theta)
+      predicted_rewards_expected.append(est_mean_reward)
+      p_values.append(est_mean_reward +
+                      self._alpha * confidence_intervals.reshape([-1, 1]))
+
+    actions_numpy = np.argmax(np.stack(p_values, axis=-1), axis=-1).reshape(
+        [batch_size])
+    self.assertAllEqual(actions_.reshape([batch_size]), actions_numpy)
+    self.assertAllClose(
+        p_info.predicted_rewards_mean,
+        np.stack(predicted_rewards_expected, axis=-1).reshape(
+            batch_size, self._num_actions))
+
+  def testInverseCovMatrixShapeMismatch(self):
+    with self.assertRaisesRegexp(
+        ValueError, r'The shape of `inverse_cov_matrix` must be'):
+      linear_policy.LinearBanditPolicy(
+          self._action_spec,
+          self._a,
+          self._b,
+          self._num_samples_per_arm,
+          self._time_step_spec,
+          inverse_cov_matrix=tf.zeros(
+              [self._num_actions - 1, self._obs_dim, self._obs_dim]))
+
   @test_cases_with_strategy()
   def testPredictedRewards(self, batch_size, exploration_strategy):
     policy = linear_policy.LinearBanditPolicy(
@@ -0,0 +1,80 @@
+# coding=utf-8
+# Copyright 2018 The TF-Agents Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Lint as: python2, python3
+"""Benchmarks for the categorical projection of CategoricalDqnAgent."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import time
+
+from six.moves import range
+import tensorflow as tf  # pylint: disable=g-explicit-tensorflow-version-import
+from tf_agents.agents.categorical_dqn import categorical_dqn_agent
+
+
+class CategoricalProjectionBenchmark(tf.test.Benchmark):
+  """Latency of `project_distribution` vs. the O(num_atoms**2) reference."""
+
+  def _run(self, name, project_fn, num_atoms, batch_size=512, num_iters=50):
+    """Times `project_fn` on a C51-like batch and reports the average latency.
+
+    Args:
+      name: Name of the benchmark.
+      project_fn: A projection function with the signature of
+        `project_distribution`.
+      num_atoms: Number of atoms of the target support.
+      batch_size: Number of distributions projected per call.
+      num_iters: Number of calls to time.
+    """
+    target_support = tf.linspace(-10.0, 10.0, num_atoms)
+    rewards = tf.random.uniform([batch_size, 1], -1.0, 1.0)
+    supports = rewards + 0.99 * target_support[None, :]
+    weights = tf.nn.softmax(tf.random.normal([batch_size, num_atoms]))
+    project = tf.function(project_fn)
+    # Trace and warm up.
+    project(supports, weights, target_support).numpy()
+
+    start_time = time.time()
+    for _ in range(num_iters):
+      project(supports, weights, target_support).numpy()
+    wall_time = (time.time() - start_time) / num_iters
+    print('{}: avg projection time {:.6f}s'.format(name, wall_time))
+    self.report_benchmark(
+        name=name,
+        iters=num_iters,
+        wall_time=wall_time,
+        extras={'num_atoms': num_atoms, 'batch_size': batch_size})
+
+  def _run_both(self, num_atoms):
+    self._run('scatter_{}_atoms'.format(num_atoms),
+              categorical_dqn_agent.project_distribution, num_atoms)
+    self._run('reference_{}_atoms'.format(num_atoms),
+              categorical_dqn_agent.project_distribution_reference, num_atoms)
+
+  def benchmark_51_atoms(self):
+    self._run_both(51)
+
+  def benchmark_101_atoms(self):
+    self._run_both(101)
+
+  def benchmark_201_atoms(self):
+    self._run_both(201)
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -0,0 +1,114 @@
+# coding=utf-8
+# Copyright 2018 The TF-Agents Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Lint as: python2, python3
+"""Benchmarks for the step latency of ParallelPyEnvironment."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import functools
+import time
+
+import numpy as np
+from six.moves import range
+import tensorflow as tf  # pylint: disable=g-explicit-tensorflow-version-import
+from tf_agents.environments import parallel_py_environment
+from tf_agents.environments import random_py_environment
+from tf_agents.specs import array_spec
+
+
+class ParallelPyEnvironmentBenchmark(tf.test.Benchmark):
+  """Step latency of small, fast environments for each transport."""
+
+  def _run(self,
+           name,
+           num_envs=8,
+           observation_shape=(4,),
+           num_steps=1000,
+           attribute_names=None,
+           **env_kwargs):
+    """Steps a `ParallelPyEnvironment` and reports the average step latency.
+
+    Args:
+      name: Name of the benchmark.
+      num_envs: Number of environments.
+      observation_shape: Shape of the uint8 observations.
+      num_steps: Number of steps to time.
+      attribute_names: If given, these methods are called after each step. They
+        are called in separate round-trips unless `batched_read` is in
+        `env_kwargs`.
+      **env_kwargs: Keyword arguments for `ParallelPyEnvironment`, and
+        `batched_read` to read the attributes with `step_and_read`.
+    """
+    batched_read = env_kwargs.pop('batched_read', False)
+    observation_spec = array_spec.ArraySpec(observation_shape, np.uint8)
+    action_spec = array_spec.BoundedArraySpec((), np.int32, 0, 1)
+    constructor = functools.partial(
+        random_py_environment.RandomPyEnvironment,
+        observation_spec,
+        action_spec,
+        episode_end_probability=0.0)
+    env = parallel_py_environment.ParallelPyEnvironment(
+        [constructor] * num_envs, **env_kwargs)
+    actions = np.zeros((num_envs,), np.int32)
+    env.reset()
+
+    start_time = time.time()
+    for _ in range(num_steps):
+      if attribute_names and batched_read:
+        env.step_and_read(actions, attribute_names)
+      else:
+        env.step(actions)
+        # One extra round-trip per process and attribute.
+        for process_env in env._envs if attribute_names else ():  # pylint: disable=protected-access
+          for attribute_name in attribute_names:
+            process_env.call(attribute_name)()
+    wall_time = (time.time() - start_time) / num_steps
+    env.close()
+    print('{}: avg step time {:.6f}s'.format(name, wall_time))
+    self.report_benchmark(
+        name=name,
+        iters=num_steps,
+        wall_time=wall_time,
+        metrics=[{'name': 'steps_per_second', 'value': 1 / wall_time}])
+
+  def benchmark_pipe(self):
+    self._run('pipe')
+
+  def benchmark_pipe_flatten(self):
+    self._run('pipe_flatten', flatten=True)
+
+  def benchmark_shared_memory(self):
+    self._run('shared_memory', shared_memory=True)
+
+  def benchmark_pipe_atari_observations(self):
+    self._run('pipe_atari', observation_shape=(84, 84, 4), num_steps=200)
+
+  def benchmark_shared_memory_atari_observations(self):
+    self._run('shared_memory_atari', observation_shape=(84, 84, 4),
+              num_steps=200, shared_memory=True)
+
+  def benchmark_step_then_read(self):
+    self._run('step_then_read', attribute_names=['current_time_step'])
+
+  def benchmark_step_and_read(self):
+    self._run('step_and_read', attribute_names=['current_time_step'],
+              batched_read=True)
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -0,0 +1,103 @@
+# coding=utf-8
+# Copyright 2018 The TF-Agents Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Lint as: python2, python3
+"""Benchmarks for the scan and associative scan versions of value_ops."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import functools
+import time
+
+import numpy as np
+from six.moves import range
+import tensorflow as tf  # pylint: disable=g-explicit-tensorflow-version-import
+from tf_agents.utils import value_ops
+
+
+class ValueOpsBenchmark(tf.test.Benchmark):
+  """Latency of discounted returns and GAE on PPO-sized rollouts."""
+
+  def _run(self, name, fn, num_time_steps, batch_size=64, num_iters=50):
+    """Times `fn` on a random rollout and reports the average latency.
+
+    Args:
+      name: Name of the benchmark.
+      fn: A function with the signature of `generalized_advantage_estimation`,
+        returning a Tensor or an `np.array`.
+      num_time_steps: Length of the rollout.
+      batch_size: Number of rollouts.
+      num_iters: Number of calls to time.
+    """
+    shape = [num_time_steps, batch_size]
+    values = np.random.rand(*shape).astype(np.float32)
+    final_value = np.random.rand(batch_size).astype(np.float32)
+    discounts = np.full(shape, 0.99, dtype=np.float32)
+    rewards = np.random.rand(*shape).astype(np.float32)
+    # Trace and warm up.
+    np.asarray(fn(values, final_value, discounts, rewards))
+
+    start_time = time.time()
+    for _ in range(num_iters):
+      np.asarray(fn(values, final_value, discounts, rewards))
+    wall_time = (time.time() - start_time) / num_iters
+    print('{}: avg time {:.6f}s'.format(name, wall_time))
+    self.report_benchmark(
+        name=name,
+        iters=num_iters,
+        wall_time=wall_time,
+        extras={'num_time_steps': num_time_steps, 'batch_size': batch_size})
+
+  def _run_gae(self, num_time_steps):
+    gae = functools.partial(
+        value_ops.generalized_advantage_estimation, td_lambda=0.95)
+    self._run('gae_scan_{}_steps'.format(num_time_steps),
+              tf.function(gae), num_time_steps)
+    self._run('gae_associative_scan_{}_steps'.format(num_time_steps),
+              tf.function(functools.partial(gae, use_associative_scan=True)),
+              num_time_steps)
+    self._run('gae_numpy_{}_steps'.format(num_time_steps),
+              functools.partial(
+                  value_ops.numpy_generalized_advantage_estimation,
+                  td_lambda=0.95),
+              num_time_steps)
+
+  def _run_discounted_return(self, num_time_steps):
+    def discounted_return(values, final_value, discounts, rewards, **kwargs):
+      del values  # Unused.
+      return value_ops.discounted_return(rewards, discounts, final_value,
+                                         **kwargs)
+    self._run('discounted_return_scan_{}_steps'.format(num_time_steps),
+              tf.function(discounted_return), num_time_steps)
+    self._run(
+        'discounted_return_associative_scan_{}_steps'.format(num_time_steps),
+        tf.function(
+            functools.partial(discounted_return, use_associative_scan=True)),
+        num_time_steps)
+
+  def benchmark_gae_128_steps(self):
+    self._run_gae(128)
+
+  def benchmark_gae_2048_steps(self):
+    self._run_gae(2048)
+
+  def benchmark_discounted_return_2048_steps(self):
+    self._run_discounted_return(2048)
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -20,12 +20,21 @@ from __future__ import division
 from __future__ import print_function
 
 import numpy as np
+import tensorflow as tf  # pylint: disable=g-explicit-tensorflow-version-import
 from tf_agents.drivers import driver
+from tf_agents.trajectories import time_step as ts
 from tf_agents.trajectories import trajectory
 
 
 class PyDriver(driver.Driver):
-  """A driver that runs a python policy in a python environment."""
+  """A driver that runs a python policy in a python environment.
+
+  If the environment resets finished episodes itself (`env.auto_reset` is
+  True, e.g. `BatchedPyEnvironment(..., auto_reset=True)`), the `FIRST` time
+  steps returned by `step` are turned back into the `LAST` time steps of the
+  finished episodes, using `env.get_info()['final_observation']`, before they
+  are passed to observers. No boundary transitions are generated in that case.
+  """
 
   def __init__(self,
                env,
@@ -64,6 +73,7 @@ class PyDriver(driver.Driver):
     super(PyDriver, self).__init__(env, policy, observers, transition_observers)
     self._max_steps = max_steps or np.inf
     self._max_episodes = max_episodes or np.inf
+    self._auto_reset = getattr(env, 'auto_reset', False)
 
   def run(self, time_step, policy_state=()):
     """Run policy in environment given initial time_step and policy_state.
@@ -80,17 +90,338 @@ class PyDriver(driver.Driver):
     while num_steps < self._max_steps and num_episodes < self._max_episodes:
       action_step = self.policy.action(time_step, policy_state)
       next_time_step = self.env.step(action_step.action)
+      if self._auto_reset:
+        transition_time_step = self._final_time_step(next_time_step)
+      else:
+        transition_time_step = next_time_step
 
-      traj = trajectory.from_transition(time_step, action_step, next_time_step)
+      traj = trajectory.from_transition(time_step, action_step,
+                                        transition_time_step)
       for observer in self._transition_observers:
-        observer((time_step, action_step, next_time_step))
+        observer((time_step, action_step, transition_time_step))
       for observer in self.observers:
         observer(traj)
 
       num_episodes += np.sum(traj.is_last())
-      num_steps += np.sum(~traj.is_boundary())
+      if self._auto_reset:
+        # Every action was applied in an environment, there are no boundaries.
+        num_steps += np.size(traj.step_type)
+      else:
+        num_steps += np.sum(~traj.is_boundary())
 
       time_step = next_time_step
       policy_state = action_step.state
 
     return time_step, policy_state
+
+  def _final_time_step(self, time_step):
+    """Returns the `LAST` time steps hidden by auto-reset `FIRST` steps."""
+    is_first = time_step.is_first()
+    if not np.any(is_first):
+      return time_step
+    final_observation = self.env.get_info()['final_observation']
+    return time_step._replace(
+        step_type=np.where(is_first, ts.StepType.LAST, time_step.step_type),
+        observation=final_observation)
+
+
+class AsyncPyDriver(driver.Driver):
+  """A driver that acts on whichever environments of a batch are ready first.
+
+  Uses the asynchronous `async_reset`/`send`/`recv` API of environments such as
+  `ParallelPyEnvironment`. Every iteration waits for the first `num_ready`
+  environments to finish their step, computes their actions and sends them
+  back, so collection speed follows the average environment instead of the
+  slowest one.
+
+  Observers receive trajectories with a batch dimension of `num_ready`. The
+  entries of consecutive batches generally belong to different environments,
+  so observers that keep per-environment state should be given as
+  `env_id_observers`, which are called with `(trajectory, env_ids)`.
+  """
+
+  def __init__(self,
+               env,
+               policy,
+               observers,
+               transition_observers=None,
+               env_id_observers=None,
+               max_steps=None,
+               max_episodes=None,
+               num_ready=None):
+    """A driver that acts on whichever environments of a batch are ready first.
+
+    Args:
+      env: A batched py_environment.Base environment supporting `async_reset`,
+        `send` and `recv`, e.g. a `ParallelPyEnvironment`.
+      policy: A py_policy.Base policy.
+      observers: A list of observers that are notified after every step
+        in the environment. Each observer is a callable(trajectory.Trajectory).
+      transition_observers: A list of observers that are updated after every
+        step in the environment. Each observer is a callable((TimeStep,
+        PolicyStep, NextTimeStep)). The transition is shaped just as
+        trajectories are for regular observers.
+      env_id_observers: A list of observers that are notified after every step
+        with the ids of the environments in the batch. Each observer is a
+        callable(trajectory.Trajectory, env_ids).
+      max_steps: Optional maximum number of steps for each run() call.
+        Also see below.  Default: 0.
+      max_episodes: Optional maximum number of episodes for each run() call.
+        At least one of max_steps or max_episodes must be provided. If both
+        are set, run() terminates when at least one of the conditions is
+        satisfied.  Default: 0.
+      num_ready: Number of environments to wait for in each iteration.
+        Defaults to `env.batch_size`.
+
+    Raises:
+      ValueError: If both max_steps and max_episodes are None.
+    """
+    max_steps = max_steps or 0
+    max_episodes = max_episodes or 0
+    if max_steps < 1 and max_episodes < 1:
+      raise ValueError(
+          'Either `max_steps` or `max_episodes` should be greater than 0.')
+
+    super(AsyncPyDriver, self).__init__(env, policy, observers,
+                                        transition_observers)
+    self._env_id_observers = env_id_observers or []
+    self._max_steps = max_steps or np.inf
+    self._max_episodes = max_episodes or np.inf
+    self._num_ready = num_ready or env.batch_size
+    # Last time step and action step of every environment, used to build the
+    # transition once the environment returns its next time step.
+    self._time_steps = None
+    self._action_steps = None
+    self._has_transition = np.zeros(env.batch_size, dtype=bool)
+    self._started = False
+
+  def run(self, policy_state=()):
+    """Run policy in the environments until `max_steps` or `max_episodes`.
+
+    The first call resets all environments asynchronously. Actions sent in the
+    last iteration of a call stay in flight and their results are picked up by
+    the next call.
+
+    Args:
+      policy_state: The initial policy_state for all environments, with a
+        batch dimension of `env.batch_size`.
+
+    Returns:
+      The final policy_state for all environments.
+    """
+    if not self._started:
+      self.env.async_reset()
+      self._started = True
+    policy_state = tf.nest.map_structure(np.array, policy_state)
+
+    num_steps = 0
+    num_episodes = 0
+    while num_steps < self._max_steps and num_episodes < self._max_episodes:
+      next_time_step, env_ids = self.env.recv(self._num_ready)
+
+      has_transition = self._has_transition[env_ids]
+      if np.any(has_transition):
+        transition_ids = env_ids[has_transition]
+        time_step = _gather_nest(self._time_steps, transition_ids)
+        action_step = _gather_nest(self._action_steps, transition_ids)
+        transition_time_step = _gather_nest(next_time_step, has_transition)
+
+        traj = trajectory.from_transition(time_step, action_step,
+                                          transition_time_step)
+        for observer in self._transition_observers:
+          observer((time_step, action_step, transition_time_step))
+        for observer in self.observers:
+          observer(traj)
+        for observer in self._env_id_observers:
+          observer(traj, transition_ids)
+
+        num_episodes += np.sum(traj.is_last())
+        num_steps += np.sum(~traj.is_boundary())
+
+      action_step = self.policy.action(
+          next_time_step, _gather_nest(policy_state, env_ids))
+      self.env.send(action_step.action, env_ids)
+
+      policy_state = _scatter_nest(policy_state, env_ids, action_step.state)
+      self._time_steps = self._scatter_stored(self._time_steps, env_ids,
+                                              next_time_step)
+      self._action_steps = self._scatter_stored(
+          self._action_steps, env_ids, action_step._replace(state=()))
+      self._has_transition[env_ids] = True
+
+    return policy_state
+
+  def _scatter_stored(self, stored, env_ids, values):
+    """Writes `values` into the rows `env_ids` of `stored`, allocating it."""
+    if stored is None:
+      stored = tf.nest.map_structure(
+          lambda v: np.zeros((self.env.batch_size,) + v.shape[1:], v.dtype),
+          values)
+    return _scatter_nest(stored, env_ids, values)
+
+
+class PipelinedPyDriver(driver.Driver):
+  """A driver that overlaps policy inference with environment steps.
+
+  Splits the batch of an environment supporting `send`/`recv` with `env_ids`,
+  such as `ParallelPyEnvironment`, into two fixed halves. While one half steps
+  in the worker processes, the policy computes the actions of the other half,
+  so neither the policy nor the environments wait for each other.
+
+  The transition of the first half is held until the one of the second half
+  arrives, so `observers` and `transition_observers` receive the same
+  full-batch trajectories as with `PyDriver`. `env_id_observers` are called
+  with `(trajectory, env_ids)` for each half as soon as it arrives.
+
+  `run()` stops after the same number of steps as `PyDriver.run`. When a limit
+  may be reached by the second half of a step, the next action of the first
+  half is only sent once that is known, so no step is taken past the limit.
+  """
+
+  def __init__(self,
+               env,
+               policy,
+               observers,
+               transition_observers=None,
+               env_id_observers=None,
+               max_steps=None,
+               max_episodes=None):
+    """A driver that overlaps policy inference with environment steps.
+
+    Args:
+      env: A batched py_environment.Base environment supporting `send` and
+        `recv(env_ids=...)`, e.g. a `ParallelPyEnvironment`, with a batch size
+        of at least 2.
+      policy: A py_policy.Base policy.
+      observers: A list of observers that are notified after every step
+        in the environment. Each observer is a callable(trajectory.Trajectory).
+      transition_observers: A list of observers that are updated after every
+        step in the environment. Each observer is a callable((TimeStep,
+        PolicyStep, NextTimeStep)). The transition is shaped just as
+        trajectories are for regular observers.
+      env_id_observers: A list of observers that are notified after every step
+        with the ids of the environments in the batch. Each observer is a
+        callable(trajectory.Trajectory, env_ids).
+      max_steps: Optional maximum number of steps for each run() call.
+        Also see below.  Default: 0.
+      max_episodes: Optional maximum number of episodes for each run() call.
+        At least one of max_steps or max_episodes must be provided. If both
+        are set, run() terminates when at least one of the conditions is
+        satisfied.  Default: 0.
+
+    Raises:
+      ValueError: If both max_steps and max_episodes are None, or if the batch
+        size of `env` is smaller than 2.
+    """
+    max_steps = max_steps or 0
+    max_episodes = max_episodes or 0
+    if max_steps < 1 and max_episodes < 1:
+      raise ValueError(
+          'Either `max_steps` or `max_episodes` should be greater than 0.')
+    if not env.batched or env.batch_size < 2:
+      raise ValueError(
+          'PipelinedPyDriver requires a batch size of at least 2; got {}.'
+          .format(env.batch_size))
+
+    super(PipelinedPyDriver, self).__init__(env, policy, observers,
+                                            transition_observers)
+    self._env_id_observers = env_id_observers or []
+    self._max_steps = max_steps or np.inf
+    self._max_episodes = max_episodes or np.inf
+    env_ids = np.arange(env.batch_size, dtype=np.int32)
+    self._halves = (env_ids[:env.batch_size // 2],
+                    env_ids[env.batch_size // 2:])
+
+  def run(self, time_step, policy_state=()):
+    """Run policy in environment given initial time_step and policy_state.
+
+    Args:
+      time_step: The initial time_step for all environments.
+      policy_state: The initial policy_state for all environments.
+
+    Returns:
+      A tuple (final time_step, final policy_state).
+    """
+    time_steps = [_gather_nest(time_step, ids) for ids in self._halves]
+    policy_states = [_gather_nest(policy_state, ids) for ids in self._halves]
+    action_steps = [None, None]
+    next_time_steps = [None, None]
+
+    def send(half):
+      action_steps[half] = self.policy.action(time_steps[half],
+                                              policy_states[half])
+      self.env.send(action_steps[half].action, self._halves[half])
+
+    def recv(half):
+      env_ids = self._halves[half]
+      next_time_steps[half], _ = self.env.recv(env_ids=env_ids)
+      traj = trajectory.from_transition(time_steps[half], action_steps[half],
+                                        next_time_steps[half])
+      for observer in self._env_id_observers:
+        observer(traj, env_ids)
+      return traj
+
+    send(0)
+    send(1)
+    num_steps = 0
+    num_episodes = 0
+    second_half_size = len(self._halves[1])
+    while True:
+      first_traj = recv(0)
+      # Step the first half again while the second one is still in flight,
+      # unless the second half could still reach a limit.
+      send_early = (
+          num_steps + np.sum(~first_traj.is_boundary()) + second_half_size <
+          self._max_steps and
+          num_episodes + np.sum(first_traj.is_last()) + second_half_size <
+          self._max_episodes)
+      old_time_steps = list(time_steps)
+      old_action_steps = list(action_steps)
+      time_steps[0] = next_time_steps[0]
+      policy_states[0] = action_steps[0].state
+      if send_early:
+        send(0)
+      recv(1)
+
+      time_step = _concat_nest(*old_time_steps)
+      action_step = _concat_nest(*old_action_steps)
+      next_time_step = _concat_nest(*next_time_steps)
+      traj = trajectory.from_transition(time_step, action_step, next_time_step)
+      for observer in self._transition_observers:
+        observer((time_step, action_step, next_time_step))
+      for observer in self.observers:
+        observer(traj)
+
+      num_episodes += np.sum(traj.is_last())
+      num_steps += np.sum(~traj.is_boundary())
+
+      time_steps[1] = next_time_steps[1]
+      policy_states[1] = action_steps[1].state
+      if num_steps >= self._max_steps or num_episodes >= self._max_episodes:
+        break
+      if not send_early:
+        send(0)
+      send(1)
+
+    return _concat_nest(*time_steps), _concat_nest(*policy_states)
+
+
+def _gather_nest(nested_array, indices):
+  """Selects the rows `indices` of every array in `nested_array`."""
+  return tf.nest.map_structure(lambda array: array[indices], nested_array)
+
+
+def _concat_nest(*nested_arrays):
+  """Concatenates the arrays of `nested_arrays` along their first axis."""
+  return tf.nest.map_structure(lambda *arrays: np.concatenate(arrays),
+                               *nested_arrays)
+
+
+def _scatter_nest(nested_array, indices, nested_values):
+  """Writes `nested_values` into the rows `indices` of `nested_array`."""
+
+  def _scatter(array, values):
+    array[indices] = values
+
+  tf.nest.map_structure(_scatter, nested_array, nested_values)
+  return nested_array
@@ -19,6 +19,9 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import functools
+import multiprocessing
+
 from absl.testing import parameterized
 
 import numpy as np
@@ -26,6 +29,8 @@ import tensorflow as tf  # pylint: disable=g-explicit-tensorflow-version-import
 from tf_agents.drivers import py_driver
 from tf_agents.drivers import test_utils as driver_test_utils
 from tf_agents.environments import batched_py_environment
+from tf_agents.environments import parallel_py_environment
+from tf_agents.metrics import py_metrics
 from tf_agents.trajectories import trajectory
 
 
@@ -225,6 +230,256 @@ class PyDriverTest(parameterized.TestCase, tf.test.TestCase):
       for t1_field, t2_field in zip(t1, t2):
         self.assertAllEqual(t1_field, t2_field)
 
+  @parameterized.named_parameters([
+      ('FourStepsNoneEpisodes', 4, None, 2),
+      ('SixStepsNoneEpisodes', 6, None, 3),
+      ('NoneStepsOneEpisode', None, 1, 2),
+      ('NoneStepsTwoEpisodes', None, 2, 3),
+  ])
+  def testAutoResetEnvironment(self, max_steps, max_episodes, expected_length):
+    # Same as the batched environment but without boundary transitions.
+    expected_trajectories = [
+        trajectory.Trajectory(
+            step_type=np.array([0, 0]),
+            observation=np.array([0, 0]),
+            action=np.array([2, 1]),
+            policy_info=np.array([4, 2]),
+            next_step_type=np.array([1, 1]),
+            reward=np.array([1., 1.]),
+            discount=np.array([1., 1.])),
+        trajectory.Trajectory(
+            step_type=np.array([1, 1]),
+            observation=np.array([2, 1]),
+            action=np.array([1, 2]),
+            policy_info=np.array([2, 4]),
+            next_step_type=np.array([2, 1]),
+            reward=np.array([1., 1.]),
+            discount=np.array([0., 1.])),
+        trajectory.Trajectory(
+            step_type=np.array([0, 1]),
+            observation=np.array([0, 3]),
+            action=np.array([2, 1]),
+            policy_info=np.array([4, 2]),
+            next_step_type=np.array([1, 2]),
+            reward=np.array([1., 1.]),
+            discount=np.array([1., 0.]))
+    ]
+
+    env1 = driver_test_utils.PyEnvironmentMock(final_state=3)
+    env2 = driver_test_utils.PyEnvironmentMock(final_state=4)
+    env = batched_py_environment.BatchedPyEnvironment([env1, env2],
+                                                      auto_reset=True)
+
+    policy = driver_test_utils.PyPolicyMock(
+        env.time_step_spec(),
+        env.action_spec(),
+        initial_policy_state=np.array([1, 2]))
+    replay_buffer_observer = MockReplayBufferObserver()
+
+    driver = py_driver.PyDriver(
+        env,
+        policy,
+        observers=[replay_buffer_observer],
+        max_steps=max_steps,
+        max_episodes=max_episodes,
+    )
+    initial_time_step = env.reset()
+    initial_policy_state = policy.get_initial_state()
+    driver.run(initial_time_step, initial_policy_state)
+    trajectories = replay_buffer_observer.gather_all()
+
+    self.assertEqual(
+        len(trajectories), len(expected_trajectories[:expected_length]))
+
+    for t1, t2 in zip(trajectories, expected_trajectories[:expected_length]):
+      for t1_field, t2_field in zip(t1, t2):
+        self.assertAllEqual(t1_field, t2_field)
+
+
+class AsyncPyDriverTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(AsyncPyDriverTest, self).setUp()
+    parallel_py_environment.multiprocessing = multiprocessing
+
+  def _make_env(self):
+    return parallel_py_environment.ParallelPyEnvironment([
+        functools.partial(driver_test_utils.PyEnvironmentMock, final_state=3),
+        functools.partial(driver_test_utils.PyEnvironmentMock, final_state=4)
+    ])
+
+  def testWaitForAllEnvironments(self):
+    # Waiting for all environments matches the synchronous driver.
+    expected_trajectories = [
+        trajectory.Trajectory(
+            step_type=np.array([0, 0]),
+            observation=np.array([0, 0]),
+            action=np.array([2, 1]),
+            policy_info=np.array([4, 2]),
+            next_step_type=np.array([1, 1]),
+            reward=np.array([1., 1.]),
+            discount=np.array([1., 1.])),
+        trajectory.Trajectory(
+            step_type=np.array([1, 1]),
+            observation=np.array([2, 1]),
+            action=np.array([1, 2]),
+            policy_info=np.array([2, 4]),
+            next_step_type=np.array([2, 1]),
+            reward=np.array([1., 1.]),
+            discount=np.array([0., 1.])),
+    ]
+    env = self._make_env()
+    policy = driver_test_utils.PyPolicyMock(
+        env.time_step_spec(),
+        env.action_spec(),
+        initial_policy_state=np.array([1, 2]))
+    replay_buffer_observer = MockReplayBufferObserver()
+    env_ids_observer = MockReplayBufferObserver()
+    driver = py_driver.AsyncPyDriver(
+        env,
+        policy,
+        observers=[replay_buffer_observer],
+        env_id_observers=[lambda _, env_ids: env_ids_observer(env_ids)],
+        max_steps=4)
+    driver.run(policy.get_initial_state())
+    trajectories = replay_buffer_observer.gather_all()
+
+    self.assertLen(trajectories, len(expected_trajectories))
+    for t1, t2 in zip(trajectories, expected_trajectories):
+      for t1_field, t2_field in zip(t1, t2):
+        self.assertAllEqual(t1_field, t2_field)
+    for env_ids in env_ids_observer.gather_all():
+      self.assertAllEqual([0, 1], env_ids)
+    env.close()
+
+  def testWaitForFirstReadyEnvironment(self):
+    env = self._make_env()
+    # The policy only sees a batch of the single ready environment.
+    policy = driver_test_utils.PyPolicyMock(
+        env.time_step_spec(),
+        env.action_spec(),
+        initial_policy_state=np.array([1]))
+    replay_buffer_observer = MockReplayBufferObserver()
+    driver = py_driver.AsyncPyDriver(
+        env,
+        policy,
+        observers=[replay_buffer_observer],
+        max_steps=6,
+        num_ready=1)
+    policy_state = driver.run(np.array([1, 2]))
+    self.assertAllEqual([2], policy_state.shape)
+
+    trajectories = replay_buffer_observer.gather_all()
+    for traj in trajectories:
+      self.assertAllEqual([1], traj.step_type.shape)
+    num_steps = sum(np.sum(~traj.is_boundary()) for traj in trajectories)
+    self.assertEqual(6, num_steps)
+
+    # A second run continues from the steps left in flight.
+    driver.run(policy_state)
+    env.close()
+
+
+class PipelinedPyDriverTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(PipelinedPyDriverTest, self).setUp()
+    parallel_py_environment.multiprocessing = multiprocessing
+
+  def _make_env(self):
+    return parallel_py_environment.ParallelPyEnvironment([
+        functools.partial(driver_test_utils.PyEnvironmentMock, final_state=3),
+        functools.partial(driver_test_utils.PyEnvironmentMock, final_state=4)
+    ])
+
+  def _run_sync(self, max_steps):
+    env = self._make_env()
+    policy = driver_test_utils.PyPolicyMock(
+        env.time_step_spec(),
+        env.action_spec(),
+        initial_policy_state=np.array([1, 1]))
+    replay_buffer_observer = MockReplayBufferObserver()
+    driver = py_driver.PyDriver(
+        env, policy, observers=[replay_buffer_observer], max_steps=max_steps)
+    driver.run(env.reset(), np.array([1, 1]))
+    env.close()
+    return replay_buffer_observer.gather_all()
+
+  def testMatchesPyDriver(self):
+    env = self._make_env()
+    # The policy only sees the batch of one half at a time.
+    policy = driver_test_utils.PyPolicyMock(
+        env.time_step_spec(),
+        env.action_spec(),
+        initial_policy_state=np.array([1]))
+    replay_buffer_observer = MockReplayBufferObserver()
+    env_ids_observer = MockReplayBufferObserver()
+    driver = py_driver.PipelinedPyDriver(
+        env,
+        policy,
+        observers=[replay_buffer_observer],
+        env_id_observers=[lambda _, env_ids: env_ids_observer(env_ids)],
+        max_steps=6)
+    time_step, policy_state = driver.run(env.reset(), np.array([1, 1]))
+    self.assertAllEqual([2], time_step.step_type.shape)
+    self.assertAllEqual([2], policy_state.shape)
+    env.close()
+
+    trajectories = replay_buffer_observer.gather_all()
+    env_ids = env_ids_observer.gather_all()
+    expected_trajectories = self._run_sync(max_steps=6)
+    self.assertAllEqual([[0], [1]] * len(expected_trajectories), env_ids)
+    self.assertLen(trajectories, len(expected_trajectories))
+    for traj, expected in zip(trajectories, expected_trajectories):
+      for field, expected_field in zip(traj, expected):
+        self.assertAllEqual(expected_field, field)
+
+  def testFinishesStepsInFlight(self):
+    env = self._make_env()
+    policy = driver_test_utils.PyPolicyMock(
+        env.time_step_spec(),
+        env.action_spec(),
+        initial_policy_state=np.array([1]))
+    replay_buffer_observer = MockReplayBufferObserver()
+    driver = py_driver.PipelinedPyDriver(
+        env, policy, observers=[replay_buffer_observer], max_steps=1)
+    time_step, policy_state = driver.run(env.reset(), np.array([1, 1]))
+    # Like `PyDriver`, a single step of the whole batch is taken.
+    self.assertLen(replay_buffer_observer.gather_all(), 1)
+    # Nothing is left in flight, so the environment can be stepped again.
+    driver.run(time_step, policy_state)
+    env.close()
+
+  def testAverageReturnMetricMatchesPyDriver(self):
+    env_fns = [
+        functools.partial(driver_test_utils.PyEnvironmentMock, final_state=n)
+        for n in (3, 4, 5, 6)
+    ]
+
+    def run(driver_cls, initial_policy_state):
+      env = parallel_py_environment.ParallelPyEnvironment(env_fns)
+      policy = driver_test_utils.PyPolicyMock(
+          env.time_step_spec(),
+          env.action_spec(),
+          initial_policy_state=initial_policy_state)
+      metric = py_metrics.AverageReturnMetric(batch_size=4)
+      driver = driver_cls(env, policy, observers=[metric], max_episodes=5)
+      driver.run(env.reset(), np.array([1, 1, 1, 1]))
+      env.close()
+      return metric.result()
+
+    expected = run(py_driver.PyDriver, np.array([1, 1, 1, 1]))
+    # The policy only sees the batch of one half at a time.
+    result = run(py_driver.PipelinedPyDriver, np.array([1, 1]))
+    self.assertAllClose(expected, result)
+
+  def testValueErrorOnUnbatchedEnvironment(self):
+    env = driver_test_utils.PyEnvironmentMock()
+    policy = driver_test_utils.PyPolicyMock(env.time_step_spec(),
+                                            env.action_spec())
+    with self.assertRaises(ValueError):
+      py_driver.PipelinedPyDriver(env, policy, observers=[], max_steps=1)
+
 
 if __name__ == '__main__':
   tf.test.main()
@@ -27,9 +27,11 @@ from multiprocessing import dummy as mp_threads
 # pylint: enable=line-too-long
 
 import gin
+import numpy as np
 import tensorflow as tf  # pylint: disable=g-explicit-tensorflow-version-import
 
 from tf_agents.environments import py_environment
+from tf_agents.environments import wrappers
 from tf_agents.utils import nest_utils
 
 
@@ -41,7 +43,7 @@ class BatchedPyEnvironment(py_environment.PyEnvironment):
   shared mutex locks (from the threading module).
   """
 
-  def __init__(self, envs, multithreading=True):
+  def __init__(self, envs, multithreading=True, auto_reset=False):
     """Batch together multiple (non-batched) py environments.
 
     The environments can be different but must use the same action and
@@ -55,6 +57,12 @@ class BatchedPyEnvironment(py_environment.PyEnvironment):
 
         This may be combined with wrapper `TFPyEnvironment(..., isolation=True)`
         to ensure that multiple environments are all run in the same thread.
+      auto_reset: Python bool, whether to wrap the environments in
+        `wrappers.AutoResetWrapper`. Environments finishing an episode are then
+        reset in the same `step` and return the `FIRST` time step of the next
+        episode, with the reward and discount of the final transition. The
+        final observations are added to the info of the environments, in
+        `get_info()['final_observation']`.
 
     Raises:
       ValueError: If envs is not a list or tuple, or is zero length, or if
@@ -68,6 +76,9 @@ class BatchedPyEnvironment(py_environment.PyEnvironment):
       raise ValueError(
           "Some of the envs are already batched: %s" % batched_envs)
     self._parallel_execution = multithreading
+    self._auto_reset = auto_reset
+    if auto_reset:
+      envs = [wrappers.AutoResetWrapper(env) for env in envs]
     self._envs = envs
     self._num_envs = len(envs)
     self._action_spec = self._envs[0].action_spec()
@@ -104,6 +115,25 @@ class BatchedPyEnvironment(py_environment.PyEnvironment):
   def envs(self):
     return self._envs
 
+  @property
+  def auto_reset(self):
+    return self._auto_reset
+
+  @property
+  def final_observation(self):
+    """Final observations of episodes ended by the last `step`, or None.
+
+    Only available with `auto_reset`. Returns None if no episode ended in the
+    last `step`, otherwise the batched final observations, with the current
+    observation for the environments that did not finish an episode.
+    """
+    final_observations = [env.final_observation for env in self._envs]
+    if all(observation is None for observation in final_observations):
+      return None
+    return merge_final_observations(self._current_time_step.observation,
+                                    final_observations,
+                                    range(self._num_envs))
+
   def observation_spec(self):
     return self._observation_spec
 
@@ -114,6 +144,8 @@ class BatchedPyEnvironment(py_environment.PyEnvironment):
     return self._time_step_spec
 
   def get_info(self):
+    # With `auto_reset` every `AutoResetWrapper` adds its final observation to
+    # the info of its environment.
     if self._num_envs == 1:
       return nest_utils.batch_nested_array(self._envs[0].get_info())
     else:
@@ -160,6 +192,15 @@ class BatchedPyEnvironment(py_environment.PyEnvironment):
           zip(self._envs, unstacked_actions))
       return nest_utils.stack_nested_arrays(time_steps)
 
+  def seed(self, seeds):
+    """Seeds the batched environments."""
+    if len(seeds) != self._num_envs:
+      raise ValueError(
+          "Number of seeds should match the number of envs.  Got: %d vs. %d" %
+          (len(seeds), self._num_envs))
+    return self._execute(lambda env_seed: env_seed[0].seed(env_seed[1]),
+                         zip(self._envs, seeds))
+
   def close(self):
     """Send close messages to the external process and join them."""
     self._execute(lambda env: env.close(), self._envs)
@@ -176,3 +217,29 @@ def unstack_actions(batched_actions):
       for actions in zip(*flattened_actions)
   ]
   return unstacked_actions
+
+
+def merge_final_observations(observation, final_observations, indices):
+  """Returns a batch of observations with rows replaced by final observations.
+
+  Args:
+    observation: Batched observation, possibly nested.
+    final_observations: List of final observations, possibly nested, or None
+      for the entries that keep their row(s) of `observation`.
+    indices: Index or slice of `observation` each of `final_observations`
+      replaces.
+
+  Returns:
+    A copy of `observation` with the rows of all final observations replaced,
+    or `observation` itself if all `final_observations` are None.
+  """
+  if all(final is None for final in final_observations):
+    return observation
+  merged = tf.nest.map_structure(np.copy, observation)
+  for index, final_observation in zip(indices, final_observations):
+    if final_observation is None:
+      continue
+    for array, value in zip(tf.nest.flatten(merged),
+                            tf.nest.flatten(final_observation)):
+      array[index] = value
+  return merged
@@ -107,6 +107,34 @@ class BatchedPyEnvironmentTest(tf.test.TestCase, parameterized.TestCase):
     self.assertAllEqual(info['last_action'], action)
     gym_env.close()
 
+  @parameterized.parameters(*COMMON_PARAMETERS)
+  def test_get_info_gym_env_auto_reset(self, multithreading):
+    num_envs = 2
+    env = batched_py_environment.BatchedPyEnvironment(
+        envs=[
+            GymWrapperEnvironmentMock(
+                self.observation_spec,
+                self.action_spec,
+                episode_end_probability=0.0,
+                max_duration=duration) for duration in (1, 2)
+        ],
+        multithreading=multithreading,
+        auto_reset=True)
+    rng = np.random.RandomState()
+    action = np.stack([
+        array_spec.sample_bounded_spec(self.action_spec, rng)
+        for _ in range(num_envs)
+    ])
+    env.reset()
+    time_step = env.step(action)
+    info = env.get_info()
+    # The info of the environments is kept next to the final observations.
+    self.assertAllEqual(action, info['last_action'])
+    self.assertAllEqual(env.envs[0].final_observation,
+                        info['final_observation'][0])
+    self.assertAllEqual(time_step.observation[1], info['final_observation'][1])
+    env.close()
+
   @parameterized.parameters(*COMMON_PARAMETERS)
   def test_step(self, multithreading):
     num_envs = 5
@@ -133,6 +161,51 @@ class BatchedPyEnvironmentTest(tf.test.TestCase, parameterized.TestCase):
                         time_step2.observation.shape)
     env.close()
 
+  @parameterized.parameters(*COMMON_PARAMETERS)
+  def test_seedable(self, multithreading):
+    env = self._make_batched_py_environment(multithreading, num_envs=2)
+    env.seed([0, 1])
+    self.assertEqual(
+        np.random.RandomState(0).get_state()[1][-1],
+        env.envs[0]._rng.get_state()[1][-1])
+    self.assertEqual(
+        np.random.RandomState(1).get_state()[1][-1],
+        env.envs[1]._rng.get_state()[1][-1])
+    with self.assertRaises(ValueError):
+      env.seed([0])
+    env.close()
+
+  @parameterized.parameters(*COMMON_PARAMETERS)
+  def test_auto_reset(self, multithreading):
+    num_envs = 2
+    env = batched_py_environment.BatchedPyEnvironment(
+        envs=[
+            random_py_environment.RandomPyEnvironment(
+                self.observation_spec,
+                self.action_spec,
+                episode_end_probability=0.0,
+                max_duration=duration) for duration in (1, 2)
+        ],
+        multithreading=multithreading,
+        auto_reset=True)
+    self.assertTrue(env.auto_reset)
+    action = np.zeros((num_envs,) + self.action_spec.shape, np.float32)
+    env.reset()
+
+    time_step = env.step(action)
+    self.assertAllEqual([ts.StepType.FIRST, ts.StepType.MID],
+                        time_step.step_type)
+    self.assertAllEqual([0.0, 1.0], time_step.discount)
+    final_observation = env.get_info()['final_observation']
+    self.assertAllEqual(env.envs[0].final_observation, final_observation[0])
+    self.assertAllEqual(time_step.observation[1], final_observation[1])
+    self.assertNotAllClose(time_step.observation[0], final_observation[0])
+
+    time_step = env.step(action)
+    self.assertAllEqual([ts.StepType.FIRST, ts.StepType.FIRST],
+                        time_step.step_type)
+    env.close()
+
   def test_unstack_actions(self):
     num_envs = 5
     action_spec = self.action_spec
@@ -20,8 +20,13 @@ from __future__ import division
 from __future__ import print_function
 
 import atexit
+import functools
+import mmap
 import multiprocessing
+from multiprocessing import connection as mp_connection
+import os
 import sys
+import tempfile
 import traceback
 
 from absl import logging
@@ -30,7 +35,9 @@ import gin
 import numpy as np
 import tensorflow as tf  # pylint: disable=g-explicit-tensorflow-version-import
 
+from tf_agents.environments import batched_py_environment
 from tf_agents.environments import py_environment
+from tf_agents.environments import wrappers
 from tf_agents.utils import nest_utils
 
 
@@ -42,10 +49,28 @@ class ParallelPyEnvironment(py_environment.PyEnvironment):
   callables. This can be an environment class, or a function creating the
   environment and potentially wrapping it. The returned environment should not
   access global variables.
+
+  Each process runs `num_envs_per_process` of the environments, stepped
+  together as a `BatchedPyEnvironment`, so the number of processes and the
+  number of environments can be chosen independently.
+
+  Besides the synchronous `step`, the environments can be stepped
+  asynchronously with `async_reset`, `send` and `recv`: `recv` returns the
+  time steps of whichever environments finish first together with their ids,
+  and `send` dispatches actions to a subset of environments by id. This way a
+  single slow environment does not stall the whole batch.
+
+  ```python
+  env.async_reset()
+  for _ in range(num_iterations):
+    time_step, env_ids = env.recv(num_envs=8)
+    env.send(policy.action(time_step).action, env_ids)
+  ```
   """
 
   def __init__(self, env_constructors, start_serially=True, blocking=False,
-               flatten=False):
+               flatten=False, shared_memory=False, num_envs_per_process=1,
+               auto_reset=False):
     """Batch together environments and simulate them in external processes.
 
     The environments can be different but must use the same action and
@@ -57,14 +82,56 @@ class ParallelPyEnvironment(py_environment.PyEnvironment):
       blocking: Whether to step environments one after another.
       flatten: Boolean, whether to use flatten action and time_steps during
         communication to reduce overhead.
+      shared_memory: Boolean, whether to exchange actions and time steps
+        through preallocated shared memory instead of pickling them through
+        the pipes. Each worker writes its time step directly into its slot of
+        the batched arrays, so `step` and `reset` return the batch without
+        stacking or copying. The returned arrays are views into the shared
+        memory and stay valid until the second following call to `step` or
+        `reset`; copy them if they need to be kept for longer.
+      num_envs_per_process: Number of environments run by each process. When
+        greater than 1, consecutive groups of `env_constructors` are created
+        in the same process and each process returns a stacked sub-batch. The
+        last process runs the remaining environments if `len(env_constructors)`
+        is not a multiple of `num_envs_per_process`.
+      auto_reset: Boolean, whether environments finishing an episode are reset
+        by their process in the same `step` call, see
+        `wrappers.AutoResetWrapper`. The `FIRST` time step of the next episode
+        is returned, with the reward and discount of the final transition, and
+        the final observations are returned by
+        `get_info()['final_observation']` without another round-trip.
 
     Raises:
       ValueError: If the action or observation specs don't match.
+      ValueError: If `num_envs_per_process` is smaller than 1.
     """
     super(ParallelPyEnvironment, self).__init__()
-    self._envs = [ProcessPyEnvironment(ctor, flatten=flatten)
-                  for ctor in env_constructors]
+    if num_envs_per_process < 1:
+      raise ValueError('num_envs_per_process must be at least 1, got {}'.format(
+          num_envs_per_process))
     self._num_envs = len(env_constructors)
+    self._num_envs_per_process = num_envs_per_process
+    self._auto_reset = auto_reset
+    # Final observations reported by each process after the last step.
+    self._final_observations = None
+    if num_envs_per_process == 1:
+      if auto_reset:
+        env_constructors = [
+            functools.partial(_auto_reset_env_constructor, ctor)
+            for ctor in env_constructors]
+      self._envs = [ProcessPyEnvironment(ctor, flatten=flatten)
+                    for ctor in env_constructors]
+      self._env_indices = list(range(self._num_envs))
+    else:
+      self._envs = []
+      self._env_indices = []
+      for start in range(0, self._num_envs, num_envs_per_process):
+        stop = min(start + num_envs_per_process, self._num_envs)
+        ctor = functools.partial(_batched_env_constructor,
+                                 env_constructors[start:stop],
+                                 auto_reset=auto_reset)
+        self._envs.append(ProcessPyEnvironment(ctor, flatten=flatten))
+        self._env_indices.append(slice(start, stop))
     self._blocking = blocking
     self._start_serially = start_serially
     self.start()
@@ -77,6 +144,32 @@ class ParallelPyEnvironment(py_environment.PyEnvironment):
     if any(env.time_step_spec() != self._time_step_spec for env in self._envs):
       raise ValueError('All environments must have the same time_step_spec.')
     self._flatten = flatten
+    self._shared_memory = shared_memory
+    if shared_memory:
+      self._attach_shared_buffers()
+    # Promises of environments with an asynchronous call in flight, by env id.
+    self._pending = {}
+
+  def _attach_shared_buffers(self):
+    """Allocates the shared time step and action buffers for all workers."""
+    # Two time step slots are used alternately so that the previous time step
+    # is still valid while the next one is written, e.g. in `PyDriver`.
+    self._time_step_buffer = _SharedNestBuffer(
+        self._time_step_spec, self._num_envs, num_slots=2)
+    self._action_buffer = _SharedNestBuffer(
+        self._action_spec, self._num_envs, num_slots=1)
+    self._time_step_slot = 0
+    try:
+      promises = [
+          env.attach_shared_buffers(self._time_step_buffer.descriptor,
+                                    self._action_buffer.descriptor, index)
+          for index, env in zip(self._env_indices, self._envs)]
+      for promise in promises:
+        promise()
+    finally:
+      # All workers have mapped the buffers; their files are no longer needed.
+      self._time_step_buffer.unlink()
+      self._action_buffer.unlink()
 
   def start(self):
     logging.info('Spawning all processes.')
@@ -105,12 +198,40 @@ class ParallelPyEnvironment(py_environment.PyEnvironment):
   def time_step_spec(self):
     return self._time_step_spec
 
+  @property
+  def auto_reset(self):
+    return self._auto_reset
+
+  def get_info(self):
+    """Returns a dict with the final observations of the last `step`.
+
+    Only supported with `auto_reset`. Environments that did not finish an
+    episode in the last `step` report their current observation.
+
+    Raises:
+      NotImplementedError: If `auto_reset` is False.
+    """
+    if not self._auto_reset:
+      return super(ParallelPyEnvironment, self).get_info()
+    observation = self._current_time_step.observation
+    if self._final_observations is None:
+      return {'final_observation': observation}
+    return {
+        'final_observation':
+            batched_py_environment.merge_final_observations(
+                observation, self._final_observations, self._env_indices)
+    }
+
   def _reset(self):
     """Reset all environments and combine the resulting observation.
 
     Returns:
       Time step with batch dimension.
     """
+    self._check_no_pending()
+    self._final_observations = None
+    if self._shared_memory:
+      return self._call_shared('reset')[0]
     time_steps = [env.reset(self._blocking) for env in self._envs]
     if not self._blocking:
       time_steps = [promise() for promise in time_steps]
@@ -128,13 +249,182 @@ class ParallelPyEnvironment(py_environment.PyEnvironment):
     Returns:
       Batch of observations, rewards, and done flags.
     """
-    time_steps = [
-        env.step(action, self._blocking)
+    return self._step_and_read(actions, None)[0]
+
+  def step_and_read(self, actions, attribute_names):
+    """Steps the environments and reads attributes in the same round-trip.
+
+    Saves one message exchange with every process per attribute compared to
+    calling `step` and reading the attributes afterwards.
+
+    Args:
+      actions: Batched action, possibly nested, to apply to the environment.
+      attribute_names: List of names of attributes to read from each
+        environment after stepping it. Attributes that are callable, e.g.
+        `get_info`, are called without arguments.
+
+    Returns:
+      A tuple `(time_step, attributes)` where `time_step` is the batched time
+      step and `attributes` maps each name to a list with its value for every
+      process. When `num_envs_per_process > 1` the values are read from the
+      `BatchedPyEnvironment` running in each process.
+    """
+    time_step, values = self._step_and_read(actions, attribute_names)
+    self._current_time_step = time_step
+    attributes = {name: [env_values[i] for env_values in values]
+                  for i, name in enumerate(attribute_names)}
+    return time_step, attributes
+
+  def _step_and_read(self, actions, attribute_names):
+    """Steps all environments, optionally reading attributes of each."""
+    if not self._auto_reset:
+      return self._step_and_read_attributes(actions, attribute_names)
+    # Final observations are read in the same round-trip as the step.
+    time_step, values = self._step_and_read_attributes(
+        actions, ['final_observation'] + list(attribute_names or []))
+    self._final_observations = [env_values[0] for env_values in values]
+    if attribute_names is None:
+      return time_step, None
+    return time_step, [env_values[1:] for env_values in values]
+
+  def _step_and_read_attributes(self, actions, attribute_names):
+    """Steps all environments, optionally reading attributes of each."""
+    self._check_no_pending()
+    if self._shared_memory:
+      self._action_buffer.write_batch(0, actions)
+      return self._call_shared('step', attribute_names)
+    results = [
+        env.step(action, self._blocking, attribute_names)
         for env, action in zip(self._envs, self._unstack_actions(actions))]
     # When blocking is False we get promises that need to be called.
     if not self._blocking:
-      time_steps = [promise() for promise in time_steps]
-    return self._stack_time_steps(time_steps)
+      results = [promise() for promise in results]
+    if attribute_names is None:
+      return self._stack_time_steps(results), None
+    time_steps, values = zip(*results)
+    return self._stack_time_steps(time_steps), values
+
+  def async_reset(self):
+    """Asynchronously resets all environments.
+
+    The first time steps are returned by subsequent calls to `recv`.
+
+    Raises:
+      RuntimeError: If an asynchronous call is already in flight.
+    """
+    self._check_async_supported()
+    self._check_no_pending()
+    for env_id, env in enumerate(self._envs):
+      self._pending[env_id] = env.reset(blocking=False)
+
+  def send(self, actions, env_ids):
+    """Asynchronously steps a subset of the environments.
+
+    Args:
+      actions: Batched action, possibly nested, with one entry per id in
+        `env_ids`.
+      env_ids: Sequence of ids of the environments to step, as returned by
+        `recv`.
+
+    Raises:
+      ValueError: If the number of actions does not match `env_ids`.
+      RuntimeError: If any of the environments has a call in flight.
+    """
+    self._check_async_supported()
+    env_ids = [int(env_id) for env_id in env_ids]
+    unstacked_actions = self._unstack_actions(actions)
+    if len(unstacked_actions) != len(env_ids):
+      raise ValueError(
+          'Primary dimension of actions does not match the number of env_ids: '
+          '{} vs. {}'.format(len(unstacked_actions), len(env_ids)))
+    busy_ids = [env_id for env_id in env_ids if env_id in self._pending]
+    if busy_ids:
+      raise RuntimeError(
+          'Environments {} still have calls in flight.'.format(busy_ids))
+    for env_id, action in zip(env_ids, unstacked_actions):
+      self._pending[env_id] = self._envs[env_id].step(action, blocking=False)
+
+  def recv(self, num_envs=None, env_ids=None):
+    """Waits for the first `num_envs` environments to finish their calls.
+
+    Args:
+      num_envs: Number of time steps to return. Defaults to all environments
+        with calls in flight.
+      env_ids: Optional sequence of ids of the environments to wait for,
+        instead of the first `num_envs` ready ones.
+
+    Returns:
+      A tuple `(time_step, env_ids)` where `time_step` has a batch dimension of
+      `num_envs` and `env_ids` is a sorted int32 array with the id of the
+      environment each entry of the batch belongs to.
+
+    Raises:
+      ValueError: If fewer than `num_envs` environments have calls in flight,
+        or if any of `env_ids` has no call in flight.
+    """
+    self._check_async_supported()
+    if env_ids is not None:
+      env_ids = sorted(int(env_id) for env_id in env_ids)
+      idle_ids = [env_id for env_id in env_ids if env_id not in self._pending]
+      if idle_ids:
+        raise ValueError(
+            'Environments {} have no calls in flight.'.format(idle_ids))
+      time_steps = [self._pending.pop(env_id)() for env_id in env_ids]
+      return (self._stack_time_steps(time_steps),
+              np.array(env_ids, dtype=np.int32))
+    if num_envs is None:
+      num_envs = len(self._pending)
+    if num_envs < 1 or num_envs > len(self._pending):
+      raise ValueError(
+          'Cannot receive {} time steps with {} environments in flight.'.format(
+              num_envs, len(self._pending)))
+    ready_ids = []
+    while len(ready_ids) < num_envs:
+      waiting = {self._envs[env_id].connection: env_id
+                 for env_id in self._pending if env_id not in ready_ids}
+      ready_ids.extend(
+          sorted(waiting[conn] for conn in mp_connection.wait(list(waiting))))
+    # Results of environments beyond `num_envs` stay queued for the next call.
+    ready_ids = sorted(ready_ids[:num_envs])
+    time_steps = [self._pending.pop(env_id)() for env_id in ready_ids]
+    return (self._stack_time_steps(time_steps),
+            np.array(ready_ids, dtype=np.int32))
+
+  def _check_async_supported(self):
+    if (self._shared_memory or self._num_envs_per_process > 1 or
+        self._auto_reset):
+      raise ValueError(
+          'Asynchronous stepping requires shared_memory=False, '
+          'num_envs_per_process=1 and auto_reset=False.')
+
+  def _check_no_pending(self):
+    if self._pending:
+      raise RuntimeError(
+          'Environments {} still have asynchronous calls in flight; call '
+          '`recv` first.'.format(sorted(self._pending)))
+
+  def _call_shared(self, name, attribute_names=None):
+    """Runs `step` or `reset` on all workers through the shared buffers.
+
+    Args:
+      name: Either 'step' or 'reset'. Actions for 'step' must already be
+        written to the action buffer.
+      attribute_names: Optional list of attributes to read from each worker
+        in the same round-trip.
+
+    Returns:
+      A tuple of the time step with batch dimension, as views into the shared
+      buffer, and the attribute values of every worker (or None).
+    """
+    slot = self._time_step_slot
+    self._time_step_slot = 1 - slot
+    values = [env.call_shared(name, slot, self._blocking, attribute_names)
+              for env in self._envs]
+    if not self._blocking:
+      values = [promise() for promise in values]
+    if attribute_names is None:
+      values = None
+    return self._time_step_buffer.read(slot), values
 
   def close(self):
     """Close all external process."""
@@ -145,16 +435,27 @@ class ParallelPyEnvironment(py_environment.PyEnvironment):
 
   def _stack_time_steps(self, time_steps):
     """Given a list of TimeStep, combine to one with a batch dimension."""
+    # Processes running several environments already return sub-batches.
+    combine = np.stack if self._num_envs_per_process == 1 else np.concatenate
     if self._flatten:
       return nest_utils.fast_map_structure_flatten(
-          lambda *arrays: np.stack(arrays), self._time_step_spec, *time_steps)
+          lambda *arrays: combine(arrays), self._time_step_spec, *time_steps)
     else:
       return nest_utils.fast_map_structure(
-          lambda *arrays: np.stack(arrays), *time_steps)
+          lambda *arrays: combine(arrays), *time_steps)
 
   def _unstack_actions(self, batched_actions):
     """Returns a list of actions from potentially nested batch of actions."""
     flattened_actions = tf.nest.flatten(batched_actions)
+    if self._num_envs_per_process > 1:
+      # Split into one sub-batch of actions per process.
+      unstacked_actions = [
+          [action[index] for action in flattened_actions]
+          for index in self._env_indices]
+      if self._flatten:
+        return unstacked_actions
+      return [tf.nest.pack_sequence_as(batched_actions, actions)
+              for actions in unstacked_actions]
     if self._flatten:
       unstacked_actions = zip(*flattened_actions)
     else:
@@ -166,15 +467,28 @@ class ParallelPyEnvironment(py_environment.PyEnvironment):
 
   def seed(self, seeds):
     """Seeds the parallel environments."""
-    if len(seeds) != len(self._envs):
+    if len(seeds) != self._num_envs:
       raise ValueError(
           'Number of seeds should match the number of parallel_envs.')
 
-    promises = [env.call('seed', seed) for seed, env in zip(seeds, self._envs)]
+    promises = [env.call('seed', seeds[index])
+                for index, env in zip(self._env_indices, self._envs)]
     # Block until all envs are seeded.
     return [promise() for promise in promises]
 
 
+def _batched_env_constructor(env_constructors, auto_reset=False):
+  """Creates a serially stepped `BatchedPyEnvironment` inside a worker."""
+  return batched_py_environment.BatchedPyEnvironment(
+      [ctor() for ctor in env_constructors], multithreading=False,
+      auto_reset=auto_reset)
+
+
+def _auto_reset_env_constructor(env_constructor):
+  """Creates an environment wrapped in `AutoResetWrapper` inside a worker."""
+  return wrappers.AutoResetWrapper(env_constructor())
+
+
 class ProcessPyEnvironment(object):
   """Step a single env in a separate process for lock free paralellism."""
 
@@ -185,6 +499,9 @@ class ProcessPyEnvironment(object):
   _RESULT = 4
   _EXCEPTION = 5
   _CLOSE = 6
+  _ATTACH = 7
+  _SHARED_CALL = 8
+  _CALL_AND_ACCESS = 9
 
   def __init__(self, env_constructor, flatten=False):
     """Step environment in a separate process for lock free paralellism.
@@ -249,6 +566,11 @@ class ProcessPyEnvironment(object):
       self._time_step_spec = self.call('time_step_spec')()
     return self._time_step_spec
 
+  @property
+  def connection(self):
+    """Connection to the worker, ready for reading when a result arrives."""
+    return self._conn
+
   def __getattr__(self, name):
     """Request an attribute from the environment.
 
@@ -279,6 +601,24 @@ class ProcessPyEnvironment(object):
     self._conn.send((self._CALL, payload))
     return self._receive
 
+  def call_and_access(self, name, attribute_names, *args, **kwargs):
+    """Asynchronously call a method and then read attributes in one message.
+
+    Args:
+      name: Name of the method to call.
+      attribute_names: List of names of attributes to read after the call.
+        Callable attributes are called without arguments.
+      *args: Positional arguments to forward to the method.
+      **kwargs: Keyword arguments to forward to the method.
+
+    Returns:
+      Promise object that blocks and provides a tuple of the return value and
+      the list of attribute values when called.
+    """
+    payload = name, args, kwargs, attribute_names
+    self._conn.send((self._CALL_AND_ACCESS, payload))
+    return self._receive
+
   def close(self):
     """Send a close message to the external process and join it."""
     try:
@@ -289,17 +629,63 @@ class ProcessPyEnvironment(object):
       pass
     self._process.join(5)
 
-  def step(self, action, blocking=True):
+  def attach_shared_buffers(self, time_step_descriptor, action_descriptor,
+                            index):
+    """Asynchronously attach the worker to shared time step/action buffers.
+
+    Args:
+      time_step_descriptor: `descriptor` of the shared time step buffer.
+      action_descriptor: `descriptor` of the shared action buffer.
+      index: Index of this environment in the batch dimension of the buffers,
+        or a slice of indices if the environment is itself batched.
+
+    Returns:
+      Promise object that blocks until the buffers are attached when called.
+    """
+    payload = time_step_descriptor, action_descriptor, index
+    self._conn.send((self._ATTACH, payload))
+    return self._receive
+
+  def call_shared(self, name, slot, blocking=True, attribute_names=None):
+    """Run `step` or `reset` exchanging data through the shared buffers.
+
+    The action is read from the attached action buffer and the resulting time
+    step is written into `slot` of the attached time step buffer.
+
+    Args:
+      name: Either 'step' or 'reset'.
+      slot: Slot of the time step buffer to write the result to.
+      blocking: Whether to wait for the result.
+      attribute_names: Optional list of attributes to read after the call.
+
+    Returns:
+      The list of attribute values (or None) when blocking, otherwise callable
+      that waits for the worker and returns them.
+    """
+    self._conn.send((self._SHARED_CALL, (name, slot, attribute_names)))
+    if blocking:
+      return self._receive()
+    else:
+      return self._receive
+
+  def step(self, action, blocking=True, attribute_names=None):
     """Step the environment.
 
     Args:
       action: The action to apply to the environment.
       blocking: Whether to wait for the result.
+      attribute_names: Optional list of attributes to read after stepping, in
+        the same round-trip. Callable attributes are called without arguments.
 
     Returns:
       time step when blocking, otherwise callable that returns the time step.
+      If `attribute_names` is given, the time step is replaced by a tuple of
+      the time step and the list of attribute values.
     """
-    promise = self.call('step', action)
+    if attribute_names is None:
+      promise = self.call('step', action)
+    else:
+      promise = self.call_and_access('step', attribute_names, action)
     if blocking:
       return promise()
     else:
@@ -356,12 +742,12 @@ class ProcessPyEnvironment(object):
     try:
       env = env_constructor()
       action_spec = env.action_spec()
+      time_step_buffer = action_buffer = index = None
       conn.send(self._READY)  # Ready.
       while True:
         try:
-          # Only block for short times to have keyboard exceptions be raised.
-          if not conn.poll(0.1):
-            continue
+          # Block until the next command arrives. Keyboard interrupts still
+          # abort the blocking receive.
           message, payload = conn.recv()
         except (EOFError, KeyboardInterrupt):
           break
@@ -370,13 +756,39 @@ class ProcessPyEnvironment(object):
           result = getattr(env, name)
           conn.send((self._RESULT, result))
           continue
-        if message == self._CALL:
-          name, args, kwargs = payload
+        if message in (self._CALL, self._CALL_AND_ACCESS):
+          if message == self._CALL:
+            name, args, kwargs = payload
+          else:
+            name, args, kwargs, attribute_names = payload
           if flatten and name == 'step':
             args = [tf.nest.pack_sequence_as(action_spec, args[0])]
           result = getattr(env, name)(*args, **kwargs)
           if flatten and name in ['step', 'reset']:
             result = tf.nest.flatten(result)
+          if message == self._CALL_AND_ACCESS:
+            result = result, _read_attributes(env, attribute_names)
+          conn.send((self._RESULT, result))
+          continue
+        if message == self._ATTACH:
+          time_step_descriptor, action_descriptor, index = payload
+          time_step_buffer = _SharedNestBuffer(
+              env.time_step_spec(), *time_step_descriptor)
+          action_buffer = _SharedNestBuffer(action_spec, *action_descriptor)
+          conn.send((self._RESULT, None))
+          continue
+        if message == self._SHARED_CALL:
+          name, slot, attribute_names = payload
+          if name == 'step':
+            time_step = env.step(action_buffer.read(0, index))
+          elif name == 'reset':
+            time_step = env.reset()
+          else:
+            raise KeyError('Unsupported shared call {}'.format(name))
+          time_step_buffer.write(slot, index, time_step)
+          result = None
+          if attribute_names is not None:
+            result = _read_attributes(env, attribute_names)
           conn.send((self._RESULT, result))
           continue
         if message == self._CLOSE:
@@ -392,3 +804,94 @@ class ProcessPyEnvironment(object):
       conn.send((self._EXCEPTION, stacktrace))
     finally:
       conn.close()
+
+
+def _read_attributes(env, attribute_names):
+  """Reads attributes of `env`, calling the ones that are callable."""
+  values = []
+  for name in attribute_names:
+    value = getattr(env, name)
+    values.append(value() if callable(value) else value)
+  return values
+
+
+class _SharedNestBuffer(object):
+  """Batched numpy arrays for a nest of specs, backed by shared memory.
+
+  Every leaf of the spec gets an array of shape
+  `[num_slots, batch_size] + spec.shape`, all laid out in a single memory
+  mapped file. The parent process creates the file and the workers map the
+  same file by its path, after which the parent can unlink it.
+  """
+
+  # Byte alignment of each array inside the mapped file.
+  _ALIGNMENT = 64
+
+  def __init__(self, spec, batch_size, num_slots, path=None):
+    """Creates a new shared buffer, or attaches to an existing one.
+
+    Args:
+      spec: Nest of `ArraySpec`s describing a single (unbatched) element.
+      batch_size: Size of the batch dimension.
+      num_slots: Number of independent batches held by the buffer.
+      path: Path of the file of an existing buffer to attach to. If None, a
+        new file is created, preferably in `/dev/shm`.
+    """
+    self._spec = spec
+    self._batch_size = batch_size
+    self._num_slots = num_slots
+    flat_specs = tf.nest.flatten(spec)
+    offsets = []
+    size = 0
+    for s in flat_specs:
+      offsets.append(size)
+      nbytes = (num_slots * batch_size * int(np.prod(s.shape)) *
+                np.dtype(s.dtype).itemsize)
+      size += -(-nbytes // self._ALIGNMENT) * self._ALIGNMENT
+    size = max(size, 1)
+    if path is None:
+      shm_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+      fd, path = tempfile.mkstemp(prefix='tf_agents_env_', dir=shm_dir)
+      os.ftruncate(fd, size)
+    else:
+      fd = os.open(path, os.O_RDWR)
+    try:
+      self._mmap = mmap.mmap(fd, size)
+    finally:
+      os.close(fd)
+    self._path = path
+    self._arrays = [
+        np.ndarray((num_slots, batch_size) + tuple(s.shape), dtype=s.dtype,
+                   buffer=self._mmap, offset=offset)
+        for s, offset in zip(flat_specs, offsets)]
+
+  @property
+  def descriptor(self):
+    """Tuple of arguments, besides the spec, that attach to this buffer."""
+    return self._batch_size, self._num_slots, self._path
+
+  def unlink(self):
+    """Removes the backing file. Existing mappings stay valid."""
+    try:
+      os.unlink(self._path)
+    except OSError:
+      # Already removed.
+      pass
+
+  def read(self, slot, index=None):
+    """Returns a nest of views into a slot, or a single element of it."""
+    if index is None:
+      arrays = [array[slot] for array in self._arrays]
+    else:
+      arrays = [array[slot, index, ...] for array in self._arrays]
+    return tf.nest.pack_sequence_as(self._spec, arrays)
+
+  def write(self, slot, index, nested_array):
+    """Writes a single unbatched element into `[slot, index]`."""
+    for array, value in zip(self._arrays, tf.nest.flatten(nested_array)):
+      array[slot, index] = value
+
+  def write_batch(self, slot, nested_array):
+    """Writes a whole batch into `slot`."""
+    for array, value in zip(self._arrays, tf.nest.flatten(nested_array)):
+      array[slot] = value
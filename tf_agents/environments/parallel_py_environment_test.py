@@ -21,6 +21,7 @@ from __future__ import print_function
 
 import collections
 import functools
+import multiprocessing
 import multiprocessing.dummy as dummy_multiprocessing
 import time
 
@@ -41,6 +42,17 @@ class SlowStartingEnvironment(random_py_environment.RandomPyEnvironment):
     super(SlowStartingEnvironment, self).__init__(*args, **kwargs)
 
 
+class SlowSteppingEnvironment(random_py_environment.RandomPyEnvironment):
+
+  def __init__(self, *args, **kwargs):
+    self._time_sleep = kwargs.pop('time_sleep', 1.0)
+    super(SlowSteppingEnvironment, self).__init__(*args, **kwargs)
+
+  def _step(self, action):
+    time.sleep(self._time_sleep)
+    return super(SlowSteppingEnvironment, self)._step(action)
+
+
 class ParallelPyEnvironmentTest(tf.test.TestCase):
 
   def setUp(self):
@@ -58,14 +70,17 @@ class ParallelPyEnvironmentTest(tf.test.TestCase):
                                     constructor=None,
                                     num_envs=2,
                                     start_serially=True,
-                                    blocking=True):
+                                    blocking=True,
+                                    shared_memory=False,
+                                    num_envs_per_process=1):
     self._set_default_specs()
     constructor = constructor or functools.partial(
         random_py_environment.RandomPyEnvironment, self.observation_spec,
         self.action_spec)
     return parallel_py_environment.ParallelPyEnvironment(
         env_constructors=[constructor] * num_envs, blocking=blocking,
-        start_serially=start_serially)
+        start_serially=start_serially, shared_memory=shared_memory,
+        num_envs_per_process=num_envs_per_process)
 
   def test_close_no_hang_after_init(self):
     env = self._make_parallel_py_environment()
@@ -104,6 +119,125 @@ class ParallelPyEnvironmentTest(tf.test.TestCase):
                         time_step2.observation.shape)
     env.close()
 
+  def test_step_shared_memory(self):
+    num_envs = 3
+    env = self._make_parallel_py_environment(
+        num_envs=num_envs, blocking=False, shared_memory=True)
+    action_spec = env.action_spec()
+    observation_spec = env.observation_spec()
+    rng = np.random.RandomState()
+    action = np.array([
+        array_spec.sample_bounded_spec(action_spec, rng)
+        for _ in range(num_envs)
+    ])
+    time_step = env.reset()
+    self.assertAllEqual([ts.StepType.FIRST] * num_envs, time_step.step_type)
+
+    time_step = env.step(action)
+    self.assertAllEqual((num_envs,) + observation_spec.shape,
+                        time_step.observation.shape)
+    for index, process_env in enumerate(env._envs):
+      expected = process_env.call('current_time_step')()
+      self.assertAllEqual(expected.observation, time_step.observation[index])
+      self.assertAllEqual(expected.reward, time_step.reward[index])
+
+    # The previous time step must stay intact while the next one is written.
+    expected_observation = np.copy(time_step.observation)
+    time_step2 = env.step(action)
+    self.assertAllEqual(expected_observation, time_step.observation)
+    for index, process_env in enumerate(env._envs):
+      expected = process_env.call('current_time_step')()
+      self.assertAllEqual(expected.observation, time_step2.observation[index])
+    env.close()
+
+  def test_step_and_read(self):
+    num_envs = 2
+    for shared_memory in (False, True):
+      env = self._make_parallel_py_environment(
+          num_envs=num_envs, blocking=False, shared_memory=shared_memory)
+      rng = np.random.RandomState()
+      action = np.array([
+          array_spec.sample_bounded_spec(env.action_spec(), rng)
+          for _ in range(num_envs)
+      ])
+      env.reset()
+      time_step, attributes = env.step_and_read(
+          action, ['current_time_step', 'batched'])
+      self.assertEqual([False] * num_envs, attributes['batched'])
+      for index in range(num_envs):
+        self.assertAllEqual(attributes['current_time_step'][index].observation,
+                            time_step.observation[index])
+      self.assertIs(time_step, env.current_time_step())
+      env.close()
+
+  def test_auto_reset(self):
+    self._set_default_specs()
+    constructor = functools.partial(
+        random_py_environment.RandomPyEnvironment,
+        self.observation_spec,
+        self.action_spec,
+        episode_end_probability=0.0,
+        max_duration=2)
+    for num_envs_per_process in (1, 2):
+      env = parallel_py_environment.ParallelPyEnvironment(
+          [constructor] * 2, num_envs_per_process=num_envs_per_process,
+          auto_reset=True)
+      self.assertTrue(env.auto_reset)
+      action = np.zeros((2,) + self.action_spec.shape, np.float32)
+      env.reset()
+      time_step = env.step(action)
+      self.assertAllEqual([ts.StepType.MID] * 2, time_step.step_type)
+      self.assertAllEqual(time_step.observation,
+                          env.get_info()['final_observation'])
+
+      time_step = env.step(action)
+      self.assertAllEqual([ts.StepType.FIRST] * 2, time_step.step_type)
+      self.assertAllEqual([0.0] * 2, time_step.discount)
+      final_observation = env.get_info()['final_observation']
+      self.assertAllEqual((2,) + self.observation_spec.shape,
+                          final_observation.shape)
+      self.assertNotAllClose(time_step.observation, final_observation)
+      env.close()
+
+  def test_step_multiple_envs_per_process(self):
+    num_envs = 5
+    for shared_memory in (False, True):
+      env = self._make_parallel_py_environment(
+          num_envs=num_envs, blocking=False, shared_memory=shared_memory,
+          num_envs_per_process=2)
+      self.assertLen(env._envs, 3)
+      self.assertEqual(num_envs, env.batch_size)
+      action_spec = env.action_spec()
+      observation_spec = env.observation_spec()
+      rng = np.random.RandomState()
+      action = np.array([
+          array_spec.sample_bounded_spec(action_spec, rng)
+          for _ in range(num_envs)
+      ])
+      time_step = env.reset()
+      self.assertAllEqual([ts.StepType.FIRST] * num_envs, time_step.step_type)
+      time_step = env.step(action)
+      self.assertAllEqual((num_envs,) + observation_spec.shape,
+                          time_step.observation.shape)
+      self.assertAllEqual((num_envs,), time_step.reward.shape)
+
+      # The last process only runs the remaining environment.
+      expected = env._envs[2].call('current_time_step')()
+      self.assertAllEqual(expected.observation, time_step.observation[4:])
+      env.close()
+
+  def test_seedable_multiple_envs_per_process(self):
+    env = self._make_parallel_py_environment(
+        num_envs=3, num_envs_per_process=2)
+    env.seed([0, 1, 2])
+    self.assertEqual(
+        np.random.RandomState(1).get_state()[1][-1],
+        env._envs[0].envs[1]._rng.get_state()[1][-1])
+    self.assertEqual(
+        np.random.RandomState(2).get_state()[1][-1],
+        env._envs[1].envs[0]._rng.get_state()[1][-1])
+    env.close()
+
   def test_non_blocking_start_processes_in_parallel(self):
     self._set_default_specs()
     constructor = functools.partial(
@@ -195,6 +329,84 @@ class ParallelPyEnvironmentTest(tf.test.TestCase):
     env.close()
 
 
+class AsyncParallelPyEnvironmentTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(AsyncParallelPyEnvironmentTest, self).setUp()
+    # Waiting on the first ready environment requires real connections.
+    parallel_py_environment.multiprocessing = multiprocessing
+    self.observation_spec = array_spec.ArraySpec((3, 3), np.float32)
+    self.action_spec = array_spec.BoundedArraySpec(
+        [7], dtype=np.float32, minimum=-1.0, maximum=1.0)
+
+  def _make_env(self, time_sleeps):
+    constructors = [
+        functools.partial(
+            SlowSteppingEnvironment,
+            self.observation_spec,
+            self.action_spec,
+            episode_end_probability=0.0,
+            time_sleep=time_sleep) for time_sleep in time_sleeps
+    ]
+    return parallel_py_environment.ParallelPyEnvironment(constructors)
+
+  def _sample_actions(self, num_actions):
+    rng = np.random.RandomState()
+    return np.array([
+        array_spec.sample_bounded_spec(self.action_spec, rng)
+        for _ in range(num_actions)
+    ])
+
+  def test_recv_first_ready(self):
+    env = self._make_env([2.0, 0.0, 0.0])
+    env.async_reset()
+    time_step, env_ids = env.recv()
+    self.assertAllEqual([0, 1, 2], env_ids)
+    self.assertAllEqual([ts.StepType.FIRST] * 3, time_step.step_type)
+
+    env.send(self._sample_actions(3), env_ids)
+    time_step, env_ids = env.recv(2)
+    self.assertAllEqual([1, 2], env_ids)
+    self.assertAllEqual((2, 3, 3), time_step.observation.shape)
+
+    # The fast environments can be stepped again while the slow one runs.
+    env.send(self._sample_actions(2), env_ids)
+    _, env_ids = env.recv(2)
+    self.assertAllEqual([1, 2], env_ids)
+
+    time_step, env_ids = env.recv(1)
+    self.assertAllEqual([0], env_ids)
+    self.assertAllEqual([ts.StepType.MID], time_step.step_type)
+    env.close()
+
+  def test_recv_env_ids(self):
+    env = self._make_env([0.0, 2.0, 0.0])
+    env.async_reset()
+    env.recv()
+    env.send(self._sample_actions(3), [0, 1, 2])
+    # Waits for the slow environment even though the others are ready.
+    time_step, env_ids = env.recv(env_ids=[1])
+    self.assertAllEqual([1], env_ids)
+    self.assertAllEqual([ts.StepType.MID], time_step.step_type)
+    with self.assertRaises(ValueError):
+      env.recv(env_ids=[1])
+    _, env_ids = env.recv(env_ids=[2, 0])
+    self.assertAllEqual([0, 2], env_ids)
+    env.close()
+
+  def test_send_to_busy_environment_raises(self):
+    env = self._make_env([0.0, 0.0])
+    env.async_reset()
+    with self.assertRaises(RuntimeError):
+      env.send(self._sample_actions(1), [0])
+    with self.assertRaises(RuntimeError):
+      env.step(self._sample_actions(2))
+    with self.assertRaises(ValueError):
+      env.recv(3)
+    env.recv()
+    env.close()
+
+
 class ProcessPyEnvironmentTest(tf.test.TestCase):
 
   def test_close_no_hang_after_init(self):
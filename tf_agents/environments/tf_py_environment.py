@@ -323,14 +323,119 @@ class TFPyEnvironment(tf_environment.TFEnvironment):
       return self._set_names_and_shapes(step_type, reward, discount,
                                         *flat_observations)
 
+  # Make sure this is called without conversion from tf.function.
+  @autograph.do_not_convert()
+  def async_reset(self):
+    """Returns an op that asynchronously resets all environments.
+
+    Only supported when the wrapped environment implements the asynchronous
+    `async_reset`/`send`/`recv` API, e.g. `ParallelPyEnvironment`. The first
+    time steps are returned by subsequent calls to `recv`.
+
+    Returns:
+      An op that starts the reset.
+    """
+
+    def _async_reset_py():
+      with _check_not_called_concurrently(self._lock):
+        self._env.async_reset()
+
+    def _isolated_async_reset_py():
+      return self._execute(_async_reset_py)
+
+    with tf.name_scope('async_reset'):
+      return tf.numpy_function(
+          _isolated_async_reset_py,
+          [],  # No inputs.
+          [],
+          name='async_reset_py_func')
+
+  # Make sure this is called without conversion from tf.function.
+  @autograph.do_not_convert()
+  def send(self, actions, env_ids):
+    """Returns an op that asynchronously steps a subset of the environments.
+
+    Args:
+      actions: A Tensor, or a nested dict, list or tuple of Tensors
+        corresponding to `action_spec()`, with one entry per id in `env_ids`.
+      env_ids: An int32 vector with the ids of the environments to step, as
+        returned by `recv`.
+
+    Returns:
+      An op that dispatches the actions.
+    """
+
+    def _send_py(env_ids, *flattened_actions):
+      with _check_not_called_concurrently(self._lock):
+        packed = tf.nest.pack_sequence_as(
+            structure=self.action_spec(), flat_sequence=flattened_actions)
+        self._env.send(packed, env_ids)
+
+    def _isolated_send_py(env_ids, *flattened_actions):
+      return self._execute(_send_py, env_ids, *flattened_actions)
+
+    with tf.name_scope('send'):
+      env_ids = tf.convert_to_tensor(env_ids, dtype=tf.int32)
+      flat_actions = [tf.identity(x) for x in tf.nest.flatten(actions)]
+      return tf.numpy_function(
+          _isolated_send_py,
+          [env_ids] + flat_actions,
+          [],
+          name='send_py_func')
+
+  # Make sure this is called without conversion from tf.function.
+  @autograph.do_not_convert()
+  def recv(self, num_envs):
+    """Returns the time steps of the first `num_envs` environments to finish.
+
+    Args:
+      num_envs: Python int, the number of time steps to wait for.
+
+    Returns:
+      A tuple `(time_step, env_ids)` where `time_step` is a `TimeStep` with a
+      batch dimension of `num_envs` and `env_ids` is an int32 vector with the
+      id of the environment each entry belongs to.
+    """
+
+    def _recv_py():
+      with _check_not_called_concurrently(self._lock):
+        time_step, env_ids = self._env.recv(num_envs)
+        return tf.nest.flatten(time_step) + [env_ids]
+
+    def _isolated_recv_py():
+      return self._execute(_recv_py)
+
+    with tf.name_scope('recv'):
+      outputs = tf.numpy_function(
+          _isolated_recv_py,
+          [],  # No inputs.
+          self._time_step_dtypes + [tf.int32],
+          name='recv_py_func')
+      step_type, reward, discount = outputs[0:3]
+      flat_observations = outputs[3:-1]
+      env_ids = tf.identity(outputs[-1], name='env_ids')
+      batch_shape = tf.TensorShape([num_envs])
+      if not tf.executing_eagerly():
+        env_ids.set_shape(batch_shape)
+      time_step = self._set_names_and_shapes_with_batch_shape(
+          batch_shape, step_type, reward, discount, *flat_observations)
+      return time_step, env_ids
+
   def _set_names_and_shapes(self, step_type, reward, discount,
                             *flat_observations):
     """Returns a `TimeStep` namedtuple."""
+    batch_shape = () if not self.batched else (self.batch_size,)
+    return self._set_names_and_shapes_with_batch_shape(
+        tf.TensorShape(batch_shape), step_type, reward, discount,
+        *flat_observations)
+
+  def _set_names_and_shapes_with_batch_shape(self, batch_shape, step_type,
+                                             reward, discount,
+                                             *flat_observations):
+    """Returns a `TimeStep` namedtuple with the given outer batch shape."""
     step_type = tf.identity(step_type, name='step_type')
     reward = tf.identity(reward, name='reward')
     discount = tf.identity(discount, name='discount')
-    batch_shape = () if not self.batched else (self.batch_size,)
-    batch_shape = tf.TensorShape(batch_shape)
     if not tf.executing_eagerly():
       # Shapes are not required in eager mode.
       reward.set_shape(batch_shape.concatenate(
@@ -32,6 +32,7 @@ from tf_agents.environments import batched_py_environment
 from tf_agents.environments import py_environment
 from tf_agents.environments import tf_py_environment
 from tf_agents.trajectories import time_step as ts
+from tf_agents.utils import nest_utils
 
 COMMON_PARAMETERS = (
     dict(batch_py_env=True, isolation=True),
@@ -97,6 +98,29 @@ class PYEnvironmentMock(py_environment.PyEnvironment):
     return specs.ArraySpec([], np.int64, name='observation')
 
 
+class AsyncBatchedPyEnvironmentMock(batched_py_environment.BatchedPyEnvironment):
+  """Implements the asynchronous API by stepping envs when sending actions."""
+
+  def __init__(self, envs):
+    super(AsyncBatchedPyEnvironmentMock, self).__init__(
+        envs, multithreading=False)
+    self._ready = {}
+
+  def async_reset(self):
+    for env_id, env in enumerate(self.envs):
+      self._ready[env_id] = env.reset()
+
+  def send(self, actions, env_ids):
+    for env_id, action in zip(env_ids, actions):
+      self._ready[env_id] = self.envs[env_id].step(action)
+
+  def recv(self, num_envs):
+    env_ids = sorted(self._ready)[:num_envs]
+    time_steps = [self._ready.pop(env_id) for env_id in env_ids]
+    return (nest_utils.stack_nested_arrays(time_steps),
+            np.array(env_ids, dtype=np.int32))
+
+
 class TFPYEnvironmentTest(tf.test.TestCase, parameterized.TestCase):
 
   def testPyenv(self):
@@ -294,6 +318,27 @@ class TFPYEnvironmentTest(tf.test.TestCase, parameterized.TestCase):
 
     self.assertEqual(np.array([0]), observation)
 
+  @parameterized.parameters(dict(isolation=False), dict(isolation=True))
+  def testAsyncSendAndRecv(self, isolation):
+    py_env = AsyncBatchedPyEnvironmentMock(
+        [PYEnvironmentMock() for _ in range(3)])
+    tf_env = tf_py_environment.TFPyEnvironment(py_env, isolation=isolation)
+    self.evaluate(tf_env.async_reset())
+
+    time_step, env_ids = self.evaluate(tf_env.recv(2))
+    self.assertAllEqual([0, 1], env_ids)
+    self.assertAllEqual([ts.StepType.FIRST] * 2, time_step.step_type)
+    self.assertAllEqual([0, 0], time_step.observation)
+
+    self.evaluate(tf_env.send(tf.constant([1, 1]), env_ids))
+    time_step, env_ids = self.evaluate(tf_env.recv(3))
+    self.assertAllEqual([0, 1, 2], env_ids)
+    self.assertAllEqual([ts.StepType.MID, ts.StepType.MID,
+                         ts.StepType.FIRST], time_step.step_type)
+    self.assertAllEqual([1, 1, 0], time_step.observation)
+    self.assertEqual([1], py_env.envs[0].actions_taken)
+    self.assertEqual([], py_env.envs[2].actions_taken)
+
   @parameterized.parameters(dict(isolation=False), dict(isolation=True))
   def testIsolation(self, isolation):
     py_env = self._get_py_env(batch_py_env=False, isolation=isolation)
@@ -50,11 +50,13 @@ def validate_py_environment(environment, episodes=5):
   random_policy = random_py_policy.RandomPyPolicy(
       time_step_spec=time_step_spec, action_spec=action_spec)
 
+  time_step_checker = array_spec.ArraysNestChecker(time_step_spec)
+
   episode_count = 0
   time_step = environment.reset()
 
   while episode_count < episodes:
-    if not array_spec.check_arrays_nest(time_step, time_step_spec):
+    if not time_step_checker.check(time_step):
       raise ValueError(
           'Given `time_step`: %r does not match expected `time_step_spec`: %r' %
           (time_step, time_step_spec))
@@ -900,3 +900,106 @@ class OneHotActionWrapper(PyEnvironmentBaseWrapper):
         convert_back, action, self._one_hot_action_spec,
         self._env.action_spec())
     return self._env.step(action)
+
+
+@gin.configurable
+class AutoResetWrapper(PyEnvironmentBaseWrapper):
+  """Resets the environment in the same `step` call that ends an episode.
+
+  When the wrapped environment returns a `LAST` time step, it is reset right
+  away and the `FIRST` time step of the new episode is returned instead. That
+  time step carries the reward and discount of the final transition, and the
+  final observation is available through `final_observation` and `get_info`.
+
+  This avoids the boundary step otherwise needed to start the next episode:
+  every action passed to `step` is applied in the environment.
+  """
+
+  def __init__(self, env):
+    super(AutoResetWrapper, self).__init__(env)
+    self._final_observation = None
+
+  @property
+  def auto_reset(self):
+    return True
+
+  @property
+  def final_observation(self):
+    """Final observation of the episode ended by the last `step`, or None."""
+    return self._final_observation
+
+  def get_info(self):
+    """Returns the info of the wrapped environment and the final observation.
+
+    The info of the wrapped environment, if any, is returned with an added
+    `final_observation` key. If the last `step` did not end an episode,
+    `final_observation` is the current observation.
+
+    Raises:
+      ValueError: If the info of the wrapped environment already has a
+        `final_observation` key.
+    """
+    try:
+      info = self._env.get_info()
+    except NotImplementedError:
+      info = None
+    info = dict(info or {})
+    if 'final_observation' in info:
+      raise ValueError(
+          'The info of the wrapped environment already has a '
+          '`final_observation` key, which AutoResetWrapper would overwrite.')
+    final_observation = self._final_observation
+    if final_observation is None:
+      final_observation = self.current_time_step().observation
+    info['final_observation'] = final_observation
+    return info
+
+  def _reset(self):
+    self._final_observation = None
+    return self._env.reset()
+
+  def _step(self, action):
+    time_step = self._env.step(action)
+    self._final_observation = None
+    if time_step.is_last():
+      self._final_observation = time_step.observation
+      first_time_step = self._env.reset()
+      time_step = first_time_step._replace(
+          reward=time_step.reward, discount=time_step.discount)
+    return time_step
+
+
+@gin.configurable
+class ValidateSpecsWrapper(PyEnvironmentBaseWrapper):
+  """Checks the actions and time steps of an environment against its specs.
+
+  The checks run at the global validation level (see
+  `array_spec.set_validation_level`): tests keep the default full validation,
+  while production collection can sample the checks or turn them off without
+  removing the wrapper.
+  """
+
+  def __init__(self, env):
+    super(ValidateSpecsWrapper, self).__init__(env)
+    outer_dims = (self.batch_size,) if self.batch_size is not None else ()
+    self._action_checker = array_spec.ArraysNestChecker(
+        env.action_spec(), outer_dims=outer_dims)
+    self._time_step_checker = array_spec.ArraysNestChecker(
+        env.time_step_spec(), outer_dims=outer_dims)
+
+  def _check_time_step(self, time_step):
+    if not self._time_step_checker.maybe_check(time_step):
+      raise ValueError(
+          'Given `time_step`: %r does not match expected `time_step_spec`: %r' %
+          (time_step, self._time_step_checker.spec))
+    return time_step
+
+  def _reset(self):
+    return self._check_time_step(self._env.reset())
+
+  def _step(self, action):
+    if not self._action_checker.maybe_check(action):
+      raise ValueError(
+          'Given `action`: %r does not match expected `action_spec`: %r' %
+          (action, self._action_checker.spec))
+    return self._check_time_step(self._env.step(action))
@@ -1103,5 +1103,95 @@ class OneHotActionWrapperTest(test_utils.TestCase):
         mock_env.step.call_args[0][0]['continuous'])
 
 
+class AutoResetWrapperTest(test_utils.TestCase):
+
+  def _make_env(self):
+    obs_spec = array_spec.BoundedArraySpec((2, 3), np.int32, -10, 10)
+    action_spec = array_spec.BoundedArraySpec((), np.int32, 0, 1)
+    env = random_py_environment.RandomPyEnvironment(
+        obs_spec,
+        action_spec=action_spec,
+        episode_end_probability=0.0,
+        max_duration=2)
+    return wrappers.AutoResetWrapper(env)
+
+  def test_resets_in_the_step_ending_the_episode(self):
+    env = self._make_env()
+    action = np.array(0, dtype=np.int32)
+    env.reset()
+    time_step = env.step(action)
+    self.assertEqual(ts.StepType.MID, time_step.step_type)
+    self.assertIsNone(env.final_observation)
+    np.testing.assert_array_equal(time_step.observation,
+                                  env.get_info()['final_observation'])
+
+    time_step = env.step(action)
+    self.assertEqual(ts.StepType.FIRST, time_step.step_type)
+    self.assertEqual(0.0, time_step.discount)
+    self.assertEqual((2, 3), env.final_observation.shape)
+    np.testing.assert_array_equal(env.final_observation,
+                                  env.get_info()['final_observation'])
+
+    # The next action is applied in the new episode.
+    time_step = env.step(action)
+    self.assertEqual(ts.StepType.MID, time_step.step_type)
+    self.assertIsNone(env.final_observation)
+
+  def test_auto_reset_property(self):
+    self.assertTrue(self._make_env().auto_reset)
+
+  def test_get_info_merges_wrapped_env_info(self):
+    env = self._make_env()
+    env._env.get_info = lambda: {'lives': np.int32(3)}
+    env.reset()
+    time_step = env.step(np.array(0, dtype=np.int32))
+    info = env.get_info()
+    self.assertEqual(3, info['lives'])
+    np.testing.assert_array_equal(time_step.observation,
+                                  info['final_observation'])
+
+  def test_get_info_rejects_final_observation_key(self):
+    env = self._make_env()
+    env._env.get_info = lambda: {'final_observation': np.int32(0)}
+    env.reset()
+    with self.assertRaisesRegexp(ValueError, 'final_observation'):
+      env.get_info()
+
+
+class ValidateSpecsWrapperTest(test_utils.TestCase):
+
+  def tearDown(self):
+    array_spec.set_validation_level(array_spec.VALIDATION_FULL)
+    super(ValidateSpecsWrapperTest, self).tearDown()
+
+  def _make_env(self):
+    obs_spec = array_spec.BoundedArraySpec((2, 3), np.int32, -10, 10)
+    action_spec = array_spec.BoundedArraySpec((), np.int32, 0, 1)
+    env = random_py_environment.RandomPyEnvironment(
+        obs_spec, action_spec=action_spec, min_duration=5, max_duration=5)
+    return wrappers.ValidateSpecsWrapper(env)
+
+  def test_valid_actions(self):
+    env = self._make_env()
+    env.reset()
+    for _ in range(3):
+      time_step = env.step(np.array(1, dtype=np.int32))
+    self.assertEqual(ts.StepType.MID, time_step.step_type)
+
+  def test_invalid_action_raises(self):
+    env = self._make_env()
+    env.reset()
+    with self.assertRaisesRegexp(ValueError, 'expected `action_spec`'):
+      env.step(np.array(2, dtype=np.int32))
+    with self.assertRaisesRegexp(ValueError, 'expected `action_spec`'):
+      env.step(np.array(1, dtype=np.int64))
+
+  def test_validation_off(self):
+    array_spec.set_validation_level(array_spec.VALIDATION_OFF)
+    env = self._make_env()
+    env.reset()
+    env.step(np.array(2, dtype=np.int32))
+
+
 if __name__ == '__main__':
   test_utils.main()
@@ -19,9 +19,119 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import gin
 import numpy as np
 from tf_agents.metrics import py_metric
+from tf_agents.metrics import py_metrics
 from tf_agents.utils import nest_utils
+from tf_agents.utils import numpy_storage
+
+
+class BatchedStreamingMetric(py_metric.PyStepMetric):
+  """Base class for natively batched streaming metrics.
+
+  Equivalent to wrapping a `py_metrics.StreamingMetric` in `BatchedPyMetric`:
+  every environment of the batch keeps the last (upto) K values of the metric
+  in its own buffer and `result()` averages the per-environment means. The
+  `[batch_size]` accumulators are NumPy arrays updated with masked array ops,
+  so a step costs the same regardless of the batch size.
+  """
+
+  def __init__(self, name, buffer_size=10, batch_size=None):
+    super(BatchedStreamingMetric, self).__init__(name)
+    self._buffer_size = buffer_size
+    self._buffers = None
+    if batch_size is not None:
+      self.build(batch_size)
+
+  @property
+  def batch_size(self):
+    return None if self._buffers is None else len(self._buffers.lengths())
+
+  def build(self, batch_size):
+    self._buffers = py_metrics.BatchedNumpyDeque(
+        batch_size, self._buffer_size, dtype=np.float64)
+    self._reset(batch_size)
+
+  def reset(self):
+    if self._buffers is not None:
+      self._buffers.clear()
+      self._reset(self.batch_size)
+
+  def _reset(self, batch_size):
+    """Reset stat gathering variables in child classes."""
+    raise NotImplementedError('_reset is not implemented.')
+
+  def _batched_call(self, trajectory):
+    """Call with a trajectory batched to the built batch size."""
+    raise NotImplementedError('_batched_call is not implemented.')
+
+  def call(self, trajectory):
+    if self._buffers is None:
+      self.build(trajectory.step_type.shape[0])
+    self._batched_call(trajectory)
+
+  def result(self):
+    if self._buffers is None:
+      return np.array(0.0, dtype=np.float32)
+    return np.mean(self._buffers.means().astype(np.float32))
+
+
+@gin.configurable
+class BatchedAverageReturnMetric(BatchedStreamingMetric):
+  """Natively batched version of `py_metrics.AverageReturnMetric`."""
+
+  def __init__(self, name='AverageReturn', buffer_size=10, batch_size=None):
+    self._np_state = numpy_storage.NumpyState()
+    # Set a dummy value on self._np_state.episode_return so it gets included in
+    # the first checkpoint (before metric is first called).
+    self._np_state.episode_return = np.float64(0)
+    super(BatchedAverageReturnMetric, self).__init__(
+        name, buffer_size=buffer_size, batch_size=batch_size)
+
+  def _reset(self, batch_size):
+    self._np_state.episode_return = np.zeros(
+        shape=(batch_size,), dtype=np.float64)
+
+  def _batched_call(self, trajectory):
+    episode_return = self._np_state.episode_return
+    episode_return[trajectory.is_first()] = 0
+    episode_return += trajectory.reward
+    last_indices = np.flatnonzero(trajectory.is_last())
+    self._buffers.add(last_indices, episode_return[last_indices])
+
+
+@gin.configurable
+class BatchedAverageEpisodeLengthMetric(BatchedStreamingMetric):
+  """Natively batched version of `py_metrics.AverageEpisodeLengthMetric`."""
+
+  def __init__(self, name='AverageEpisodeLength', buffer_size=10,
+               batch_size=None):
+    self._np_state = numpy_storage.NumpyState()
+    # Set a dummy value on self._np_state.episode_steps so it gets included in
+    # the first checkpoint (before metric is first called).
+    self._np_state.episode_steps = np.float64(0)
+    super(BatchedAverageEpisodeLengthMetric, self).__init__(
+        name, buffer_size=buffer_size, batch_size=batch_size)
+
+  def _reset(self, batch_size):
+    self._np_state.episode_steps = np.zeros(
+        shape=(batch_size,), dtype=np.float64)
+
+  def _batched_call(self, trajectory):
+    episode_steps = self._np_state.episode_steps
+    # Each non-boundary trajectory (first, mid or last) represents a step.
+    episode_steps[~trajectory.is_boundary()] += 1
+    last_indices = np.flatnonzero(trajectory.is_last())
+    self._buffers.add(last_indices, episode_steps[last_indices])
+    episode_steps[last_indices] = 0
+
+
+# Python metrics with a natively batched equivalent.
+_NATIVE_BATCHED_METRICS = {
+    py_metrics.AverageReturnMetric: BatchedAverageReturnMetric,
+    py_metrics.AverageEpisodeLengthMetric: BatchedAverageEpisodeLengthMetric,
+}
 
 
 class BatchedPyMetric(py_metric.PyStepMetric):
@@ -29,6 +139,12 @@ class BatchedPyMetric(py_metric.PyStepMetric):
 
   This can be used to wrap any python metric that takes a single trajectory to
   produce a batched version of the metric that takes a batch of trajectories.
+
+  Metrics with a natively batched equivalent (see `BatchedStreamingMetric`)
+  are computed with that equivalent instead of one metric per environment.
+  Their state is then checkpointed under a single `_native_metric` dependency
+  instead of the per-environment `_metrics`, so checkpoints of the two layouts
+  cannot be restored into each other.
   """
 
   def __init__(self,
@@ -48,18 +164,33 @@ class BatchedPyMetric(py_metric.PyStepMetric):
       name = self._metric_class(**self._metric_args).name
     super(BatchedPyMetric, self).__init__(name)
 
+    self._native_metric = None
+    native_metric_class = _NATIVE_BATCHED_METRICS.get(self._metric_class)
+    buffer_size = self._metric_args.get('buffer_size', 10)
+    if native_metric_class is not None and not np.isinf(buffer_size):
+      self._native_metric = native_metric_class(
+          name=name, buffer_size=buffer_size)
+
     self._built = False
     self._dtype = dtype
     if batch_size is not None:
       self.build(batch_size)
 
   def build(self, batch_size):
-    self._metrics = [self._metric_class(**self._metric_args)
-                     for _ in range(batch_size)]
-    for metric in self._metrics:
-      metric.reset()
+    if self._native_metric is not None:
+      self._native_metric.build(batch_size)
+    else:
+      self._metrics = [self._metric_class(**self._metric_args)
+                       for _ in range(batch_size)]
+      for metric in self._metrics:
+        metric.reset()
     self._built = True
 
+  def _built_batch_size(self):
+    if self._native_metric is not None:
+      return self._native_metric.batch_size
+    return len(self._metrics)
+
   def call(self, batched_trajectory):
     """Processes the batched_trajectory to update the metric.
 
@@ -69,32 +200,42 @@ class BatchedPyMetric(py_metric.PyStepMetric):
     Raises:
       ValueError: If the batch size is an unexpected value.
     """
-    trajectories = nest_utils.unstack_nested_arrays(batched_trajectory)
-    batch_size = len(trajectories)
+    if self._native_metric is not None:
+      trajectories = None
+      batch_size = batched_trajectory.step_type.shape[0]
+    else:
+      trajectories = nest_utils.unstack_nested_arrays(batched_trajectory)
+      batch_size = len(trajectories)
     if not self._built:
       self.build(batch_size)
-    if batch_size != len(self._metrics):
+    if batch_size != self._built_batch_size():
       raise ValueError('Batch size {} does not match previously set batch '
                        'size {}. Make sure your batch size is set correctly '
                        'in BatchedPyMetric initialization and that the batch '
-                       'size remains constant.'.format(batch_size,
-                                                       len(self._metrics)))
+                       'size remains constant.'.format(
+                           batch_size, self._built_batch_size()))
 
+    if self._native_metric is not None:
+      self._native_metric(batched_trajectory)
+      return
     for metric, trajectory in zip(self._metrics, trajectories):
       metric(trajectory)
 
   def reset(self):
     """Resets internal stat gathering variables used to compute the metric."""
-    if self._built:
+    if self._native_metric is not None:
+      self._native_metric.reset()
+    elif self._built:
       for metric in self._metrics:
         metric.reset()
 
   def result(self):
     """Evaluates the current value of the metric."""
-    if self._built:
-      return self._metric_class.aggregate(self._metrics)
-    else:
+    if not self._built:
       return np.array(0.0, dtype=self._dtype)
+    if self._native_metric is not None:
+      return self._native_metric.result()
+    return self._metric_class.aggregate(self._metrics)
 
   @staticmethod
   def aggregate(metrics):
@@ -19,6 +19,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import numpy as np
 import tensorflow as tf  # pylint: disable=g-explicit-tensorflow-version-import
 from tf_agents.metrics import batched_py_metric
 from tf_agents.metrics import py_metrics
@@ -114,6 +115,68 @@ class BatchedPyMetricTest(tf.test.TestCase):
     batched_avg_return_metric(self._ts5)
     self.assertEqual(batched_avg_return_metric.result(), 13)
 
+  def testNativeMetricMatchesPerEnvironmentMetrics(self):
+    # Environment 0 runs two-step episodes and environment 1 one-step ones, so
+    # they finish a different number of episodes.
+    step_types = [(0, 0), (1, 2), (2, 0), (0, 2), (1, 0), (2, 2), (0, 0),
+                  (1, 2), (2, 0)]
+    trajectories = []
+    for i, (step_type_0, step_type_1) in enumerate(step_types):
+      trajectories.append(
+          nest_utils.stack_nested_arrays([
+              self._trajectory(step_type_0, float(i)),
+              self._trajectory(step_type_1, float(2 * i + 1)),
+          ]))
+
+    for metric_class in (py_metrics.AverageReturnMetric,
+                         py_metrics.AverageEpisodeLengthMetric):
+      native_metric = batched_py_metric.BatchedPyMetric(
+          metric_class, metric_args={'buffer_size': 2})
+      self.assertIsNotNone(native_metric._native_metric)
+      for traj in trajectories:
+        native_metric(traj)
+
+      expected_per_env_metrics = [metric_class(buffer_size=2),
+                                  metric_class(buffer_size=2)]
+      for traj in trajectories:
+        for metric, env_traj in zip(expected_per_env_metrics,
+                                    nest_utils.unstack_nested_arrays(traj)):
+          metric(env_traj)
+      self.assertAllClose(metric_class.aggregate(expected_per_env_metrics),
+                          native_metric.result())
+
+  def testSaveRestoreMidEpisode(self):
+    batched_avg_return_metric = batched_py_metric.BatchedPyMetric(
+        py_metrics.AverageReturnMetric, batch_size=2)
+    batched_avg_return_metric(self._ts0)
+    batched_avg_return_metric(self._ts1)
+
+    checkpoint = tf.train.Checkpoint(metric=batched_avg_return_metric)
+    prefix = self.get_temp_dir() + '/ckpt'
+    save_path = checkpoint.save(prefix)
+    batched_avg_return_metric.reset()
+    checkpoint.restore(save_path).assert_consumed()
+
+    # The returns accumulated before saving are part of the finished episodes.
+    batched_avg_return_metric(self._ts2)
+    self.assertEqual(batched_avg_return_metric.result(), 5)
+
+  def _trajectory(self, step_type, reward):
+    if step_type == 0:
+      return trajectory.first((), (), (), reward, 1.)
+    elif step_type == 1:
+      return trajectory.mid((), (), (), reward, 1.)
+    return trajectory.last((), (), (), reward, 1.)
+
+  def testUnboundedBufferUsesPerEnvironmentMetrics(self):
+    batched_avg_return_metric = batched_py_metric.BatchedPyMetric(
+        py_metrics.AverageReturnMetric, metric_args={'buffer_size': np.inf})
+    self.assertIsNone(batched_avg_return_metric._native_metric)
+    batched_avg_return_metric(self._ts0)
+    batched_avg_return_metric(self._ts1)
+    batched_avg_return_metric(self._ts2)
+    self.assertEqual(batched_avg_return_metric.result(), 5)
+
 
 if __name__ == '__main__':
   tf.test.main()
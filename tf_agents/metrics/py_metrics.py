@@ -65,8 +65,38 @@ class NumpyDeque(numpy_storage.NumpyState):
       self._start_index = np.mod(self._start_index + 1, self._maxlen)
 
   def extend(self, values):
-    for value in values:
-      self.add(value)
+    """Appends all `values` with at most two slice assignments."""
+    values = np.asarray(values, dtype=self._buffer.dtype).reshape(-1)
+    num_values = values.shape[0]
+    if not num_values:
+      return
+
+    if np.isinf(self._maxlen):
+      new_len = int(self._len) + num_values
+      if new_len > self._buffer.shape[0]:
+        self._buffer.resize((max(self._buffer.shape[0] * 2, new_len),))
+      self._buffer[self._len:new_len] = values
+      self._len = np.int64(new_len)
+      return
+
+    maxlen = int(self._maxlen)
+    if num_values >= maxlen:
+      # Only the last `maxlen` values survive.
+      self._buffer[:] = values[-maxlen:]
+      self._start_index = np.int64(0)
+      self._len = np.int64(maxlen)
+      return
+
+    insert_idx = int((self._start_index + self._len) % maxlen)
+    num_before_wrap = min(num_values, maxlen - insert_idx)
+    self._buffer[insert_idx:insert_idx + num_before_wrap] = (
+        values[:num_before_wrap])
+    self._buffer[:num_values - num_before_wrap] = values[num_before_wrap:]
+    new_len = self._len + num_values
+    if new_len > maxlen:
+      self._start_index = np.mod(self._start_index + new_len - maxlen, maxlen)
+      new_len = maxlen
+    self._len = np.int64(new_len)
 
   def __len__(self):
     return self._len
@@ -79,6 +109,56 @@ class NumpyDeque(numpy_storage.NumpyState):
     return np.mean(self._buffer[:self._len], dtype=dtype)
 
 
+class BatchedNumpyDeque(numpy_storage.NumpyState):
+  """A batch of deques stored as rows of a single circular numpy buffer."""
+
+  def __init__(self, batch_size, maxlen, dtype):
+    """Deques of the same finite `maxlen`, with FIFO evictions.
+
+    Args:
+      batch_size: Number of deques.
+      maxlen: Maximum length of each deque before beginning to evict its
+        oldest entries. Must be finite.
+      dtype: Data type of deque elements.
+
+    Raises:
+      ValueError: If `maxlen` is not finite.
+    """
+    if np.isinf(maxlen):
+      raise ValueError('BatchedNumpyDeque requires a finite maxlen.')
+    self._maxlen = np.int64(maxlen)
+    # Entries past the length of a deque are kept at zero, so row sums only
+    # include the stored values.
+    self._buffer = np.zeros(shape=(batch_size, self._maxlen), dtype=dtype)
+    self._num_added = np.zeros(shape=(batch_size,), dtype=np.int64)
+    self._len = np.zeros(shape=(batch_size,), dtype=np.int64)
+
+  def clear(self):
+    self._buffer[:] = 0
+    self._num_added[:] = 0
+    self._len[:] = 0
+
+  def add(self, indices, values):
+    """Appends `values[i]` to the deque `indices[i]`.
+
+    Args:
+      indices: An int array of unique deque indices.
+      values: An array with one value per entry of `indices`.
+    """
+    self._buffer[indices, self._num_added[indices] % self._maxlen] = values
+    self._num_added[indices] += 1
+    self._len[indices] = np.minimum(self._len[indices] + 1, self._maxlen)
+
+  def lengths(self):
+    return self._len
+
+  def means(self, dtype=None):
+    """Returns the mean of every deque, or zero for the empty ones."""
+    sums = np.sum(self._buffer, axis=1, dtype=dtype)
+    return np.where(self._len > 0, sums / np.maximum(self._len, 1),
+                    np.zeros_like(sums))
+
+
 @six.add_metaclass(abc.ABCMeta)
 class StreamingMetric(py_metric.PyStepMetric):
   """Abstract base class for streaming metrics.
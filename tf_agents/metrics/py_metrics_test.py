@@ -265,6 +265,56 @@ class NumpyDequeTest(tf.test.TestCase):
     buf.add(6)
     self.assertEqual(5, buf.mean())
 
+  def testExtendMatchesAdd(self):
+    for values in ([], [1], [1, 2, 3], [1, 2, 3, 4, 5, 6, 7, 8, 9]):
+      extended = py_metrics.NumpyDeque(maxlen=4, dtype=np.float64)
+      added = py_metrics.NumpyDeque(maxlen=4, dtype=np.float64)
+      for _ in range(2):
+        extended.extend(values)
+        for value in values:
+          added.add(value)
+        self.assertEqual(len(added), len(extended))
+        if values:
+          self.assertEqual(added.mean(), extended.mean())
+
+  def testExtendWraps(self):
+    buf = py_metrics.NumpyDeque(maxlen=4, dtype=np.float64)
+    buf.extend([2, 3, 5])
+    buf.extend(np.array([6, 8, 9]))
+    self.assertEqual(4, len(buf))
+    self.assertEqual(7, buf.mean())
+
+  def testUnboundedExtend(self):
+    buf = py_metrics.NumpyDeque(maxlen=np.inf, dtype=np.float64)
+    buf.extend(range(51))
+    buf.extend(range(51, 101))
+    self.assertEqual(101, len(buf))
+    self.assertEqual(50, buf.mean())
+
+
+class BatchedNumpyDequeTest(tf.test.TestCase):
+
+  def testMeans(self):
+    buf = py_metrics.BatchedNumpyDeque(
+        batch_size=3, maxlen=2, dtype=np.float64)
+    buf.add(np.array([0, 1]), np.array([2., 4.]))
+    buf.add(np.array([0]), np.array([6.]))
+    buf.add(np.array([0]), np.array([8.]))
+    self.assertAllEqual([2, 1, 0], buf.lengths())
+    self.assertAllEqual([7., 4., 0.], buf.means())
+
+  def testClear(self):
+    buf = py_metrics.BatchedNumpyDeque(
+        batch_size=2, maxlen=2, dtype=np.float64)
+    buf.add(np.array([0, 1]), np.array([2., 4.]))
+    buf.clear()
+    buf.add(np.array([1]), np.array([6.]))
+    self.assertAllEqual([0., 6.], buf.means())
+
+  def testUnboundedRaises(self):
+    with self.assertRaisesRegexp(ValueError, 'finite maxlen'):
+      py_metrics.BatchedNumpyDeque(batch_size=2, maxlen=np.inf, dtype=np.int64)
+
 
 if __name__ == '__main__':
   tf.test.main()
@@ -44,10 +44,25 @@ class TFDeque(object):
   def data(self):
     return self._buffer[:self.length]
 
-  @common.function(autograph=True)
+  @common.function
   def extend(self, value):
-    for v in value:
-      self.add(v)
+    """Appends all the entries of `value` with a single `scatter_update`.
+
+    Args:
+      value: A `Tensor` (or list) of values. It is flattened, so the values are
+        appended in row-major order.
+    """
+    value = tf.reshape(tf.convert_to_tensor(value, dtype=self._dtype), [-1])
+    num_values = tf.size(value)
+    # Only the last `max_len` values survive, so writing just those keeps the
+    # scatter indices unique.
+    num_dropped = tf.maximum(num_values - self._max_len, 0)
+    positions = tf.math.mod(
+        self._head + num_dropped + tf.range(num_values - num_dropped),
+        self._max_len)
+    self._buffer.scatter_update(
+        tf.IndexedSlices(value[num_dropped:], positions))
+    self._head.assign_add(num_values)
 
   @common.function(autograph=True)
   def add(self, value):
@@ -169,9 +184,8 @@ class AverageReturnMetric(tf_metric.TFStepMetric):
     self._return_accumulator.assign_add(trajectory.reward)
 
     # Add final returns to buffer.
-    last_episode_indices = tf.squeeze(tf.where(trajectory.is_last()), axis=-1)
-    for indx in last_episode_indices:
-      self._buffer.add(self._return_accumulator[indx])
+    self._buffer.extend(
+        tf.boolean_mask(self._return_accumulator, trajectory.is_last()))
 
     return trajectory
 
@@ -213,8 +227,7 @@ class AverageEpisodeLengthMetric(tf_metric.TFStepMetric):
 
     # Add lengths to buffer when we hit end of episode
     last_indices = tf.squeeze(tf.where(trajectory.is_last()), axis=-1)
-    for indx in last_indices:
-      self._buffer.add(self._length_accumulator[indx])
+    self._buffer.extend(tf.gather(self._length_accumulator, last_indices))
 
     # Clear length accumulator at the end of episodes.
     self._length_accumulator.scatter_update(
@@ -94,6 +94,23 @@ class TFDequeTest(tf.test.TestCase):
     self.assertEqual(3.0, self.evaluate(d.mean()))
     self.assertEqual(tf.float32, d.mean().dtype)
 
+  def test_extend_rolls_over(self):
+    d = tf_metrics.TFDeque(3, tf.int32)
+    self.evaluate(tf.compat.v1.global_variables_initializer())
+
+    self.evaluate(d.extend([1, 2]))
+    self.assertAllEqual([1, 2], self.evaluate(d.data))
+
+    self.evaluate(d.extend([3, 4]))
+    self.assertAllEqual([4, 2, 3], self.evaluate(d.data))
+
+    self.evaluate(d.extend(tf.constant([], dtype=tf.int32)))
+    self.assertAllEqual([4, 2, 3], self.evaluate(d.data))
+
+    # Only the last `max_len` values of a long batch are kept.
+    self.evaluate(d.extend([5, 6, 7, 8, 9]))
+    self.assertAllEqual([7, 8, 9], self.evaluate(d.data))
+
 
 class TFMetricsTest(parameterized.TestCase, tf.test.TestCase):
 
@@ -23,6 +23,7 @@ from __future__ import division
 from __future__ import print_function
 
 import gin
+import numpy as np
 import tensorflow as tf  # pylint: disable=g-explicit-tensorflow-version-import
 import tensorflow_probability as tfp
 
@@ -30,6 +31,7 @@ from tf_agents.bandits.policies import policy_utilities
 from tf_agents.policies import greedy_policy
 from tf_agents.policies import random_tf_policy
 from tf_agents.policies import tf_policy
+from tf_agents.specs import tensor_spec
 from tf_agents.trajectories import policy_step
 from tf_agents.utils import nest_utils
 
@@ -40,7 +42,8 @@ tfd = tfp.distributions
 class EpsilonGreedyPolicy(tf_policy.Base):
   """Returns epsilon-greedy samples of a given policy."""
 
-  def __init__(self, policy, epsilon, name=None):
+  def __init__(self, policy, epsilon, name=None,
+               vectorized_random_actions=False):
     """Builds an epsilon-greedy MixturePolicy wrapping the given policy.
 
     Args:
@@ -49,9 +52,16 @@ class EpsilonGreedyPolicy(tf_policy.Base):
         float scalar, a scalar Tensor of shape=(), or a callable that returns a
         float scalar or Tensor.
       name: The name of this policy.
+      vectorized_random_actions: If True, random actions are drawn with a
+        single `tf.random.uniform` call for the whole batch instead of running
+        the wrapped `RandomTFPolicy`. Only supported for a single discrete
+        action spec shaped () or (1,), and policies without info or log
+        probabilities. Action masks from
+        `observation_and_action_constraint_splitter` are still respected.
 
     Raises:
-      ValueError: If epsilon is invalid.
+      ValueError: If epsilon is invalid, or if `vectorized_random_actions` is
+        True and the policy is not supported.
     """
     observation_and_action_constraint_splitter = getattr(
         policy, 'observation_and_action_constraint_splitter', None)
@@ -67,6 +77,25 @@ class EpsilonGreedyPolicy(tf_policy.Base):
             observation_and_action_constraint_splitter),
         accepts_per_arm_features=accepts_per_arm_features,
         info_spec=policy.info_spec)
+    self._vectorized_random_actions = vectorized_random_actions
+    if vectorized_random_actions:
+      action_spec = policy.action_spec
+      if (not isinstance(action_spec, tensor_spec.BoundedTensorSpec) or
+          not action_spec.dtype.is_integer or
+          action_spec.shape.num_elements() != 1 or
+          action_spec.shape.rank > 1):
+        raise ValueError(
+            'vectorized_random_actions requires a single discrete '
+            'BoundedTensorSpec action spec shaped () or (1,); got {}.'.format(
+                action_spec))
+      if policy.info_spec or policy.emit_log_probability or (
+          accepts_per_arm_features):
+        raise ValueError(
+            'vectorized_random_actions does not support policies with info, '
+            'log probabilities or per-arm features.')
+      self._action_minimum = int(np.min(action_spec.minimum))
+      self._num_actions = int(np.max(action_spec.maximum)) - (
+          self._action_minimum) + 1
     super(EpsilonGreedyPolicy, self).__init__(
         policy.time_step_spec,
         policy.action_spec,
@@ -90,12 +119,35 @@ class EpsilonGreedyPolicy(tf_policy.Base):
     else:
       return self._epsilon
 
+  def _sample_random_action(self, time_step, outer_shape, seed):
+    """Draws uniform random actions for the whole batch at once."""
+    if self.observation_and_action_constraint_splitter is not None:
+      _, mask = self.observation_and_action_constraint_splitter(
+          time_step.observation)
+      # The argmax of i.i.d. uniform scores over the allowed actions is uniform
+      # among them.
+      scores = tf.random.uniform(tf.shape(mask), seed=seed)
+      scores = tf.compat.v1.where(
+          tf.cast(mask, tf.bool), scores, -tf.ones_like(scores))
+      action = tf.argmax(scores, axis=-1, output_type=tf.int32)
+    else:
+      action = tf.random.uniform(
+          outer_shape, maxval=self._num_actions, dtype=tf.int32, seed=seed)
+    action = tf.cast(action + self._action_minimum, self.action_spec.dtype)
+    if self.action_spec.shape.rank == 1:
+      action = tf.expand_dims(action, axis=-1)
+    return policy_step.PolicyStep(action, (), ())
+
   def _action(self, time_step, policy_state, seed):
     seed_stream = tfp.util.SeedStream(seed=seed, salt='epsilon_greedy')
     greedy_action = self._greedy_policy.action(time_step, policy_state)
-    random_action = self._random_policy.action(time_step, (), seed_stream())
-
     outer_shape = nest_utils.get_outer_shape(time_step, self._time_step_spec)
+    if self._vectorized_random_actions:
+      random_action = self._sample_random_action(time_step, outer_shape,
+                                                 seed_stream())
+    else:
+      random_action = self._random_policy.action(time_step, (), seed_stream())
+
     rng = tf.random.uniform(
         outer_shape, maxval=1.0, seed=seed_stream(), name='epsilon_rng')
     cond = tf.greater(rng, self._get_epsilon())
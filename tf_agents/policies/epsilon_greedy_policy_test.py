@@ -25,7 +25,9 @@ import numpy as np
 import tensorflow as tf  # pylint: disable=g-explicit-tensorflow-version-import
 from tf_agents.bandits.policies import policy_utilities as policy_util
 from tf_agents.policies import epsilon_greedy_policy
+from tf_agents.networks import q_network
 from tf_agents.policies import fixed_policy
+from tf_agents.policies import q_policy
 from tf_agents.specs import tensor_spec
 from tf_agents.trajectories import time_step as ts
 from tf_agents.utils import common
@@ -129,6 +131,72 @@ class EpsilonGreedyPolicyTest(test_utils.TestCase, parameterized.TestCase):
     # Verify that action distribution changes as we vary epsilon.
     self.checkActionDistribution(actions, epsilon, num_steps)
 
+  @parameterized.parameters({'epsilon': 0.0}, {'epsilon': 0.2},
+                            {'epsilon': 0.7}, {'epsilon': 1.0})
+  def testVectorizedRandomActions(self, epsilon):
+    policy = epsilon_greedy_policy.EpsilonGreedyPolicy(
+        self._policy, epsilon=epsilon, vectorized_random_actions=True)
+    self.assertEqual(policy.action_spec, self._action_spec)
+
+    time_step = tf.nest.map_structure(tf.convert_to_tensor, self._time_step)
+
+    @common.function
+    def action_step_fn(time_step=time_step):
+      return policy.action(time_step, (), seed=54)
+
+    if tf.executing_eagerly():
+      action_step = action_step_fn
+    else:
+      action_step = action_step_fn()
+
+    actions = []
+    num_steps = 1000
+    for _ in range(num_steps):
+      action_ = self.evaluate(action_step).action
+      self.assertEqual((2, 1), action_.shape)
+      self.assertIn(action_[0], [0, 1, 2])
+      actions.append(action_[0])
+
+    self.checkActionDistribution(actions, epsilon, num_steps)
+
+  def testVectorizedRandomActionsWithMask(self):
+    action_spec = tensor_spec.BoundedTensorSpec((), tf.int32, 0, 7)
+    mask = [0, 1, 0, 1, 0, 0, 1, 0]
+    q_net = q_network.QNetwork(self._obs_spec, action_spec)
+    policy = q_policy.QPolicy(
+        self._time_step_spec,
+        action_spec,
+        q_network=q_net,
+        observation_and_action_constraint_splitter=(
+            lambda observation: (observation, tf.constant([mask, mask]))))
+    policy = epsilon_greedy_policy.EpsilonGreedyPolicy(
+        policy, epsilon=1.0, vectorized_random_actions=True)
+
+    time_step = tf.nest.map_structure(tf.convert_to_tensor, self._time_step)
+
+    @common.function
+    def action_step_fn(time_step=time_step):
+      return policy.action(time_step, (), seed=54)
+
+    if tf.executing_eagerly():
+      action_step = action_step_fn
+    else:
+      action_step = action_step_fn()
+
+    self.evaluate(tf.compat.v1.global_variables_initializer())
+    actions = []
+    for _ in range(100):
+      actions.extend(self.evaluate(action_step).action)
+    self.assertAllEqual([1, 3, 6], np.unique(actions))
+
+  def testVectorizedRandomActionsRequiresDiscreteSpec(self):
+    action_spec = tensor_spec.BoundedTensorSpec((2,), tf.int32, 0, 2)
+    policy = fixed_policy.FixedPolicy(
+        np.asarray([1, 1], dtype=np.int32), self._time_step_spec, action_spec)
+    with self.assertRaisesRegexp(ValueError, 'discrete'):
+      epsilon_greedy_policy.EpsilonGreedyPolicy(
+          policy, epsilon=0.1, vectorized_random_actions=True)
+
   def checkBanditPolicyTypeShape(self, bandit_policy_type, batch_size):
     self.assertAllEqual(bandit_policy_type.shape, [batch_size, 1])
 
@@ -64,6 +64,7 @@ class ScriptedPyPolicy(py_policy.Base):
         time_step_spec=time_step_spec, action_spec=action_spec)
 
     self._action_script = action_script
+    self._action_checker = array_spec.ArraysNestChecker(action_spec)
 
   def _get_initial_state(self, batch_size):
     del batch_size
@@ -108,7 +109,7 @@ class ScriptedPyPolicy(py_policy.Base):
     current_action = nest.map_structure_up_to(
         self._action_spec, actions_as_array, self._action_spec, current_action)
 
-    if not array_spec.check_arrays_nest(current_action, self._action_spec):
+    if not self._action_checker.maybe_check(current_action):
       raise ValueError(
           "Action at index {} does not match the environment's action_spec. "
           "Got: {}. Expected {}.".format(action_index, current_action,
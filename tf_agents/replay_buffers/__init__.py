@@ -18,5 +18,7 @@
 from tf_agents.replay_buffers import py_hashed_replay_buffer
 from tf_agents.replay_buffers import py_uniform_replay_buffer
 from tf_agents.replay_buffers import replay_buffer
+from tf_agents.replay_buffers import sum_tree
 from tf_agents.replay_buffers import table
+from tf_agents.replay_buffers import tf_prioritized_replay_buffer
 from tf_agents.replay_buffers import tf_uniform_replay_buffer
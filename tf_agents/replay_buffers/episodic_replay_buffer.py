@@ -26,6 +26,7 @@ import tensorflow as tf  # pylint: disable=g-explicit-tensorflow-version-import
 from tf_agents import specs
 from tf_agents.replay_buffers import episodic_table
 from tf_agents.replay_buffers import replay_buffer as replay_buffer_base
+from tf_agents.replay_buffers import sum_tree
 from tf_agents.replay_buffers import table
 from tf_agents.utils import common
 
@@ -60,6 +61,8 @@ class EpisodicReplayBuffer(replay_buffer_base.ReplayBuffer):
   #     _episode_lengths: counter variable, capacity _capacity.
   #     _episode_completed: uint8(bool) variable, capacity _capacity.
   #     _last_episode: scalar int variable.
+  #     _sample_index: optional SumTree, capacity _capacity, holding the number
+  #       of sub-episodes of length _index_num_steps starting in each episode.
   #     _add_episode_critical_section: CriticalSection for adding new episodes.
   #
   #  Users call create_episode_ids() to get a scalar or vector int64 Tensor
@@ -88,7 +91,9 @@ class EpisodicReplayBuffer(replay_buffer_base.ReplayBuffer):
                begin_episode_fn=None,
                end_episode_fn=None,
                dataset_drop_remainder=False,
-               dataset_window_shift=None):
+               dataset_window_shift=None,
+               index_num_steps=None,
+               episode_table_fn=episodic_table.EpisodicTable):
     """Creates an EpisodicReplayBuffer.
 
     This class receives a dataspec and capacity and creates a replay buffer
@@ -178,7 +183,30 @@ class EpisodicReplayBuffer(replay_buffer_base.ReplayBuffer):
         (`dataset_window_shift=None`) but users often want to see all
         combinations of frame sequences, in which case `dataset_window_shift=1`
         is the appropriate value.
+      index_num_steps: (Optional.) Scalar int.  If set, the buffer maintains a
+        `SumTree` over the episodes holding how many sub-episodes of length
+        `index_num_steps` start in each of them (only counting completed
+        episodes if `completed_only`).  The tree is updated whenever episodes
+        grow, complete or are cleared, at a cost of O(log(capacity)) per
+        episode.  `as_dataset(num_steps=index_num_steps)` then samples
+        `(episode, start)` pairs directly from it: sampling costs
+        O(log(capacity)) instead of O(capacity), never rejects episodes that
+        are too short, and is uniform across all the valid sub-episodes.
+        Other values of `num_steps` are unaffected.
+      episode_table_fn: Function to create tables
+        `episode_table_fn(data_spec, capacity, name_prefix)` that can
+        read/write nested variable-length episodes.  The default
+        `EpisodicTable` stores TensorLists; `FlatEpisodicTable` (e.g.
+        `functools.partial(episodic_table.FlatEpisodicTable,
+        max_episode_length=500)`) stores the frames in preallocated Tensors,
+        which lets `as_dataset(num_steps=...)` read all the slices sampled
+        every `buffer_size` requests with a single gather.
+    Raises:
+      ValueError: If `index_num_steps` is not positive.
     """
+    if index_num_steps is not None and index_num_steps < 1:
+      raise ValueError(
+          'index_num_steps must be positive, got {}.'.format(index_num_steps))
     super(EpisodicReplayBuffer, self).__init__(
         data_spec,
         capacity,
@@ -187,11 +215,6 @@ class EpisodicReplayBuffer(replay_buffer_base.ReplayBuffer):
     # can read/write nested tensors.
     table_fn = table.Table
 
-    # Create tables `episode_table_fn(data_spec, capacity, name_prefix)`
-    # that can read/write nested variable-length episodes
-    # (in practice this means using TensorLists).
-    episode_table_fn = episodic_table.EpisodicTable
-
     if begin_episode_fn is None:
       def _begin_episode_fn(t):
         is_first = getattr(t, 'is_first', None)
@@ -228,6 +251,7 @@ class EpisodicReplayBuffer(replay_buffer_base.ReplayBuffer):
     self._buffer_size = buffer_size
     self._dataset_window_shift = dataset_window_shift
     self._dataset_drop_remainder = dataset_drop_remainder
+    self._index_num_steps = index_num_steps
     self._num_writes = common.create_variable('num_writes_counter')
 
     with tf.device(self._device):
@@ -253,6 +277,13 @@ class EpisodicReplayBuffer(replay_buffer_base.ReplayBuffer):
           'last_episode', initial_value=_INVALID_EPISODE_ID)
       self._add_episode_critical_section = tf.CriticalSection(
           name='add_episode')
+      if index_num_steps is None:
+        self._sample_index = None
+      else:
+        # float64 keeps the cumulative counts exact up to 2**53 sub-episodes.
+        self._sample_index = sum_tree.SumTree(
+            self._capacity, dtype=tf.float64,
+            scope='{}_sample_index'.format(self._name_prefix))
 
   @property
   def num_writes(self):
@@ -510,6 +541,10 @@ class EpisodicReplayBuffer(replay_buffer_base.ReplayBuffer):
     or end of an episode).  In the worst case, if `num_steps` is greater than
     most episode lengths, those episodes will never be visited.
 
+    If `num_steps` equals the `index_num_steps` passed to the constructor, the
+    `(episode, start)` pairs are instead sampled uniformly across all the valid
+    sub-episodes from the maintained index, without dropping any sample.
+
     Args:
       sample_batch_size: (Optional.) An optional batch_size to specify the
         number of items to return. See as_dataset() documentation.
@@ -565,7 +600,47 @@ class EpisodicReplayBuffer(replay_buffer_base.ReplayBuffer):
       else:
         return episode_locations
 
-    ds = tf.data.experimental.Counter().map(_get_episode_locations).unbatch()
+    use_index = (num_steps is not None and
+                 num_steps == self._index_num_steps)
+
+    def _get_sub_episodes(_):
+      """Sample episode locations and slice starts from the index."""
+      return self._sample_sub_episodes(episode_id_buffer_size, seed=self._seed)
+
+    # Tables storing frames in Tensors read all the slices at once.
+    batch_slices = (num_steps is not None and
+                    hasattr(self._data_table, 'get_episode_slices'))
+
+    def _get_episode_slices(_):
+      """Sample slices of length num_steps and read them in one gather."""
+      if use_index:
+        rows, starts = _get_sub_episodes(_)
+        num_frames = self._data_table.get_num_frames(rows)
+        # Only false if the episode was cleared or replaced between updating
+        # the index and reading its frames.
+        valid = starts + num_steps <= num_frames
+      else:
+        rows = _get_episode_locations(_)
+        num_frames = self._data_table.get_num_frames(rows)
+        valid = num_frames >= num_steps
+        # Sample uniformly between [0, num_frames - num_steps]
+        num_starts = tf.maximum(num_frames - num_steps + 1, 1)
+        starts = tf.cast(
+            tf.random.uniform(tf.shape(rows), dtype=tf.float64,
+                              seed=seed_per_episode) *
+            tf.cast(num_starts, tf.float64), tf.int64)
+        starts = tf.minimum(starts, num_starts - 1)
+      rows = tf.boolean_mask(tensor=rows, mask=valid)
+      starts = tf.boolean_mask(tensor=starts, mask=valid)
+      return (self._data_table.get_episode_slices(rows, starts, num_steps),
+              self._id_table.read(rows))
+
+    if batch_slices:
+      ds = tf.data.experimental.Counter().map(_get_episode_slices).unbatch()
+    elif use_index:
+      ds = tf.data.experimental.Counter().map(_get_sub_episodes).unbatch()
+    else:
+      ds = tf.data.experimental.Counter().map(_get_episode_locations).unbatch()
 
     if num_steps is None:
       @tf.autograph.experimental.do_not_convert
@@ -574,9 +649,9 @@ class EpisodicReplayBuffer(replay_buffer_base.ReplayBuffer):
             self._data_table.get_episode_values(row),
             self._id_table.read(row))
       ds = ds.map(_read_data_and_id, num_parallel_calls=num_parallel_calls)
-    else:
+    elif not batch_slices:
       @tf.autograph.experimental.do_not_convert
-      def _read_tensor_list_and_id(row):
+      def _read_tensor_list_and_id(row, start_slice=None):
         """Read the TensorLists out of the table row, get id and num_frames."""
         # Return a flattened tensor list
         flat_tensor_lists = tuple(
@@ -586,26 +661,35 @@ class EpisodicReplayBuffer(replay_buffer_base.ReplayBuffer):
         # available length.
         num_frames = tf.reduce_min(
             [list_ops.tensor_list_length(l) for l in flat_tensor_lists])
-        return flat_tensor_lists, self._id_table.read(row), num_frames
+        if start_slice is None:
+          # Sample uniformly between [0, num_frames - num_steps] once the
+          # episodes that are too short have been filtered out.
+          start_slice = tf.constant(-1, dtype=tf.int32)
+        else:
+          start_slice = tf.cast(start_slice, tf.int32)
+        return (flat_tensor_lists, self._id_table.read(row), num_frames,
+                start_slice)
 
       ds = ds.map(
           _read_tensor_list_and_id, num_parallel_calls=num_parallel_calls)
 
-      def _filter_by_length(unused_1, unused_2, num_frames):
-        # Remove episodes that are too short.
-        return num_frames >= num_steps
+      def _filter_by_length(unused_1, unused_2, num_frames, start_slice):
+        # Remove episodes that are too short.  Slices sampled from the index
+        # are only dropped if the episode was overwritten in the meantime.
+        return num_frames >= tf.maximum(start_slice, 0) + num_steps
 
       ds = ds.filter(_filter_by_length)
 
       @tf.autograph.experimental.do_not_convert
-      def _random_slice(flat_tensor_lists, id_, num_frames):
-        """Take a random slice from the episode, of length num_steps."""
-        # Sample uniformly between [0, num_frames - num_steps]
-        start_slice = tf.random.uniform((),
-                                        minval=0,
-                                        maxval=num_frames - num_steps + 1,
-                                        dtype=tf.int32,
-                                        seed=seed_per_episode)
+      def _random_slice(flat_tensor_lists, id_, num_frames, start_slice):
+        """Take a slice from the episode, of length num_steps."""
+        if not use_index:
+          # Sample uniformly between [0, num_frames - num_steps]
+          start_slice = tf.random.uniform((),
+                                          minval=0,
+                                          maxval=num_frames - num_steps + 1,
+                                          dtype=tf.int32,
+                                          seed=seed_per_episode)
         end_slice = start_slice + num_steps
 
         flat_spec = tf.nest.flatten(self._data_spec)
@@ -826,6 +910,8 @@ class EpisodicReplayBuffer(replay_buffer_base.ReplayBuffer):
     assignments = [
         self._episode_lengths.assign(tf.zeros_like(self._episode_lengths))]
     assignments += [self._num_writes.assign(tf.zeros_like(self._num_writes))]
+    if self._sample_index is not None:
+      assignments += [self._sample_index.clear()]
 
     if clear_all_variables:
       zero_vars = self._id_table.variables() + [self._episode_completed]
@@ -895,9 +981,11 @@ class EpisodicReplayBuffer(replay_buffer_base.ReplayBuffer):
     def _maybe_end_episode_id():
       """Maybe end episode ID."""
       def _end_episode_id():
-        return tf.group(
-            tf.compat.v1.scatter_update(self._episode_completed,
-                                        [episode_location], 1))
+        update_completed = tf.compat.v1.scatter_update(
+            self._episode_completed, [episode_location], 1)
+        with tf.control_dependencies([update_completed]):
+          update_index = self._update_sample_index_locked(episode_location)
+        return tf.group(update_completed, update_index)
 
       episode_valid = tf.equal(
           self._episodes_loc_to_id_map.sparse_read(episode_location),
@@ -941,6 +1029,8 @@ class EpisodicReplayBuffer(replay_buffer_base.ReplayBuffer):
       update_completed = tf.compat.v1.scatter_update(self._episode_completed,
                                                      episodes_location_, 1)
       with tf.control_dependencies([update_completed]):
+        update_index = self._update_sample_index_locked(episodes_location_)
+      with tf.control_dependencies([update_completed, update_index]):
         return self._episode_completed.sparse_read(episodes_location) > 0
 
     return self._add_episode_critical_section.execute(_execute)
@@ -972,8 +1062,11 @@ class EpisodicReplayBuffer(replay_buffer_base.ReplayBuffer):
           tf.expand_dims(episode_location, 0))
       reset_length = tf.compat.v1.scatter_update(self._episode_lengths,
                                                  episode_location, 0)
+      with tf.control_dependencies([update_completed, reset_length]):
+        reset_index = self._update_sample_index_locked(episode_location)
       with tf.control_dependencies([
-          update_mapping, update_completed, reset_data, reset_length]):
+          update_mapping, update_completed, reset_data, reset_length,
+          reset_index]):
         return tf.identity(new_episode_id)
 
     def _get_new_episode_id():
@@ -1062,8 +1155,11 @@ class EpisodicReplayBuffer(replay_buffer_base.ReplayBuffer):
       reset_data = self._data_table.clear_rows(episode_locations)
       reset_length = tf.compat.v1.scatter_update(self._episode_lengths,
                                                  episode_locations, 0)
+      with tf.control_dependencies([reset_completed, reset_length]):
+        reset_index = self._update_sample_index_locked(episode_locations)
       with tf.control_dependencies([
-          update_mapping, reset_completed, reset_data, reset_length]):
+          update_mapping, reset_completed, reset_data, reset_length,
+          reset_index]):
         return tf.identity(updated_batch_episode_ids)
 
     episode_ids = self._add_episode_critical_section.execute(
@@ -1092,6 +1188,10 @@ class EpisodicReplayBuffer(replay_buffer_base.ReplayBuffer):
       with tf.control_dependencies([assert_nonempty]):
         num_episodes = tf.minimum(self._last_episode + 1, self._capacity)
         episode_lengths = self._episode_lengths[:num_episodes]
+        if hasattr(self._data_table, 'max_episode_length'):
+          # Only the most recent `max_episode_length` frames can be sampled.
+          episode_lengths = tf.minimum(episode_lengths,
+                                       self._data_table.max_episode_length)
         logits = tf.math.log(tf.cast(episode_lengths, tf.float32))
         return tf.reshape(
             tf.random.categorical(
@@ -1134,6 +1234,8 @@ class EpisodicReplayBuffer(replay_buffer_base.ReplayBuffer):
       update_length = tf.compat.v1.scatter_update(
           self._episode_lengths, [episode_location], new_length)
       with tf.control_dependencies([update_length]):
+        update_index = self._update_sample_index_locked(episode_location)
+      with tf.control_dependencies([update_length, update_index]):
         return tf.identity(new_length)
 
     def _assign_add_multiple():
@@ -1142,6 +1244,8 @@ class EpisodicReplayBuffer(replay_buffer_base.ReplayBuffer):
       update_length = tf.compat.v1.scatter_update(self._episode_lengths,
                                                   episode_location, new_length)
       with tf.control_dependencies([update_length]):
+        update_index = self._update_sample_index_locked(episode_location)
+      with tf.control_dependencies([update_length, update_index]):
         return tf.identity(new_length)
 
     if episode_location.shape.rank == 0:
@@ -1151,6 +1255,62 @@ class EpisodicReplayBuffer(replay_buffer_base.ReplayBuffer):
     else:
       raise ValueError('episode_id must have rank <= 1')
 
+  def _update_sample_index_locked(self, episode_locations):
+    """Refreshes the sampling index at the given locations.
+
+    NOTE: This method should only be called inside a critical section, after
+    the updates of the lengths or completion of the episodes.
+
+    Args:
+      episode_locations: int64 scalar or vector. Location(s) of the episode(s)
+        whose length or completion changed.
+    Returns:
+      An op that updates the index, or a no-op if there is no index.
+    """
+    if self._sample_index is None:
+      return tf.no_op()
+    episode_locations = tf.reshape(episode_locations, [-1])
+    lengths = self._episode_lengths.sparse_read(episode_locations)
+    if hasattr(self._data_table, 'max_episode_length'):
+      # Only the most recent `max_episode_length` frames can be sampled.
+      lengths = tf.minimum(lengths, self._data_table.max_episode_length)
+    num_sub_episodes = tf.maximum(lengths - self._index_num_steps + 1, 0)
+    if self._completed_only:
+      num_sub_episodes *= tf.cast(
+          self._episode_completed.sparse_read(episode_locations), tf.int64)
+    return self._sample_index.write(
+        episode_locations, tf.cast(num_sub_episodes, tf.float64))
+
+  def _sample_sub_episodes(self, num_samples, seed=None):
+    """Samples sub-episodes of length `index_num_steps` from the index.
+
+    Args:
+      num_samples: Scalar int, number of sub-episodes to sample.
+      seed: optional random seed.
+    Returns:
+      A tuple `(episode_locations, starts)` of int64 vectors of shape
+      `(num_samples,)`, sampled uniformly across all the valid sub-episodes.
+    """
+    total = self._sample_index.total()
+    assert_nonempty = tf.compat.v1.assert_positive(
+        total,
+        message='EpisodicReplayBuffer has no episodes of length >= {}{}. Make '
+        'sure to add items before sampling the buffer.'.format(
+            self._index_num_steps,
+            ' marked as completed' if self._completed_only else ''))
+    with tf.control_dependencies([assert_nonempty]):
+      values = tf.random.uniform([num_samples], maxval=total,
+                                 dtype=tf.float64, seed=seed)
+    episode_locations, offsets = self._sample_index.find(values)
+    # Rounding errors can select one of the padding leaves of the tree, or an
+    # offset past the last sub-episode.
+    episode_locations = tf.minimum(episode_locations, self._capacity - 1)
+    num_sub_episodes = tf.cast(
+        self._sample_index.read(episode_locations), tf.int64)
+    starts = tf.clip_by_value(
+        tf.cast(offsets, tf.int64), 0, tf.maximum(num_sub_episodes - 1, 0))
+    return episode_locations, starts
+
   def _get_valid_ids_mask_locked(self, episode_ids):
     """Returns a mask of whether the given IDs are valid. Caller must lock."""
     episode_locations = self._get_episode_id_location(episode_ids)
@@ -1198,8 +1358,10 @@ class EpisodicReplayBuffer(replay_buffer_base.ReplayBuffer):
                                                       locations, 0)
           clear_completed = tf.compat.v1.scatter_update(self._episode_completed,
                                                         locations, 0)
+        with tf.control_dependencies([clear_lengths, clear_completed]):
+          clear_index = self._update_sample_index_locked(locations)
         with tf.control_dependencies(
-            [clear_rows, clear_lengths, clear_completed]):
+            [clear_rows, clear_lengths, clear_completed, clear_index]):
           episodes = tf.nest.map_structure(tf.identity, episodes)
       return episodes
 
@@ -1250,7 +1412,10 @@ class EpisodicReplayBuffer(replay_buffer_base.ReplayBuffer):
           episode_locations,
           tf.nest.map_structure(lambda tl: tf.gather(tl, episode_valid_idx),
                                 episodes.tensor_lists))
-      with tf.control_dependencies([increment_lengths, set_completed, extend]):
+      with tf.control_dependencies([increment_lengths, set_completed]):
+        update_index = self._update_sample_index_locked(episode_locations)
+      with tf.control_dependencies(
+          [increment_lengths, set_completed, extend, update_index]):
         return tf.identity(expanded_episode_ids)
 
     with tf.device(self._device):
@@ -19,12 +19,15 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import functools
+
 from absl.testing import parameterized
 import numpy as np
 import tensorflow as tf  # pylint: disable=g-explicit-tensorflow-version-import
 
 from tf_agents import specs
 from tf_agents.replay_buffers import episodic_replay_buffer
+from tf_agents.replay_buffers import episodic_table
 from tf_agents.utils import common
 from tf_agents.utils import test_utils
 
@@ -812,6 +815,208 @@ class EpisodicReplayBufferTest(test_utils.TestCase, parameterized.TestCase):
     self.assertEqual(
         self.evaluate(tf.size(input=replay_buffer._get_episode(1))), 0)
 
+  def testSampleIndexUniformOverSubEpisodes(self):
+    spec = specs.TensorSpec([], tf.int32, 'action')
+    replay_buffer = episodic_replay_buffer.EpisodicReplayBuffer(
+        spec, capacity=4, begin_episode_fn=lambda _: True,
+        end_episode_fn=lambda _: False, index_num_steps=3)
+    episode_id = replay_buffer.create_episode_ids()
+    self.evaluate(tf.compat.v1.global_variables_initializer())
+    self.evaluate(tf.compat.v1.local_variables_initializer())
+    # Episode i has length i + 1 and items 10 * i + step.
+    for i in range(4):
+      episode_id = replay_buffer.add_sequence(
+          10 * i + tf.range(i + 1, dtype=tf.int32), episode_id)
+      self.evaluate(episode_id)
+    self.assertAllEqual(
+        self.evaluate(replay_buffer._sample_index.read(tf.range(4, dtype=tf.int64))),
+        [0, 0, 1, 2])
+
+    sample, _ = sample_as_dataset(replay_buffer, num_steps=3, batch_size=900)
+    sample_ = self.evaluate(sample)
+    self.assertEqual(sample_.shape, (900, 3))
+    self.assertAllEqual(sample_[:, 1:] - sample_[:, :-1],
+                        np.ones((900, 2), dtype=np.int32))
+    # Every sub-episode of length 3 is sampled uniformly.
+    starts, counts = np.unique(sample_[:, 0], return_counts=True)
+    self.assertAllEqual(starts, [20, 30, 31])
+    self.assertAllClose(counts / 900., [1. / 3] * 3, atol=0.1)
+
+  def testSampleIndexCompletedOnlyAndClear(self):
+    spec = specs.TensorSpec([], tf.int32, 'action')
+    # Sequences starting with an even value complete their episode.
+    replay_buffer = episodic_replay_buffer.EpisodicReplayBuffer(
+        spec, capacity=3, completed_only=True,
+        begin_episode_fn=lambda _: True,
+        end_episode_fn=lambda items: tf.equal(items[0] % 2, 0),
+        index_num_steps=2)
+    episode_id = replay_buffer.create_episode_ids()
+    self.evaluate(tf.compat.v1.global_variables_initializer())
+    self.evaluate(tf.compat.v1.local_variables_initializer())
+    for first in [0, 1, 2]:
+      episode_id = replay_buffer.add_sequence(
+          first + tf.range(0, 40, 10, dtype=tf.int32), episode_id)
+      self.evaluate(episode_id)
+
+    def index_values():
+      return self.evaluate(replay_buffer._sample_index.read(tf.range(3, dtype=tf.int64)))
+    self.assertAllEqual(index_values(), [3, 0, 3])
+
+    sample, _ = sample_as_dataset(replay_buffer, num_steps=2, batch_size=100)
+    sample_ = self.evaluate(sample)
+    self.assertAllEqual(sample_[:, 0] % 2, np.zeros(100, dtype=np.int32))
+    self.assertAllEqual(sample_[:, 1] - sample_[:, 0],
+                        10 * np.ones(100, dtype=np.int32))
+
+    self.evaluate(replay_buffer.extract([2], clear_data=True).length)
+    self.assertAllEqual(index_values(), [3, 0, 0])
+    # Starting a new episode at location 0 resets its entry.
+    episode_id = replay_buffer.add_sequence(
+        tf.constant([3], dtype=tf.int32), episode_id)
+    self.evaluate(episode_id)
+    self.assertAllEqual(index_values(), [0, 0, 0])
+    self.evaluate(replay_buffer.clear())
+    self.assertAllEqual(index_values(), [0, 0, 0])
+
+  def testSampleIndexOnlyUsedForIndexNumSteps(self):
+    spec = specs.TensorSpec([], tf.int32, 'action')
+    replay_buffer = episodic_replay_buffer.EpisodicReplayBuffer(
+        spec, capacity=2, begin_episode_fn=lambda _: True,
+        end_episode_fn=lambda _: False, index_num_steps=2)
+    episode_id = replay_buffer.create_episode_ids()
+    self.evaluate(tf.compat.v1.global_variables_initializer())
+    self.evaluate(tf.compat.v1.local_variables_initializer())
+    episode_id = replay_buffer.add_sequence(
+        tf.range(4, dtype=tf.int32), episode_id)
+    self.evaluate(episode_id)
+    sample, _ = sample_as_dataset(replay_buffer, num_steps=3, batch_size=10)
+    sample_ = self.evaluate(sample)
+    self.assertAllEqual(sample_[:, 2] - sample_[:, 0],
+                        2 * np.ones(10, dtype=np.int32))
+
+  def testInvalidIndexNumStepsRaisesError(self):
+    spec = specs.TensorSpec([], tf.int32, 'action')
+    with self.assertRaisesRegexp(ValueError, 'index_num_steps'):
+      episodic_replay_buffer.EpisodicReplayBuffer(spec, index_num_steps=0)
+
+  @parameterized.parameters([dict(index_num_steps=None),
+                             dict(index_num_steps=2)])
+  def testFlatEpisodicTableAsDataset(self, index_num_steps):
+    spec = specs.TensorSpec([], tf.int32, 'action')
+    replay_buffer = episodic_replay_buffer.EpisodicReplayBuffer(
+        spec, capacity=3, begin_episode_fn=lambda _: True,
+        end_episode_fn=lambda _: False, index_num_steps=index_num_steps,
+        episode_table_fn=functools.partial(
+            episodic_table.FlatEpisodicTable, max_episode_length=10))
+    episode_id = replay_buffer.create_episode_ids()
+    self.evaluate(tf.compat.v1.global_variables_initializer())
+    self.evaluate(tf.compat.v1.local_variables_initializer())
+    # Episode i has length 2 * i + 1 and items 10 * i + step.
+    for i in range(3):
+      episode_id = replay_buffer.add_sequence(
+          10 * i + tf.range(2 * i + 1, dtype=tf.int32), episode_id)
+      self.evaluate(episode_id)
+
+    sample, _ = sample_as_dataset(replay_buffer, num_steps=2, batch_size=300)
+    self.assertEqual(sample.shape.as_list(), [300, 2])
+    sample_ = self.evaluate(sample)
+    self.assertAllEqual(sample_[:, 1] - sample_[:, 0],
+                        np.ones(300, dtype=np.int32))
+    self.assertAllEqual(np.unique(sample_[:, 0]), [10, 11, 20, 21, 22, 23])
+
+    episode, _ = sample_as_dataset(replay_buffer)
+    self.assertIn(self.evaluate(episode).tolist(),
+                  [[0], [10, 11, 12], [20, 21, 22, 23, 24]])
+
+  def testFlatEpisodicTableSampleIndexCapsLengths(self):
+    spec = specs.TensorSpec([], tf.int32, 'action')
+    replay_buffer = episodic_replay_buffer.EpisodicReplayBuffer(
+        spec, capacity=2, begin_episode_fn=lambda _: True,
+        end_episode_fn=lambda _: False, index_num_steps=2,
+        episode_table_fn=functools.partial(
+            episodic_table.FlatEpisodicTable, max_episode_length=4))
+    episode_id = replay_buffer.create_episode_ids()
+    self.evaluate(tf.compat.v1.global_variables_initializer())
+    self.evaluate(tf.compat.v1.local_variables_initializer())
+    # Only the last 4 frames [6, 7, 8, 9] of the first episode are stored.
+    episode_id = replay_buffer.add_sequence(
+        tf.range(10, dtype=tf.int32), episode_id)
+    self.evaluate(episode_id)
+    episode_id = replay_buffer.add_sequence(
+        10 + tf.range(2, dtype=tf.int32), episode_id)
+    self.evaluate(episode_id)
+    self.assertAllEqual(
+        [3, 1],
+        self.evaluate(replay_buffer._sample_index.read(
+            tf.range(2, dtype=tf.int64))))
+
+    sample, _ = sample_as_dataset(replay_buffer, num_steps=2, batch_size=400)
+    self.assertEqual(sample.shape.as_list(), [400, 2])
+    sample_ = self.evaluate(sample)
+    self.assertAllEqual(np.unique(sample_[:, 0]), [6, 7, 8, 10])
+    # Every stored sub-episode is equally likely.
+    num_second_episode = np.sum(sample_[:, 0] == 10)
+    self.assertGreater(num_second_episode, 50)
+    self.assertLess(num_second_episode, 150)
+
+  def testFlatEpisodicTableSampleCapsLengths(self):
+    spec = specs.TensorSpec([], tf.int32, 'action')
+    replay_buffer = episodic_replay_buffer.EpisodicReplayBuffer(
+        spec, capacity=2, begin_episode_fn=lambda _: True,
+        end_episode_fn=lambda _: False,
+        episode_table_fn=functools.partial(
+            episodic_table.FlatEpisodicTable, max_episode_length=4))
+    episode_id = replay_buffer.create_episode_ids()
+    self.evaluate(tf.compat.v1.global_variables_initializer())
+    self.evaluate(tf.compat.v1.local_variables_initializer())
+    # Only the last 4 frames [6, 7, 8, 9] of the first episode are stored.
+    episode_id = replay_buffer.add_sequence(
+        tf.range(10, dtype=tf.int32), episode_id)
+    self.evaluate(episode_id)
+    episode_id = replay_buffer.add_sequence(
+        10 + tf.range(4, dtype=tf.int32), episode_id)
+    self.evaluate(episode_id)
+
+    sample, _ = sample_as_dataset(replay_buffer, num_steps=1, batch_size=1000)
+    sample_ = self.evaluate(sample)
+    self.assertAllEqual(np.unique(sample_), [6, 7, 8, 9, 10, 11, 12, 13])
+    # Both episodes store 4 frames, so they are equally likely.
+    num_second_episode = np.sum(sample_ >= 10)
+    self.assertGreater(num_second_episode, 400)
+    self.assertLess(num_second_episode, 600)
+
+  def testFlatEpisodicTableExtractAndExtend(self):
+    spec = specs.TensorSpec([], tf.int32, 'action')
+    flat_table_fn = functools.partial(
+        episodic_table.FlatEpisodicTable, max_episode_length=10)
+    source_buffer = episodic_replay_buffer.EpisodicReplayBuffer(
+        spec, capacity=2, begin_episode_fn=lambda _: True,
+        end_episode_fn=lambda _: False, episode_table_fn=flat_table_fn)
+    target_buffer = episodic_replay_buffer.EpisodicReplayBuffer(
+        spec, capacity=2, begin_episode_fn=lambda _: False,
+        end_episode_fn=lambda _: False, name_prefix='target',
+        episode_table_fn=flat_table_fn)
+    episode_id = source_buffer.create_episode_ids()
+    target_ids = target_buffer.create_episode_ids(2)
+    self.evaluate(tf.compat.v1.global_variables_initializer())
+    self.evaluate(tf.compat.v1.local_variables_initializer())
+    for i in range(2):
+      episode_id = source_buffer.add_sequence(
+          10 * i + tf.range(i + 2, dtype=tf.int32), episode_id)
+      self.evaluate(episode_id)
+
+    episodes = source_buffer.extract([1, 0], clear_data=True)
+    target_ids = self.evaluate(
+        target_buffer.extend_episodes(target_ids, [0, 1], episodes))
+    self.assertAllEqual([10, 11, 12],
+                        self.evaluate(target_buffer._get_episode(
+                            target_ids[0])))
+    self.assertAllEqual([0, 1],
+                        self.evaluate(target_buffer._get_episode(
+                            target_ids[1])))
+    self.assertAllEqual(
+        [0, 0], self.evaluate(source_buffer._data_table.get_num_frames([0, 1])))
+
   @parameterized.parameters([dict(stateless=False), dict(stateless=True)])
   def testExtend(self, stateless):
     spec = specs.TensorSpec([], tf.int32, 'action')
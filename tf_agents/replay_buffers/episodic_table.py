@@ -13,12 +13,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-"""A tensorflow table stored in tf.Variables.
+"""Tensorflow tables of episodes stored in tf.Variables.
 
-The row is the index or location at which the value is saved, and the value is
-a nest of Tensors.
+The row is the index or location at which the episode is saved, and the value
+is a nest of Tensors with an outer time dimension of variable length.
 
-This class is not threadsafe.
+`EpisodicTable` stores each episode as TensorLists, while `FlatEpisodicTable`
+stores all the frames in preallocated Tensors.
+
+These classes are not threadsafe.
 """
 
 from __future__ import absolute_import
@@ -26,6 +29,9 @@ from __future__ import division
 from __future__ import print_function
 
 import tensorflow as tf  # pylint: disable=g-explicit-tensorflow-version-import
+
+from tf_agents.utils import common
+
 from tensorflow.python.ops import list_ops  # TF internal
 
 
@@ -254,3 +260,313 @@ class EpisodicTable(tf.Module):
       clear_ops.append(
           self._slot2variable_map[slot].insert_or_assign(rows, new_value))
     return tf.group(*clear_ops)
+
+
+class FlatEpisodicTable(tf.Module):
+  """A table storing episodes of bounded length in preallocated Tensors.
+
+  Each row owns `max_episode_length` contiguous frames in one variable of shape
+  `[capacity, max_episode_length] + spec.shape` per slot, and an int64 counter
+  of the frames appended to it. The frames of a row are used as a ring: once
+  an episode is longer than `max_episode_length`, only its most recent
+  `max_episode_length` frames are kept.
+
+  Unlike `EpisodicTable`, reading episodes or slices of episodes from many rows
+  is a single `tf.gather_nd` per slot, and appending frames to many rows is a
+  single scatter per slot. In exchange the memory for `capacity *
+  max_episode_length` frames is allocated upfront and all the specs must have
+  fully defined shapes.
+
+  It has the same interface as `EpisodicTable`, plus `get_num_frames` and
+  `get_episode_slices`.
+  """
+
+  def __init__(self,
+               tensor_spec,
+               capacity,
+               name_prefix='FlatEpisodicTable',
+               max_episode_length=1000):
+    """Creates a table.
+
+    Args:
+      tensor_spec: A nest of TensorSpec representing each value that can be
+        stored in the table.
+      capacity: Maximum number of episodes the table can store.
+      name_prefix: optional name prefix for variable names.
+      max_episode_length: Maximum number of frames stored per episode.
+
+    Raises:
+      ValueError: If the shape of a spec is not fully defined, or
+        `max_episode_length` is not positive.
+    """
+    super(FlatEpisodicTable, self).__init__(name=name_prefix)
+    if max_episode_length < 1:
+      raise ValueError('max_episode_length must be positive, got {}.'.format(
+          max_episode_length))
+    for spec in tf.nest.flatten(tensor_spec):
+      if not spec.shape.is_fully_defined():
+        raise ValueError(
+            'FlatEpisodicTable requires fully defined shapes, saw spec: '
+            '{}'.format(spec))
+    self._tensor_spec = tensor_spec
+    self._capacity = capacity
+    self._max_episode_length = max_episode_length
+    self._spec_names = []
+
+    def _create_unique_slot_name(spec, count=0):
+      name = spec.name or 'slot'
+      name = name + '_' + str(count)
+      if name not in self._spec_names:
+        self._spec_names.append(name)
+        return name_prefix + '.' + name
+      else:
+        return _create_unique_slot_name(spec, count + 1)
+
+    self._slots = tf.nest.map_structure(_create_unique_slot_name,
+                                        self._tensor_spec)
+    self._flattened_slots = tf.nest.flatten(self._slots)
+    self._flattened_specs = tf.nest.flatten(self._tensor_spec)
+
+    def _create_storage(spec, slot_name):
+      shape = [self._capacity, self._max_episode_length] + spec.shape.as_list()
+      return common.create_variable(
+          name=slot_name,
+          initializer=tf.zeros(shape, dtype=spec.dtype),
+          shape=None,
+          dtype=spec.dtype,
+          unique_name=False)
+
+    with tf.compat.v1.variable_scope(name_prefix):
+      self._storage = tf.nest.map_structure(_create_storage, self._tensor_spec,
+                                            self._slots)
+      # Number of frames appended to each row since it was last cleared.
+      self._lengths = common.create_variable(
+          'lengths', shape=[self._capacity], initial_value=0,
+          unique_name=False)
+    self._variables = tf.nest.flatten(self._storage) + [self._lengths]
+    self._slot2variable_map = dict(
+        zip(self._flattened_slots, tf.nest.flatten(self._storage)))
+    self._slot2spec_map = dict(
+        zip(self._flattened_slots, self._flattened_specs))
+
+  @property
+  def slots(self):
+    return self._slots
+
+  @property
+  def max_episode_length(self):
+    return self._max_episode_length
+
+  def variables(self):
+    return self._variables
+
+  def get_num_frames(self, rows):
+    """Returns the number of frames stored at the given row(s).
+
+    Args:
+      rows: A scalar/list/tensor of location(s).
+
+    Returns:
+      An int64 Tensor with the same shape as rows.
+    """
+    rows = tf.convert_to_tensor(value=rows, dtype=tf.int64)
+    return tf.minimum(self._lengths.sparse_read(rows),
+                      self._max_episode_length)
+
+  def _gather_frames(self, rows, offsets):
+    """Gathers the frames at `offsets` from the oldest frame of `rows`.
+
+    Args:
+      rows: An int64 Tensor of locations.
+      offsets: An int64 Tensor of frame offsets, with the same shape as `rows`.
+
+    Returns:
+      A nest of Tensors shaped `offsets.shape + spec.shape`.
+    """
+    lengths = self._lengths.sparse_read(rows)
+    oldest = tf.maximum(lengths - self._max_episode_length, 0)
+    positions = tf.math.mod(oldest + offsets, self._max_episode_length)
+    indices = tf.stack([rows, positions], axis=-1)
+    values = [tf.gather_nd(self._slot2variable_map[slot], indices)
+              for slot in self._flattened_slots]
+    return tf.nest.pack_sequence_as(self.slots, values)
+
+  def get_episode_values(self, row):
+    """Returns all values for the given row.
+
+    Args:
+      row: A scalar tensor of location to read values from.
+
+    Returns:
+      Stacked values at given row, with an outer dimension equal to the number
+      of frames stored in the row.
+    """
+    row = tf.convert_to_tensor(value=row, dtype=tf.int64)
+    row.shape.assert_has_rank(0)
+    offsets = tf.range(self.get_num_frames(row))
+    return self._gather_frames(tf.fill(tf.shape(offsets), row), offsets)
+
+  def get_episode_slices(self, rows, starts, num_steps):
+    """Returns `num_steps` consecutive frames from each of the given rows.
+
+    Args:
+      rows: A rank-1 int Tensor of locations to read from.
+      starts: A rank-1 int Tensor with the offset of the first frame to read
+        in each row, counted from the oldest frame stored in the row.  It's up
+        to the caller to ensure `starts + num_steps <= get_num_frames(rows)`.
+      num_steps: Python int, the number of frames to read per row.
+
+    Returns:
+      A nest of Tensors shaped `[len(rows), num_steps] + spec.shape`.
+    """
+    rows = tf.convert_to_tensor(value=rows, dtype=tf.int64)
+    starts = tf.convert_to_tensor(value=starts, dtype=tf.int64)
+    offsets = tf.expand_dims(starts, 1) + tf.range(num_steps, dtype=tf.int64)
+    rows = tf.tile(tf.expand_dims(rows, 1), [1, num_steps])
+    return self._gather_frames(rows, offsets)
+
+  def get_episode_lists(self, rows=None):
+    """Returns episodes as TensorLists.
+
+    Args:
+      rows: A list/tensor of location(s) to retrieve. If not specified, all
+        episodes are returned.
+
+    Returns:
+      Episodes as TensorLists, stored in nested Tensors.
+    """
+    if rows is None:
+      rows = tf.range(self._capacity, dtype=tf.int64)
+    else:
+      rows = tf.convert_to_tensor(value=rows, dtype=tf.int64)
+
+    def _to_lists(row):
+      values = self.get_episode_values(row)
+      return [
+          list_ops.tensor_list_from_tensor(  # pylint: disable=g-complex-comprehension
+              value, element_shape=tf.cast(spec.shape.as_list(), tf.int64))
+          for spec, value in zip(self._flattened_specs,
+                                 tf.nest.flatten(values))
+      ]
+
+    if rows.shape.rank == 0:
+      lists = _to_lists(rows)
+    else:
+      lists = tf.map_fn(
+          _to_lists, rows, dtype=[tf.variant] * len(self._flattened_slots))
+    return tf.nest.pack_sequence_as(self.slots, lists)
+
+  def append(self, row, values):
+    """Returns ops for appending multiple time values at the given row.
+
+    Args:
+      row: A scalar location at which to append values.
+      values: A nest of Tensors to append.  The outermost dimension of each
+        tensor is treated as a time axis, and these must all be equal.
+
+    Returns:
+      Ops for appending values at the given row.
+    """
+    row = tf.convert_to_tensor(value=row, dtype=tf.int64)
+    flattened_values = [
+        tf.convert_to_tensor(value=value, dtype=spec.dtype)
+        for spec, value in zip(self._flattened_specs, tf.nest.flatten(values))
+    ]
+    num_frames = tf.shape(flattened_values[0], out_type=tf.int64)[0]
+    # Older frames would be overwritten within this call, only write the last
+    # max_episode_length ones.
+    num_writes = tf.minimum(num_frames, self._max_episode_length)
+    skipped = num_frames - num_writes
+    positions = tf.math.mod(
+        self._lengths.sparse_read(row) + skipped +
+        tf.range(num_writes, dtype=tf.int64), self._max_episode_length)
+    indices = tf.stack([tf.fill([num_writes], row), positions], axis=-1)
+    write_ops = [
+        tf.compat.v1.scatter_nd_update(self._slot2variable_map[slot], indices,
+                                       value[skipped:]).op
+        for slot, value in zip(self._flattened_slots, flattened_values)
+    ]
+    with tf.control_dependencies(write_ops):
+      update_length = tf.compat.v1.scatter_add(
+          self._lengths, [row], [num_frames]).op
+    return tf.group(write_ops, update_length)
+
+  def add(self, rows, values):
+    """Returns ops for appending a single frame value to the given rows.
+
+    This operation is batch-aware.
+
+    Args:
+      rows: A list/tensor of location(s) to write values at.
+      values: A nest of Tensors to write. If rows has more than one element,
+        values can have an extra first dimension representing the batch size.
+        Values must have the same structure as the tensor_spec of this class
+        Must have batch dimension matching the number of rows.
+
+    Returns:
+      Ops for appending values at rows.
+    """
+    rows = tf.convert_to_tensor(value=rows, dtype=tf.int64)
+    positions = tf.math.mod(self._lengths.sparse_read(rows),
+                            self._max_episode_length)
+    indices = tf.stack([rows, positions], axis=-1)
+    write_ops = [
+        tf.compat.v1.scatter_nd_update(self._slot2variable_map[slot], indices,
+                                       value).op
+        for slot, value in zip(self._flattened_slots, tf.nest.flatten(values))
+    ]
+    with tf.control_dependencies(write_ops):
+      update_lengths = tf.compat.v1.scatter_add(
+          self._lengths, rows, tf.ones_like(rows)).op
+    return tf.group(write_ops, update_lengths)
+
+  def extend(self, rows, episode_lists):
+    """Returns ops for extending a set of rows by the given TensorLists.
+
+    Args:
+      rows: A batch of row locations to extend.
+      episode_lists: Nested batch of TensorLists, must have the same batch
+        dimension as rows.
+
+    Returns:
+      Ops for extending the table.
+    """
+    tf.nest.assert_same_structure(self.slots, episode_lists)
+    rows = tf.convert_to_tensor(value=rows, dtype=tf.int64)
+    flat_episode_lists = tf.nest.flatten(episode_lists)
+
+    def _extend_row(i):
+      values = [
+          list_ops.tensor_list_stack(lists[i], spec.dtype)
+          for spec, lists in zip(self._flattened_specs, flat_episode_lists)
+      ]
+      append = self.append(rows[i],
+                           tf.nest.pack_sequence_as(self.slots, values))
+      with tf.control_dependencies([append]):
+        return [i + 1]
+
+    return tf.group(
+        tf.while_loop(
+            cond=lambda i: i < tf.size(rows),
+            body=_extend_row,
+            loop_vars=[tf.constant(0)]))
+
+  def clear(self):
+    """Returns op for clearing the table and removing all the episodes.
+
+    Returns:
+      Op for clearing the table.
+    """
+    return self._lengths.assign(tf.zeros_like(self._lengths)).op
+
+  def clear_rows(self, rows):
+    """Returns ops for clearing all the values at the given rows.
+
+    Args:
+      rows: A list/tensor of location(s) to clear values.
+    Returns:
+      Ops for clearing the values at rows.
+    """
+    rows = tf.reshape(tf.convert_to_tensor(value=rows, dtype=tf.int64), [-1])
+    return tf.compat.v1.scatter_update(self._lengths, rows,
+                                       tf.zeros_like(rows)).op
@@ -326,5 +326,106 @@ class EpisodicTableTest(tf.test.TestCase):
     self._test_episode_lists(reload_replay_table, empty_values, test_values)
 
 
+
+class FlatEpisodicTableTest(tf.test.TestCase):
+
+  def spec(self):
+    return {'action': specs.TensorSpec([2], tf.int32, 'action'),
+            'reward': specs.TensorSpec([], tf.float32, 'reward')}
+
+  def values(self, start, stop):
+    steps = np.arange(start, stop)
+    return {'action': np.stack([steps, -steps], axis=1).astype(np.int32),
+            'reward': steps.astype(np.float32)}
+
+  @test_util.run_in_graph_and_eager_modes()
+  def testAddAppendAndGet(self):
+    spec = self.spec()
+    replay_table = episodic_table.FlatEpisodicTable(
+        spec, capacity=3, max_episode_length=5)
+    self.evaluate(tf.compat.v1.global_variables_initializer())
+    self.evaluate(replay_table.add([0, 2], self.values(0, 2)))
+    self.evaluate(replay_table.append(0, self.values(10, 13)))
+    self.assertAllEqual(
+        [4, 0, 1], self.evaluate(replay_table.get_num_frames([0, 1, 2])))
+    expected_0 = self.values(0, 1)
+    expected_0 = tf.nest.map_structure(
+        lambda a, b: np.concatenate([a, b]), expected_0, self.values(10, 13))
+    values_0 = replay_table.get_episode_values(0)
+    self.assertEqual(values_0['action'].shape.as_list()[1:], [2])
+    tf.nest.map_structure(self.assertAllEqual, expected_0,
+                          self.evaluate(values_0))
+    tf.nest.map_structure(self.assertAllEqual, self.values(1, 2),
+                          self.evaluate(replay_table.get_episode_values(2)))
+    tf.nest.map_structure(self.assertAllEqual, self.values(0, 0),
+                          self.evaluate(replay_table.get_episode_values(1)))
+
+  @test_util.run_in_graph_and_eager_modes()
+  def testKeepsMostRecentFrames(self):
+    spec = self.spec()
+    replay_table = episodic_table.FlatEpisodicTable(
+        spec, capacity=2, max_episode_length=3)
+    self.evaluate(tf.compat.v1.global_variables_initializer())
+    self.evaluate(replay_table.append(1, self.values(0, 2)))
+    self.evaluate(replay_table.append(1, self.values(2, 4)))
+    tf.nest.map_structure(self.assertAllEqual, self.values(1, 4),
+                          self.evaluate(replay_table.get_episode_values(1)))
+    self.evaluate(replay_table.append(1, self.values(4, 9)))
+    tf.nest.map_structure(self.assertAllEqual, self.values(6, 9),
+                          self.evaluate(replay_table.get_episode_values(1)))
+    self.assertEqual(3, self.evaluate(replay_table.get_num_frames(1)))
+
+  @test_util.run_in_graph_and_eager_modes()
+  def testGetEpisodeSlices(self):
+    spec = self.spec()
+    replay_table = episodic_table.FlatEpisodicTable(
+        spec, capacity=2, max_episode_length=4)
+    self.evaluate(tf.compat.v1.global_variables_initializer())
+    self.evaluate(replay_table.append(0, self.values(0, 3)))
+    self.evaluate(replay_table.append(1, self.values(10, 16)))
+    slices = replay_table.get_episode_slices([1, 0, 1], [0, 1, 2], 2)
+    self.assertEqual(slices['action'].shape.as_list(), [3, 2, 2])
+    slices_ = self.evaluate(slices)
+    self.assertAllEqual([[12, 13], [1, 2], [14, 15]], slices_['reward'])
+    self.assertAllEqual(-slices_['reward'], slices_['action'][..., 1])
+
+  @test_util.run_in_graph_and_eager_modes()
+  def testExtendAndGetEpisodeLists(self):
+    spec = self.spec()
+    replay_table = episodic_table.FlatEpisodicTable(
+        spec, capacity=3, max_episode_length=10)
+    self.evaluate(tf.compat.v1.global_variables_initializer())
+    self.evaluate(replay_table.append(0, self.values(0, 2)))
+    self.evaluate(replay_table.append(1, self.values(5, 8)))
+    self.evaluate(
+        replay_table.extend([2, 0], replay_table.get_episode_lists([1, 0])))
+    episode_0, episode_2 = self.evaluate(
+        [replay_table.get_episode_values(r) for r in (0, 2)])
+    self.assertAllEqual([0, 1, 0, 1], episode_0['reward'])
+    self.assertAllEqual([5, 6, 7], episode_2['reward'])
+
+  @test_util.run_in_graph_and_eager_modes()
+  def testClearRows(self):
+    spec = self.spec()
+    replay_table = episodic_table.FlatEpisodicTable(
+        spec, capacity=2, max_episode_length=4)
+    self.evaluate(tf.compat.v1.global_variables_initializer())
+    self.evaluate(replay_table.add([0, 1], self.values(0, 2)))
+    self.evaluate(replay_table.clear_rows([1]))
+    self.assertAllEqual([1, 0], self.evaluate(replay_table.get_num_frames(
+        [0, 1])))
+    self.evaluate(replay_table.add([1], self.values(7, 8)))
+    tf.nest.map_structure(self.assertAllEqual, self.values(7, 8),
+                          self.evaluate(replay_table.get_episode_values(1)))
+    self.evaluate(replay_table.clear())
+    self.assertAllEqual([0, 0], self.evaluate(replay_table.get_num_frames(
+        [0, 1])))
+
+  def testUndefinedShapeRaisesError(self):
+    spec = specs.TensorSpec([None], tf.float32, 'action')
+    with self.assertRaisesRegexp(ValueError, 'fully defined'):
+      episodic_table.FlatEpisodicTable(spec, capacity=2)
+
+
 if __name__ == '__main__':
   tf.test.main()
@@ -23,7 +23,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-import pickle
+import io
 import threading
 
 from absl import logging
@@ -38,11 +38,49 @@ from tf_agents.trajectories import trajectory
 class FrameBuffer(tf.train.experimental.PythonState):
   """Saves some frames in a memory efficient way.
 
+  Unique frames are stored in a preallocated pool (a single contiguous array),
+  together with a refcount array and a free list of unused slots. Frames are
+  referred to by their slot index in the pool, so that a whole batch of
+  compressed observations can be decompressed with a single gather.
+
   Thread safety: cannot add multiple frames in parallel.
   """
 
-  def __init__(self):
-    self._frames = {}
+  def __init__(self, capacity=None):
+    """Creates a FrameBuffer.
+
+    Args:
+      capacity: (Optional.) Number of frames to preallocate when the first frame
+        is added. The pool doubles in size whenever it is full, so this is only
+        a hint; set it to the maximum number of unique frames expected to avoid
+        any reallocation.
+    """
+    self._initial_capacity = capacity or 1024
+    self._clear_pool()
+
+  def _clear_pool(self):
+    self._pool = None
+    self._refcounts = np.zeros((0,), dtype=np.int64)
+    self._hashes = np.zeros((0,), dtype=np.int64)
+    # Maps the hash of a frame to its slot in the pool.
+    self._slots = {}
+    self._free_slots = []
+
+  def _allocate(self, frame):
+    """Creates or grows the pool so that it has at least one free slot."""
+    if self._pool is None:
+      size = self._initial_capacity
+      self._pool = np.zeros((size,) + frame.shape, dtype=frame.dtype)
+    else:
+      size = 2 * len(self._pool)
+      self._pool = np.concatenate([self._pool, np.zeros_like(self._pool)])
+    old_size = len(self._refcounts)
+    self._refcounts = np.concatenate(
+        [self._refcounts, np.zeros((size - old_size,), dtype=np.int64)])
+    self._hashes = np.concatenate(
+        [self._hashes, np.zeros((size - old_size,), dtype=np.int64)])
+    # Pop the lowest slots first.
+    self._free_slots.extend(range(size - 1, old_size - 1, -1))
 
   def add_frame(self, frame):
     """Add a frame to the buffer.
@@ -51,48 +89,107 @@ class FrameBuffer(tf.train.experimental.PythonState):
       frame: Numpy array.
 
     Returns:
-      A deduplicated frame.
+      The slot of the deduplicated frame in the pool.
     """
-    h = hash(frame.tostring())
-    if h in self._frames:
-      _, refcount = self._frames[h]
-      self._frames[h] = (frame, refcount + 1)
-      return h
-    self._frames[h] = (frame, 1)
-    return h
+    h = hash(frame.tobytes())
+    slot = self._slots.get(h)
+    if slot is not None:
+      self._refcounts[slot] += 1
+      return slot
+    if not self._free_slots:
+      self._allocate(frame)
+    slot = self._free_slots.pop()
+    self._pool[slot] = frame
+    self._refcounts[slot] = 1
+    self._hashes[slot] = h
+    self._slots[h] = slot
+    return slot
 
   def __len__(self):
-    return len(self._frames)
+    return len(self._slots)
 
   def serialize(self):
-    """Callback for `PythonStateWrapper` to serialize the dictionary."""
-    return pickle.dumps(self._frames)
+    """Callback for `PythonStateWrapper` to serialize the frame pool."""
+    string_file = io.BytesIO()
+    try:
+      if self._pool is None:
+        np.savez(string_file)
+      else:
+        # Only the slots below the highest used one need to be saved.
+        used = np.flatnonzero(self._refcounts)
+        size = used[-1] + 1 if used.size else 0
+        np.savez(string_file,
+                 pool=self._pool[:size],
+                 refcounts=self._refcounts[:size],
+                 hashes=self._hashes[:size])
+      serialized = string_file.getvalue()
+    finally:
+      string_file.close()
+    return serialized
 
   def deserialize(self, string_value):
-    """Callback for `PythonStateWrapper` to deserialize the array."""
-    self._frames = pickle.loads(string_value)
+    """Callback for `PythonStateWrapper` to deserialize the frame pool."""
+    string_file = io.BytesIO(string_value)
+    try:
+      arrays = np.load(string_file, allow_pickle=False)
+      self._clear_pool()
+      if 'pool' not in arrays:
+        return
+      pool = arrays['pool']
+      refcounts = arrays['refcounts']
+      hashes = arrays['hashes']
+    finally:
+      string_file.close()
+    size = max(len(pool), self._initial_capacity)
+    self._pool = np.zeros((size,) + pool.shape[1:], dtype=pool.dtype)
+    self._pool[:len(pool)] = pool
+    self._refcounts = np.zeros((size,), dtype=np.int64)
+    self._refcounts[:len(pool)] = refcounts
+    self._hashes = np.zeros((size,), dtype=np.int64)
+    self._hashes[:len(pool)] = hashes
+    used = np.flatnonzero(self._refcounts)
+    self._slots = dict(zip(self._hashes[used].tolist(), used.tolist()))
+    self._free_slots = np.flatnonzero(self._refcounts == 0)[::-1].tolist()
 
   def compress(self, observation, split_axis=-1):
     # e.g. When split_axis is -1, turns an array of size 84x84x4
     # into a list of arrays of size 84x84x1.
     frame_list = np.split(observation, observation.shape[split_axis],
                           split_axis)
-    return np.array([self.add_frame(f) for f in frame_list])
+    return np.array([self.add_frame(f) for f in frame_list], dtype=np.int64)
 
   def decompress(self, observation, split_axis=-1):
-    frames = [self._frames[h][0] for h in observation]
-    return np.concatenate(frames, axis=split_axis)
+    return np.concatenate(self._pool[observation], axis=split_axis)
+
+  def decompress_batch(self, observations):
+    """Decompresses a batch of observations split along their last axis.
+
+    Args:
+      observations: An int64 array of frame slots with shape
+        `outer_dims + [num_frames]`.
+
+    Returns:
+      The observations with shape
+      `outer_dims + frame_shape[:-1] + [num_frames * frame_shape[-1]]`.
+    """
+    outer_rank = observations.ndim - 1
+    frames = self._pool[observations]
+    frame_shape = frames.shape[observations.ndim:]
+    # Moving the frame axis next to the channel axis and merging both is
+    # equivalent to concatenating the frames along the last axis.
+    frames = np.moveaxis(frames, outer_rank, -2)
+    return frames.reshape(observations.shape[:-1] + frame_shape[:-1] +
+                          (observations.shape[-1] * frame_shape[-1],))
 
   def on_delete(self, observation, split_axis=-1):
-    for h in observation:
-      frame, refcount = self._frames[h]
-      if refcount > 1:
-        self._frames[h] = (frame, refcount - 1)
-      else:
-        del self._frames[h]
+    slots = np.asarray(observation, dtype=np.int64).ravel()
+    np.subtract.at(self._refcounts, slots, 1)
+    for slot in np.unique(slots[self._refcounts[slots] == 0]).tolist():
+      del self._slots[self._hashes[slot]]
+      self._free_slots.append(slot)
 
   def clear(self):
-    self._frames = {}
+    self._clear_pool()
 
 
 class PyHashedReplayBuffer(py_uniform_replay_buffer.PyUniformReplayBuffer):
@@ -109,14 +206,17 @@ class PyHashedReplayBuffer(py_uniform_replay_buffer.PyUniformReplayBuffer):
   trajectory.Trajectory instances.
   """
 
-  def __init__(self, data_spec, capacity, log_interval=None):
+  def __init__(self, data_spec, capacity, log_interval=None, batch_size=None):
     if not isinstance(data_spec, trajectory.Trajectory):
       raise ValueError(
           'data_spec must be the spec of a trajectory: {}'.format(data_spec))
     super(PyHashedReplayBuffer, self).__init__(
-        data_spec, capacity)
+        data_spec, capacity, batch_size=batch_size)
 
-    self._frame_buffer = FrameBuffer()
+    # Each stored observation references at most one frame per element of its
+    # last axis, which bounds the number of unique frames in the pool.
+    self._frame_buffer = FrameBuffer(
+        capacity=capacity * data_spec.observation.shape[-1])
     self._lock_frame_buffer = threading.Lock()
     self._log_interval = log_interval
 
@@ -165,6 +265,11 @@ class PyHashedReplayBuffer(py_uniform_replay_buffer.PyUniformReplayBuffer):
     observation = self._frame_buffer.decompress(encoded_trajectory.observation)
     return encoded_trajectory._replace(observation=observation)
 
+  def _decode_batch(self, encoded_trajectories, outer_rank):
+    observation = self._frame_buffer.decompress_batch(
+        encoded_trajectories.observation)
+    return encoded_trajectories._replace(observation=observation)
+
   def _on_delete(self, encoded_trajectory):
     with self._lock_frame_buffer:
       self._frame_buffer.on_delete(encoded_trajectory.observation)
@@ -18,6 +18,7 @@
 from __future__ import division
 from __future__ import unicode_literals
 
+import functools
 import os
 
 from absl.testing import parameterized
@@ -30,6 +31,7 @@ from tf_agents.trajectories import policy_step
 from tf_agents.trajectories import time_step as ts
 from tf_agents.trajectories import trajectory
 from tf_agents.utils import nest_utils
+from tf_agents.utils import numpy_storage
 
 
 def next_dataset_element(test_case, dataset):
@@ -90,6 +92,44 @@ class FrameBufferTest(tf.test.TestCase):
     fb.on_delete([h])
     self.assertEqual(1, len(fb))
 
+  def testFramePoolGrowsAndReusesSlots(self):
+    fb = py_hashed_replay_buffer.FrameBuffer(capacity=2)
+    frames = [np.full([3, 3, 1], k, dtype=np.uint8) for k in range(3)]
+    slots = [fb.add_frame(f) for f in frames]
+    self.assertEqual([0, 1, 2], slots)
+    self.assertEqual(slots[1], fb.add_frame(frames[1]))
+    self.assertEqual(3, len(fb))
+
+    fb.on_delete([slots[0], slots[1]])
+    self.assertEqual(2, len(fb))
+    # Slot 0 is free again while slot 1 is still referenced once.
+    self.assertEqual(0, fb.add_frame(np.full([3, 3, 1], 7, dtype=np.uint8)))
+    self.assertAllEqual(np.concatenate([frames[1], frames[2]], axis=-1),
+                        fb.decompress([1, 2]))
+
+  def testSerialize(self):
+    fb = py_hashed_replay_buffer.FrameBuffer()
+    observation = np.random.randint(
+        low=0, high=256, size=[5, 5, 4], dtype=np.uint8)
+    compressed = fb.compress(observation)
+    restored = py_hashed_replay_buffer.FrameBuffer()
+    restored.deserialize(fb.serialize())
+    self.assertEqual(4, len(restored))
+    self.assertAllEqual(observation, restored.decompress(compressed))
+    # Deduplication still works after restoring.
+    self.assertAllEqual(compressed, restored.compress(observation))
+    self.assertEqual(4, len(restored))
+
+  def testDecompressBatch(self):
+    fb = py_hashed_replay_buffer.FrameBuffer()
+    observations = np.random.randint(
+        low=0, high=256, size=[2, 3, 5, 5, 4], dtype=np.uint8)
+    compressed = np.array([[fb.compress(o) for o in row]
+                           for row in observations])
+    self.assertEqual((2, 3, 4), compressed.shape)
+    self.assertAllEqual(observations, fb.decompress_batch(compressed))
+    self.assertAllEqual(observations[1, 2], fb.decompress(compressed[1, 2]))
+
 
 class PyUniformReplayBufferTest(parameterized.TestCase, tf.test.TestCase):
 
@@ -271,6 +311,110 @@ class PyUniformReplayBufferTest(parameterized.TestCase, tf.test.TestCase):
     self.assertEqual(traj.observation.shape, (3, 15, 15, 4))
     self.assertEqual(traj.action.shape, (3,))
 
+  @parameterized.named_parameters(
+      [('WithoutHashing', py_uniform_replay_buffer.PyUniformReplayBuffer),
+       ('WithHashing', py_hashed_replay_buffer.PyHashedReplayBuffer)])
+  def testGetNextBatchWithNumSteps(self, rb_cls):
+    self._generate_replay_buffer(rb_cls=rb_cls)
+
+    traj = self._replay_buffer.get_next(sample_batch_size=64, num_steps=3)
+    self.assertEqual((64, 3, 15, 15, 4), traj.observation.shape)
+    self.assertEqual((64, 3), traj.action.shape)
+    min_value = self._transition_count - self._capacity
+    first_frames = traj.observation[:, :, 0, 0, 0]
+    self.assertTrue(np.all(min_value <= first_frames))
+    # Every sample is made of consecutive transitions.
+    self.assertAllEqual(first_frames[:, :1] + np.arange(3), first_frames)
+    self.assertAllEqual(traj.observation[..., :1] + np.arange(4),
+                        traj.observation)
+
+    items = self._replay_buffer.get_next(
+        sample_batch_size=64, num_steps=3, time_stacked=False)
+    self.assertLen(items, 3)
+    for item in items:
+      self.assertEqual((64, 15, 15, 4), item.observation.shape)
+    self.assertAllEqual(items[0].observation + 2, items[2].observation)
+
+  def testGetNextBatchDoesNotCrossHead(self):
+    data_spec = array_spec.ArraySpec((), np.int32)
+    replay_buffer = py_uniform_replay_buffer.PyUniformReplayBuffer(
+        data_spec=data_spec, capacity=10)
+    for i in range(15):
+      replay_buffer.add_batch(np.array([i]))
+
+    items = replay_buffer.get_next(sample_batch_size=1000, num_steps=2)
+    self.assertEqual((1000, 2), items.shape)
+    self.assertAllEqual(items[:, 0] + 1, items[:, 1])
+    self.assertAllInSet(items[:, 0], list(range(5, 14)))
+
+  def testAddBatch(self):
+    data_spec = array_spec.ArraySpec((2,), np.int32)
+    replay_buffer = py_uniform_replay_buffer.PyUniformReplayBuffer(
+        data_spec=data_spec, capacity=10)
+    for i in range(3):
+      replay_buffer.add_batch(
+          np.tile(np.arange(4 * i, 4 * i + 4, dtype=np.int32)[:, None], 2))
+    self.assertEqual(10, replay_buffer.size)
+
+    # Items 0 and 1 were overwritten by the last batch.
+    items = replay_buffer.get_next(sample_batch_size=1000, num_steps=2)
+    self.assertAllEqual(items[:, 0] + 1, items[:, 1])
+    self.assertAllInSet(items[:, 0, 0], list(range(2, 11)))
+
+    with self.assertRaises(ValueError):
+      replay_buffer.add_batch(np.zeros((11, 2), np.int32))
+
+  def testAddBatchPerEnvironment(self):
+    data_spec = array_spec.ArraySpec((), np.int32)
+    with self.assertRaises(ValueError):
+      py_uniform_replay_buffer.PyUniformReplayBuffer(
+          data_spec=data_spec, capacity=10, batch_size=3)
+    replay_buffer = py_uniform_replay_buffer.PyUniformReplayBuffer(
+        data_spec=data_spec, capacity=12, batch_size=3)
+    self.assertEqual(3, replay_buffer.batch_size)
+
+    # Environment `e` produces the stream 100 * e, 100 * e + 1, ...
+    for i in range(6):
+      replay_buffer.add_batch(np.array([i, 100 + i, 200 + i], np.int32))
+    self.assertEqual(12, replay_buffer.size)
+
+    items = replay_buffer.get_next(sample_batch_size=1000, num_steps=3)
+    self.assertEqual((1000, 3), items.shape)
+    self.assertAllEqual(items[:, :1] + np.arange(3), items)
+    self.assertAllInSet(items[:, 0] % 100, [2, 3])
+    self.assertAllInSet(items[:, 0] // 100, [0, 1, 2])
+
+    all_items = replay_buffer.gather_all()
+    self.assertEqual((3, 4), all_items.shape)
+    self.assertAllEqual([4, 5, 2, 3], all_items[0])
+    self.assertAllEqual([204, 205, 202, 203], all_items[2])
+
+    with self.assertRaises(ValueError):
+      replay_buffer.add_batch(np.zeros((2,), np.int32))
+
+  def testAddBatchHashedDeletesOverwrittenFrames(self):
+    self._create_replay_buffer(py_hashed_replay_buffer.PyHashedReplayBuffer)
+    observations = np.arange(40 * 4, dtype=np.int32).reshape(40, 1, 1, 4)
+    observations = np.tile(observations, (1, 15, 15, 1))
+    step_types = np.zeros((40,), np.int32)
+    traj = trajectory.Trajectory(
+        step_type=step_types,
+        observation=observations,
+        action=step_types,
+        policy_info=(),
+        next_step_type=step_types,
+        reward=np.zeros((40,), np.float32),
+        discount=np.ones((40,), np.float32))
+    self._replay_buffer.add_batch(
+        tf.nest.map_structure(lambda t: t[:20], traj))
+    self._replay_buffer.add_batch(
+        tf.nest.map_structure(lambda t: t[20:], traj))
+    # Only the frames of the last 32 (= capacity) observations are left.
+    self.assertLen(self._replay_buffer._frame_buffer, 32 * 4)
+    sample = self._replay_buffer.get_next(sample_batch_size=100)
+    self.assertAllInSet(sample.observation[:, 0, 0, 0] // 4,
+                        list(range(8, 40)))
+
   @parameterized.named_parameters(
       [('WithoutHashing', py_uniform_replay_buffer.PyUniformReplayBuffer),
        ('WithHashing', py_hashed_replay_buffer.PyHashedReplayBuffer)])
@@ -304,6 +448,30 @@ class PyUniformReplayBufferTest(parameterized.TestCase, tf.test.TestCase):
         self.assertAllEqual(traj.observation[:, :, 0] + 3,
                             traj.observation[:, :, 3])
 
+  def testMemmapStorageCheckpointable(self):
+    directory = os.path.join(self.get_temp_dir(), 'memmap')
+    storage_fn = functools.partial(
+        numpy_storage.MemmapNumpyStorage, directory=directory)
+    self._create_replay_buffer(
+        functools.partial(py_uniform_replay_buffer.PyUniformReplayBuffer,
+                          storage_fn=storage_fn))
+    self._fill_replay_buffer()
+    self.assertTrue(os.path.exists(os.path.join(directory, 'buffer1.npy')))
+
+    prefix = os.path.join(self.get_temp_dir(), 'ckpt')
+    save_path = tf.train.Checkpoint(rb=self._replay_buffer).save(prefix)
+
+    loaded_rb = py_uniform_replay_buffer.PyUniformReplayBuffer(
+        data_spec=self._trajectory_spec, capacity=self._capacity,
+        storage_fn=storage_fn)
+    tf.train.Checkpoint(rb=loaded_rb).restore(save_path).assert_consumed()
+    self.assertEqual(32, loaded_rb.size)
+    min_value = self._transition_count - self._capacity
+    traj = loaded_rb.get_next(sample_batch_size=100)
+    self.assertTrue(np.all(min_value <= traj.observation[:, 0, 0, 0]))
+    self.assertAllEqual(traj.observation[..., :1] + np.arange(4),
+                        traj.observation)
+
 
 if __name__ == '__main__':
   tf.test.main()
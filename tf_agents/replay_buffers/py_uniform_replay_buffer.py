@@ -42,29 +42,56 @@ class PyUniformReplayBuffer(replay_buffer.ReplayBuffer):
 
   Writing and reading to this replay buffer is thread safe.
 
+  By default items are stored in a single circular buffer: a batch of `B`
+  items passed to `add_batch` is written as `B` consecutive items. When
+  `batch_size` is given, the storage is instead split into `batch_size`
+  segments of `capacity // batch_size` items, one per batch entry, similar to
+  `TFUniformReplayBuffer`. Each call to `add_batch` then appends one item to
+  every segment, so that samples with `num_steps > 1` never mix the streams of
+  different environments.
+
   This replay buffer can be subclassed to change the encoding used for the
   underlying storage by overriding _encoded_data_spec, _encode, _decode, and
   _on_delete.
   """
 
-  def __init__(self, data_spec, capacity):
+  def __init__(self, data_spec, capacity, batch_size=None,
+               storage_fn=numpy_storage.NumpyStorage):
     """Creates a PyUniformReplayBuffer.
 
     Args:
       data_spec: An ArraySpec or a list/tuple/nest of ArraySpecs describing a
         single item that can be stored in this buffer.
       capacity: The maximum number of items that can be stored in the buffer.
+      batch_size: (Optional.) The outer batch size of the items passed to
+        `add_batch`. If given, each batch entry is stored in its own segment
+        of `capacity // batch_size` items.
+      storage_fn: Function to create the storage
+        `storage_fn(data_spec, capacity)` that holds the encoded items, e.g.
+        `functools.partial(numpy_storage.MemmapNumpyStorage, directory=...)`
+        to keep them in memory-mapped files instead of RAM.
+
+    Raises:
+      ValueError: If `batch_size` is not a positive divisor of `capacity`.
     """
+    if batch_size is not None and (batch_size < 1 or capacity % batch_size):
+      raise ValueError('capacity ({}) must be a multiple of batch_size '
+                       '({}).'.format(capacity, batch_size))
     super(PyUniformReplayBuffer, self).__init__(data_spec, capacity)
 
-    self._storage = numpy_storage.NumpyStorage(self._encoded_data_spec(),
-                                               capacity)
+    self._batch_size = batch_size
+    self._num_segments = batch_size if batch_size is not None else 1
+    self._segment_length = capacity // self._num_segments
+    self._segment_offsets = (
+        np.arange(self._num_segments, dtype=np.int64) * self._segment_length)
+
+    self._storage = storage_fn(self._encoded_data_spec(), capacity)
     self._lock = threading.Lock()
     self._np_state = numpy_storage.NumpyState()
 
     # Adding elements to the replay buffer is done in a circular way.
-    # Keeps track of the actual size of the replay buffer and the location
-    # where to add new elements.
+    # Keeps track of the actual size of each segment of the replay buffer and
+    # the location where to add new elements in it.
     self._np_state.size = np.int64(0)
     self._np_state.cur_id = np.int64(0)
 
@@ -83,13 +110,67 @@ class PyUniformReplayBuffer(replay_buffer.ReplayBuffer):
     """Decodes an item."""
     return item
 
+  def _encode_batch(self, items):
+    """Encodes a nest of items with a single outer batch dimension.
+
+    The default implementation is a no-op when `_encode` is not overridden and
+    otherwise encodes the items one at a time.
+
+    Args:
+      items: A nest of arrays with an outer batch dimension.
+
+    Returns:
+      A nest of encoded arrays with the same outer batch dimension.
+    """
+    if not self._overrides('_encode'):
+      return items
+    return nest_utils.stack_nested_arrays(
+        [self._encode(item) for item in nest_utils.unstack_nested_arrays(
+            items)])
+
+  def _decode_batch(self, items, outer_rank):
+    """Decodes a nest of items with `outer_rank` leading (batch) dimensions.
+
+    The default implementation is a no-op when `_decode` is not overridden and
+    otherwise falls back to decoding the items one at a time. Subclasses with a
+    custom `_decode` should override this method with a vectorized version.
+
+    Args:
+      items: A nest of encoded arrays, each with `outer_rank` outer dimensions.
+      outer_rank: The number of outer dimensions of `items`.
+
+    Returns:
+      A nest of decoded arrays with the same outer dimensions.
+    """
+    if not self._overrides('_decode'):
+      return items
+    if outer_rank == 0:
+      return self._decode(items)
+    outer_shape = tf.nest.flatten(items)[0].shape[:outer_rank]
+    flat_items = tf.nest.map_structure(
+        lambda t: np.reshape(t, (-1,) + t.shape[outer_rank:]), items)
+    decoded = nest_utils.stack_nested_arrays(
+        [self._decode(item) for item in nest_utils.unstack_nested_arrays(
+            flat_items)])
+    return tf.nest.map_structure(
+        lambda t: np.reshape(t, outer_shape + t.shape[1:]), decoded)
+
   def _on_delete(self, encoded_item):
     """Do any necessary cleanup."""
     pass
 
+  def _overrides(self, method_name):
+    """Returns whether a subclass overrides the given method."""
+    return (getattr(type(self), method_name) is not
+            getattr(PyUniformReplayBuffer, method_name))
+
   @property
   def size(self):
-    return self._np_state.size
+    return self._np_state.size * self._num_segments
+
+  @property
+  def batch_size(self):
+    return self._batch_size
 
   def _num_frames(self):
     raise NotImplementedError(
@@ -97,65 +178,83 @@ class PyUniformReplayBuffer(replay_buffer.ReplayBuffer):
 
   def _add_batch(self, items):
     outer_shape = nest_utils.get_outer_array_shape(items, self._data_spec)
-    if outer_shape[0] != 1:
-      raise NotImplementedError('PyUniformReplayBuffer only supports a batch '
-                                'size of 1, but received `items` with batch '
-                                'size {}.'.format(outer_shape[0]))
-
-    item = nest_utils.unbatch_nested_array(items)
+    num_items = outer_shape[0]
+    if self._batch_size is not None:
+      if num_items != self._batch_size:
+        raise ValueError('PyUniformReplayBuffer was created with batch_size '
+                         '{}, but received `items` with batch size '
+                         '{}.'.format(self._batch_size, num_items))
+    elif num_items > self._capacity:
+      raise ValueError('Cannot add {} items to a PyUniformReplayBuffer with '
+                       'capacity {}.'.format(num_items, self._capacity))
+
+    encoded_items = self._encode_batch(items)
     with self._lock:
-      if self._np_state.size == self._capacity:
-        # If we are at capacity, we are deleting element cur_id.
-        self._on_delete(self._storage.get(self._np_state.cur_id))
-      self._storage.set(self._np_state.cur_id, self._encode(item))
-      self._np_state.size = np.minimum(self._np_state.size + 1,
-                                       self._capacity)
-      self._np_state.cur_id = (self._np_state.cur_id + 1) % self._capacity
-      self._np_state.item_count += 1
+      size = self._np_state.size
+      cur_id = self._np_state.cur_id
+      if self._batch_size is not None:
+        # One item per segment, at the same position in every segment.
+        rows = self._segment_offsets + cur_id
+        num_written = 1
+        overwritten = rows if size == self._segment_length else rows[:0]
+      else:
+        rows = (cur_id + np.arange(num_items)) % self._capacity
+        num_written = num_items
+        # The first `capacity - size` rows are still empty.
+        overwritten = rows[self._capacity - size:]
+
+      if self._overrides('_on_delete'):
+        for row in overwritten:
+          self._on_delete(self._storage.get(row))
+      self._storage.set(rows, encoded_items)
+      self._np_state.size = np.minimum(size + num_written,
+                                       self._segment_length)
+      self._np_state.cur_id = (cur_id + num_written) % self._segment_length
+      self._np_state.item_count += num_items
 
   def _get_next(self,
                 sample_batch_size=None,
                 num_steps=None,
                 time_stacked=True):
+    outer_shape = () if sample_batch_size is None else (sample_batch_size,)
+    if num_steps is not None:
+      outer_shape += (num_steps,)
     num_steps_value = num_steps if num_steps is not None else 1
-    def get_single():
-      """Gets a single item from the replay buffer."""
-      with self._lock:
-        if self._np_state.size <= 0:
-          def empty_item(spec):
-            return np.empty(spec.shape, dtype=spec.dtype)
-          if num_steps is not None:
-            item = [tf.nest.map_structure(empty_item, self.data_spec)
-                    for n in range(num_steps)]
-            if time_stacked:
-              item = nest_utils.stack_nested_arrays(item)
-          else:
-            item = tf.nest.map_structure(empty_item, self.data_spec)
-          return item
-        idx = np.random.randint(self._np_state.size - num_steps_value + 1)
-        if self._np_state.size == self._capacity:
-          # If the buffer is full, add cur_id (head of circular buffer) so that
+
+    with self._lock:
+      if self._np_state.size <= 0:
+        def empty_item(spec):
+          return np.empty(outer_shape + spec.shape, dtype=spec.dtype)
+        item = tf.nest.map_structure(empty_item, self.data_spec)
+      else:
+        # Sample all the starting indices at once and gather every (batch,
+        # time) position with a single fancy-index per flattened field.
+        sample_shape = None if sample_batch_size is None else outer_shape[:1]
+        idx = np.random.randint(
+            self._np_state.size - num_steps_value + 1, size=sample_shape)
+        if self._np_state.size == self._segment_length:
+          # If the segment is full, add cur_id (head of circular buffer) so that
           # we sample from the range [cur_id, cur_id + size - num_steps_value].
           # We will modulo the size below.
           idx += self._np_state.cur_id
-
         if num_steps is not None:
-          # TODO(b/120242830): Try getting data from numpy in one shot rather
-          # than num_steps_value.
-          item = [self._decode(self._storage.get((idx + n) % self._capacity))
-                  for n in range(num_steps)]
-        else:
-          item = self._decode(self._storage.get(idx % self._capacity))
-
-      if num_steps is not None and time_stacked:
-        item = nest_utils.stack_nested_arrays(item)
-      return item
-
-    if sample_batch_size is None:
-      return get_single()
-    else:
-      samples = [get_single() for _ in range(sample_batch_size)]
-      return nest_utils.stack_nested_arrays(samples)
+          idx = np.expand_dims(idx, -1) + np.arange(num_steps)
+        rows = idx % self._segment_length
+        if self._num_segments > 1:
+          segments = np.random.randint(self._num_segments, size=sample_shape)
+          if num_steps is not None:
+            segments = np.expand_dims(segments, -1)
+          rows = rows + self._segment_offsets[segments]
+        item = self._decode_batch(self._storage.get(rows), len(outer_shape))
+
+    if num_steps is not None and not time_stacked:
+      time_axis = len(outer_shape) - 1
+      item = [
+          tf.nest.map_structure(
+              lambda t: np.take(t, n, axis=time_axis),  # pylint: disable=cell-var-from-loop
+              item) for n in range(num_steps)
+      ]
+    return item
 
   def _as_dataset(self, sample_batch_size=None, num_steps=None,
                   num_parallel_calls=None):
@@ -174,12 +273,8 @@ class PyUniformReplayBuffer(replay_buffer.ReplayBuffer):
 
     def generator_fn():
       while True:
-        if sample_batch_size is not None:
-          batch = [self._get_next(num_steps=num_steps, time_stacked=False)
-                   for _ in range(sample_batch_size)]
-          item = nest_utils.stack_nested_arrays(batch)
-        else:
-          item = self._get_next(num_steps=num_steps, time_stacked=False)
+        item = self._get_next(sample_batch_size=sample_batch_size,
+                              num_steps=num_steps, time_stacked=False)
         yield tuple(tf.nest.flatten(item))
 
     def time_stack(*structures):
@@ -196,11 +291,11 @@ class PyUniformReplayBuffer(replay_buffer.ReplayBuffer):
       return ds
 
   def _gather_all(self):
-    data = [self._decode(self._storage.get(idx))
-            for idx in range(self._capacity)]
-    stacked = nest_utils.stack_nested_arrays(data)
-    batched = tf.nest.map_structure(lambda t: np.expand_dims(t, 0), stacked)
-    return batched
+    data = self._decode_batch(
+        self._storage.get(np.arange(self._capacity)), outer_rank=1)
+    return tf.nest.map_structure(
+        lambda t: np.reshape(t, (self._num_segments, self._segment_length) +
+                             t.shape[1:]), data)
 
   def _clear(self):
     self._np_state.size = np.int64(0)
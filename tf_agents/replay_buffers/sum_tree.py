@@ -0,0 +1,142 @@
+# coding=utf-8
+# Copyright 2018 The TF-Agents Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A sum tree stored in a tf.Variable.
+
+The tree is stored as a flat array of `2 * num_leaves` values where
+`num_leaves` is the smallest power of two greater or equal to `capacity`. Node
+`i` has children `2 * i` and `2 * i + 1`, the root is node `1` and leaf `j` is
+node `num_leaves + j`. Each internal node holds the sum of its children, which
+allows updating a value and sampling proportionally to the values in
+O(log(capacity)).
+
+This class is not threadsafe: concurrent calls to `write` must be serialized by
+the caller, e.g. using a `tf.CriticalSection`.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import tensorflow as tf  # pylint: disable=g-explicit-tensorflow-version-import
+
+from tf_agents.utils import common
+
+
+class SumTree(tf.Module):
+  """A sum tree over `capacity` non-negative float values."""
+
+  def __init__(self, capacity, dtype=tf.float32, scope='SumTree'):
+    """Creates a sum tree with all values set to zero.
+
+    Args:
+      capacity: Number of values (leaves) stored in the tree.
+      dtype: Floating point dtype of the values.
+      scope: Variable scope for the SumTree.
+    Raises:
+      ValueError: If capacity is not positive.
+    """
+    super(SumTree, self).__init__(name=scope)
+    if capacity < 1:
+      raise ValueError('capacity must be positive, got {}.'.format(capacity))
+    self._capacity = capacity
+    self._depth = int(np.ceil(np.log2(capacity)))
+    self._num_leaves = 2 ** self._depth
+    with tf.compat.v1.variable_scope(scope):
+      self._tree = common.create_variable(
+          name='tree',
+          initializer=tf.zeros([2 * self._num_leaves], dtype=dtype),
+          shape=None,
+          dtype=dtype,
+          unique_name=False)
+
+  @property
+  def capacity(self):
+    return self._capacity
+
+  def variables(self):
+    return [self._tree]
+
+  def total(self):
+    """Returns the sum of all the values in the tree."""
+    return self._tree.sparse_read(1)
+
+  def read(self, indices):
+    """Returns the values stored at the given leaf indices."""
+    indices = tf.convert_to_tensor(indices, dtype=tf.int64)
+    return self._tree.sparse_read(indices + self._num_leaves)
+
+  def write(self, indices, values):
+    """Returns an op setting the values at the given leaf indices.
+
+    Args:
+      indices: A rank-1 int Tensor of leaf indices.
+      values: A rank-1 Tensor of non-negative values, one per index.
+
+    Returns:
+      An op that updates the leaves and all their ancestors.
+    """
+    nodes = tf.convert_to_tensor(indices, dtype=tf.int64) + self._num_leaves
+    update = tf.compat.v1.scatter_update(self._tree, nodes, values).op
+    # Recompute the sums level by level; siblings updated in the same call
+    # produce the same parent value, so duplicate parents are harmless.
+    for _ in range(self._depth):
+      nodes //= 2
+      with tf.control_dependencies([update]):
+        sums = (self._tree.sparse_read(2 * nodes) +
+                self._tree.sparse_read(2 * nodes + 1))
+        update = tf.compat.v1.scatter_update(self._tree, nodes, sums).op
+    return update
+
+  def clear(self):
+    """Returns an op setting all the values to zero."""
+    return self._tree.assign(tf.zeros_like(self._tree)).op
+
+  def sample(self, values):
+    """Finds the leaves corresponding to the given cumulative values.
+
+    A value `u` in `[0, total())` maps to the leaf `j` such that
+    `sum(v[:j]) <= u < sum(v[:j + 1])`. Drawing `u` uniformly therefore samples
+    leaf `j` with probability `v[j] / total()`.
+
+    Args:
+      values: A rank-1 Tensor of cumulative values in `[0, total())`.
+
+    Returns:
+      An int64 Tensor of leaf indices with the same shape as `values`.
+    """
+    return self.find(values)[0]
+
+  def find(self, values):
+    """Like `sample`, but also returns the position of `values` in the leaves.
+
+    Args:
+      values: A rank-1 Tensor of cumulative values in `[0, total())`.
+
+    Returns:
+      A tuple `(indices, remainders)` where `indices` are the leaves found by
+      `sample` and `remainders = values - sum(v[:indices])`, which lie in
+      `[0, v[indices])` up to rounding errors.
+    """
+    values = tf.convert_to_tensor(values, dtype=self._tree.dtype)
+    nodes = tf.ones_like(values, dtype=tf.int64)
+    for _ in range(self._depth):
+      left = 2 * nodes
+      left_sum = self._tree.sparse_read(left)
+      go_right = values >= left_sum
+      values = tf.where(go_right, values - left_sum, values)
+      nodes = tf.where(go_right, left + 1, left)
+    return nodes - self._num_leaves, values
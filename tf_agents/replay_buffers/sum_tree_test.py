@@ -0,0 +1,81 @@
+# coding=utf-8
+# Copyright 2018 The TF-Agents Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for tf_agents.replay_buffers.sum_tree."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import tensorflow as tf  # pylint: disable=g-explicit-tensorflow-version-import
+
+from tf_agents.replay_buffers import sum_tree
+
+from tensorflow.python.framework import test_util  # pylint:disable=g-direct-tensorflow-import  # TF internal
+
+
+class SumTreeTest(tf.test.TestCase):
+
+  @test_util.run_in_graph_and_eager_modes()
+  def testWriteAndRead(self):
+    tree = sum_tree.SumTree(capacity=5)
+    self.evaluate(tf.compat.v1.global_variables_initializer())
+    self.evaluate(tree.write([0, 3, 4], [1., 2., 4.]))
+    self.assertAllClose([1., 0., 0., 2., 4.],
+                        self.evaluate(tree.read(np.arange(5))))
+    self.assertAllClose(7., self.evaluate(tree.total()))
+
+    self.evaluate(tree.write([3], [0.5]))
+    self.assertAllClose(5.5, self.evaluate(tree.total()))
+
+    self.evaluate(tree.clear())
+    self.assertAllClose(0., self.evaluate(tree.total()))
+
+  @test_util.run_in_graph_and_eager_modes()
+  def testCapacityOne(self):
+    tree = sum_tree.SumTree(capacity=1)
+    self.evaluate(tf.compat.v1.global_variables_initializer())
+    self.evaluate(tree.write([0], [3.]))
+    self.assertAllClose(3., self.evaluate(tree.total()))
+    self.assertAllEqual([0, 0], self.evaluate(tree.sample([0., 2.9])))
+
+  @test_util.run_in_graph_and_eager_modes()
+  def testSample(self):
+    tree = sum_tree.SumTree(capacity=6)
+    self.evaluate(tf.compat.v1.global_variables_initializer())
+    self.evaluate(tree.write(np.arange(6), [1., 0., 2., 3., 0., 4.]))
+    indices = tree.sample([0., 0.99, 1., 2.5, 3., 5.99, 6., 9.99])
+    self.assertAllEqual([0, 0, 2, 2, 3, 3, 5, 5], self.evaluate(indices))
+
+  @test_util.run_in_graph_and_eager_modes()
+  def testFind(self):
+    tree = sum_tree.SumTree(capacity=3, dtype=tf.float64)
+    self.evaluate(tf.compat.v1.global_variables_initializer())
+    self.evaluate(tree.write(np.arange(3), [2., 0., 3.]))
+    indices, remainders = self.evaluate(tree.find([0., 1.5, 2., 4.5]))
+    self.assertAllEqual([0, 0, 2, 2], indices)
+    self.assertAllClose([0., 1.5, 0., 2.5], remainders)
+
+  def testSampleProportionally(self):
+    tree = sum_tree.SumTree(capacity=4)
+    tree.write(np.arange(4), [1., 2., 3., 4.])
+    values = tf.random.uniform([10000], maxval=tree.total())
+    counts = np.bincount(tree.sample(values).numpy(), minlength=4)
+    self.assertAllClose([0.1, 0.2, 0.3, 0.4], counts / 10000., atol=0.02)
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -0,0 +1,333 @@
+# coding=utf-8
+# Copyright 2018 The TF-Agents Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A batched replay buffer of nests of Tensors with prioritized sampling.
+
+Items are stored with the same layout as `TFUniformReplayBuffer`, and each
+item also has a priority kept in a `SumTree`, so that sampling proportionally
+to the priorities and updating them both cost O(log(capacity)). See
+"Prioritized Experience Replay", Schaul et al., 2015
+(https://arxiv.org/abs/1511.05952).
+
+New items are added with the highest priority seen so far. After training on a
+sample, the priorities should be updated with `update_priorities`, e.g.:
+
+```python
+experience, buffer_info = replay_buffer.get_next(sample_batch_size=64,
+                                                 num_steps=2)
+loss_info = agent.train(experience, weights=buffer_info.importance_weights)
+replay_buffer.update_priorities(buffer_info.ids[:, 0],
+                                tf.abs(loss_info.extra.td_error))
+```
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import gin
+import tensorflow as tf  # pylint: disable=g-explicit-tensorflow-version-import
+
+from tf_agents.replay_buffers import sum_tree
+from tf_agents.replay_buffers import table
+from tf_agents.replay_buffers import tf_uniform_replay_buffer
+from tf_agents.utils import common
+
+
+PrioritizedBufferInfo = collections.namedtuple(
+    'PrioritizedBufferInfo', ['ids', 'probabilities', 'importance_weights'])
+
+
+@gin.configurable
+class TFPrioritizedReplayBuffer(tf_uniform_replay_buffer.TFUniformReplayBuffer):
+  """A TFUniformReplayBuffer with proportional prioritized sampling."""
+
+  def __init__(self,
+               data_spec,
+               batch_size,
+               max_length=1000,
+               priority_exponent=0.6,
+               importance_sampling_exponent=0.4,
+               priority_epsilon=1e-6,
+               max_sampling_attempts=10,
+               scope='TFPrioritizedReplayBuffer',
+               device='cpu:*',
+               table_fn=table.Table,
+               dataset_drop_remainder=False,
+               dataset_window_shift=None,
+               stateful_dataset=False):
+    """Creates a TFPrioritizedReplayBuffer.
+
+    The storage layout is the same as the one of `TFUniformReplayBuffer`.
+
+    Args:
+      data_spec: A TensorSpec or a list/tuple/nest of TensorSpecs describing a
+        single item that can be stored in this buffer.
+      batch_size: Batch dimension of tensors when adding to buffer.
+      max_length: The maximum number of items that can be stored in a single
+        batch segment of the buffer.
+      priority_exponent: Exponent `alpha` applied to the priorities passed to
+        `update_priorities`. `0` recovers uniform sampling.
+      importance_sampling_exponent: Exponent `beta` of the importance weights
+        `(N * P(i)) ** -beta` returned by `get_next`, normalized so that the
+        largest weight of a batch is `1`.
+      priority_epsilon: Small constant added to the priorities passed to
+        `update_priorities`, so that no item stops being sampled.
+      max_sampling_attempts: Number of times a sampled item that cannot start a
+        sequence of `num_steps` items (i.e. it is too close to the head of its
+        batch segment) is resampled. Items still invalid after that are
+        replaced with uniformly sampled valid items.
+      scope: Scope prefix for variables and ops created by this class.
+      device: A TensorFlow device to place the Variables and ops.
+      table_fn: Function to create tables `table_fn(data_spec, capacity)` that
+        can read/write nested tensors.
+      dataset_drop_remainder: See `TFUniformReplayBuffer`.
+      dataset_window_shift: See `TFUniformReplayBuffer`.
+      stateful_dataset: whether the dataset contains stateful ops or not.
+    """
+    super(TFPrioritizedReplayBuffer, self).__init__(
+        data_spec,
+        batch_size,
+        max_length=max_length,
+        scope=scope,
+        device=device,
+        table_fn=table_fn,
+        dataset_drop_remainder=dataset_drop_remainder,
+        dataset_window_shift=dataset_window_shift,
+        stateful_dataset=stateful_dataset)
+    self._priority_exponent = priority_exponent
+    self._importance_sampling_exponent = importance_sampling_exponent
+    self._priority_epsilon = priority_epsilon
+    self._max_sampling_attempts = max_sampling_attempts
+    with tf.device(self._device), tf.compat.v1.variable_scope(self._scope):
+      self._sum_tree = sum_tree.SumTree(self._capacity_value)
+      self._max_priority = common.create_variable(
+          'max_priority', 1.0, dtype=tf.float32)
+      self._priority_cs = tf.CriticalSection(name='priority')
+
+  def variables(self):
+    return (super(TFPrioritizedReplayBuffer, self).variables() +
+            self._sum_tree.variables() + [self._max_priority])
+
+  def update_priorities(self, ids, priorities):
+    """Updates the priorities of the items with the given ids.
+
+    Items which have been overwritten since they were sampled keep their
+    current priority.
+
+    Args:
+      ids: An int64 Tensor of item ids, as returned in the `ids` field of the
+        `PrioritizedBufferInfo` returned by `get_next`. When sampling sequences
+        of `num_steps` items, the priority of a sequence is the priority of its
+        first item, i.e. pass `ids[:, 0]`.
+      priorities: A float Tensor with the same shape as `ids`, e.g. the
+        absolute TD errors of the sampled items.
+
+    Returns:
+      An op that updates the priorities.
+    """
+    with tf.device(self._device), tf.name_scope(self._scope):
+      with tf.name_scope('update_priorities'):
+        ids = tf.reshape(tf.cast(ids, tf.int64), [-1])
+        priorities = tf.reshape(tf.cast(priorities, tf.float32), [-1])
+        item_ids, rows = self._split_ids(ids)
+        is_current = tf.equal(self._id_table.read(rows), item_ids)
+        priorities = tf.pow(tf.abs(priorities) + self._priority_epsilon,
+                            self._priority_exponent)
+
+        def _update():
+          new_priorities = tf.where(is_current, priorities,
+                                    self._sum_tree.read(rows))
+          max_priority = tf.reduce_max(
+              tf.where(is_current, priorities, tf.zeros_like(priorities)))
+          return tf.group(
+              self._sum_tree.write(rows, new_priorities),
+              self._max_priority.assign(
+                  tf.maximum(self._max_priority, max_priority)))
+        return self._priority_cs.execute(_update)
+
+  # Methods defined in ReplayBuffer base class
+
+  def _add_batch(self, items):
+    """Adds a batch of items to the replay buffer with the max priority.
+
+    Args:
+      items: A tensor or list/tuple/nest of tensors representing a batch of
+      items to be added to the replay buffer. Each element of `items` must match
+      the data_spec of this class. Should be shape [batch_size, data_spec, ...]
+    Returns:
+      An op that adds `items` to the replay buffer.
+    """
+    tf.nest.assert_same_structure(items, self._data_spec)
+
+    with tf.device(self._device), tf.name_scope(self._scope):
+      id_ = self._increment_last_id()
+      write_rows = self._get_rows_for_id(id_)
+      write_id_op = self._id_table.write(write_rows, id_)
+      write_data_op = self._data_table.write(write_rows, items)
+
+      def _write_priorities():
+        priorities = tf.fill([self._batch_size], self._max_priority.value())
+        return self._sum_tree.write(write_rows, priorities)
+      with tf.control_dependencies([write_id_op, write_data_op]):
+        write_priority_op = self._priority_cs.execute(_write_priorities)
+      return tf.group(write_id_op, write_data_op, write_priority_op)
+
+  def _get_next(self,
+                sample_batch_size=None,
+                num_steps=None,
+                time_stacked=True):
+    """Returns an item or batch of items sampled by priority from the buffer.
+
+    Args:
+      sample_batch_size: (Optional.) An optional batch_size to specify the
+        number of items to return. See get_next() documentation.
+      num_steps: (Optional.)  Optional way to specify that sub-episodes are
+        desired. See get_next() documentation.
+      time_stacked: Bool, when true and num_steps > 1 get_next on the buffer
+        would return the items stack on the time dimension. The outputs would be
+        [B, T, ..] if sample_batch_size is given or [T, ..] otherwise.
+    Returns:
+      A 2 tuple, containing:
+        - An item, sequence of items, or batch thereof sampled from the buffer
+          proportionally to the priorities.
+        - PrioritizedBufferInfo NamedTuple, containing:
+          - The items' ids, to be passed to `update_priorities`.
+          - The sampling probability of each item.
+          - The importance sampling weight of each item.
+    """
+    with tf.device(self._device), tf.name_scope(self._scope):
+      with tf.name_scope('get_next'):
+        last_id = self._get_last_id()
+        min_val, max_val = tf_uniform_replay_buffer._valid_range_ids(  # pylint: disable=protected-access
+            last_id, self._max_length, num_steps)
+        rows_shape = () if sample_batch_size is None else (sample_batch_size,)
+        num_samples = 1 if sample_batch_size is None else sample_batch_size
+        assert_nonempty = tf.compat.v1.assert_greater(
+            max_val,
+            min_val,
+            message='TFPrioritizedReplayBuffer is empty. Make sure to add '
+            'items before sampling the buffer.')
+        with tf.control_dependencies([assert_nonempty]):
+          min_val = tf.identity(min_val)
+          max_val = tf.identity(max_val)
+          total_priority = self._sum_tree.total()
+
+        def _is_valid(rows):
+          ids = self._id_table.read(rows)
+          return ((ids >= min_val) & (ids < max_val) &
+                  (self._sum_tree.read(rows) > 0))
+
+        def _sample_rows():
+          values = tf.random.uniform(
+              [num_samples], maxval=total_priority, dtype=tf.float32)
+          # Rounding errors can select one of the padding leaves of the tree.
+          return tf.minimum(self._sum_tree.sample(values),
+                            self._capacity_value - 1)
+
+        def _resample_invalid(rows, valid):
+          rows = tf.where(valid, rows, _sample_rows())
+          return rows, _is_valid(rows)
+
+        rows = _sample_rows()
+        rows, valid = tf.while_loop(
+            cond=lambda _, valid: ~tf.reduce_all(valid),
+            body=_resample_invalid,
+            loop_vars=(rows, _is_valid(rows)),
+            maximum_iterations=self._max_sampling_attempts)
+        uniform_ids = tf.random.uniform(
+            [num_samples], minval=min_val, maxval=max_val, dtype=tf.int64)
+        uniform_batch_offsets = tf.random.uniform(
+            [num_samples], maxval=self._batch_size,
+            dtype=tf.int64) * self._max_length
+        rows = tf.where(
+            valid, rows,
+            uniform_batch_offsets + tf.math.mod(uniform_ids, self._max_length))
+
+        # Items too close to the head of their segment are never returned, so
+        # their priorities are excluded from the normalization.
+        head_ids = tf.range(max_val, last_id + 1)
+        head_rows = (tf.expand_dims(self._batch_offsets, 1) +
+                     tf.math.mod(head_ids, self._max_length))
+        valid_priority = total_priority - tf.reduce_sum(
+            self._sum_tree.read(tf.reshape(head_rows, [-1])))
+        valid_priority = tf.maximum(valid_priority, 1e-10)
+        probabilities = self._sum_tree.read(rows) / valid_priority
+
+        num_items = tf.cast((max_val - min_val) * self._batch_size, tf.float32)
+        importance_weights = tf.where(
+            probabilities > 0,
+            tf.pow(num_items * tf.maximum(probabilities, 1e-10),
+                   -self._importance_sampling_exponent),
+            tf.zeros_like(probabilities))
+        importance_weights /= tf.maximum(
+            tf.reduce_max(importance_weights), 1e-10)
+
+        start_ids = self._id_table.read(rows)
+        batch_offsets = rows - tf.math.mod(rows, self._max_length)
+        segments = batch_offsets // self._max_length
+
+        def _read(step_ids, batch_offsets, segments):
+          step_rows = batch_offsets + tf.math.mod(step_ids, self._max_length)
+          data = self._data_table.read(step_rows)
+          return data, step_ids * self._batch_size + segments
+
+        if num_steps is None:
+          data, data_ids = _read(start_ids, batch_offsets, segments)
+        elif time_stacked:
+          step_ids = (tf.expand_dims(start_ids, -1) +
+                      tf.range(num_steps, dtype=tf.int64))
+          data, data_ids = _read(step_ids, tf.expand_dims(batch_offsets, -1),
+                                 tf.expand_dims(segments, -1))
+        else:
+          data, data_ids = zip(*[_read(start_ids + step, batch_offsets,
+                                       segments)
+                                 for step in range(num_steps)])
+
+        def _reshape(t):
+          return tf.reshape(t, list(rows_shape) + t.shape[1:].as_list())
+        data, data_ids = tf.nest.map_structure(_reshape, (data, data_ids))
+        buffer_info = PrioritizedBufferInfo(
+            ids=data_ids,
+            probabilities=_reshape(probabilities),
+            importance_weights=_reshape(importance_weights))
+    return data, buffer_info
+
+  def _clear(self, clear_all_variables=False):
+    """Return op that resets the contents of replay buffer.
+
+    Args:
+      clear_all_variables: See `TFUniformReplayBuffer.clear`. Priorities are
+        always reset.
+
+    Returns:
+      op that clears or unlinks the replay buffer contents.
+    """
+    clear_op = super(TFPrioritizedReplayBuffer, self)._clear(
+        clear_all_variables)
+
+    def _clear_priorities():
+      return tf.group(self._sum_tree.clear(), self._max_priority.assign(1.0))
+    with tf.control_dependencies([clear_op]):
+      return self._priority_cs.execute(_clear_priorities)
+
+  def _split_ids(self, ids):
+    """Returns the item ids and storage rows of the given buffer ids."""
+    segments = tf.math.mod(ids, self._batch_size)
+    item_ids = ids // self._batch_size
+    rows = segments * self._max_length + tf.math.mod(item_ids,
+                                                      self._max_length)
+    return item_ids, rows
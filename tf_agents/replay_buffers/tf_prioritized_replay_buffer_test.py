@@ -0,0 +1,154 @@
+# coding=utf-8
+# Copyright 2018 The TF-Agents Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for tf_prioritized_replay_buffer."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import tensorflow as tf  # pylint: disable=g-explicit-tensorflow-version-import
+
+from tf_agents import specs
+from tf_agents.replay_buffers import tf_prioritized_replay_buffer
+
+from tensorflow.python.framework import test_util  # pylint:disable=g-direct-tensorflow-import  # TF internal
+
+
+class TFPrioritizedReplayBufferTest(tf.test.TestCase):
+
+  def _create_replay_buffer(self, batch_size=2, max_length=5, **kwargs):
+    spec = specs.TensorSpec([], tf.int64, 'value')
+    return tf_prioritized_replay_buffer.TFPrioritizedReplayBuffer(
+        spec, batch_size=batch_size, max_length=max_length, **kwargs)
+
+  def _fill(self, replay_buffer, num_adds):
+    # Segment `b` receives the values 100 * b, 100 * b + 1, ...
+    for i in range(num_adds):
+      self.evaluate(replay_buffer.add_batch(
+          tf.constant([i, 100 + i], dtype=tf.int64)))
+
+  @test_util.run_in_graph_and_eager_modes()
+  def testGetNextEmpty(self):
+    replay_buffer = self._create_replay_buffer()
+    self.evaluate(tf.compat.v1.global_variables_initializer())
+    with self.assertRaisesRegexp(
+        tf.errors.InvalidArgumentError, 'TFPrioritizedReplayBuffer is empty'):
+      sample, _ = replay_buffer.get_next()
+      self.evaluate(sample)
+
+  @test_util.run_in_graph_and_eager_modes()
+  def testSampleUniformWithInitialPriorities(self):
+    replay_buffer = self._create_replay_buffer()
+    self.evaluate(tf.compat.v1.global_variables_initializer())
+    self._fill(replay_buffer, 7)
+
+    sample, info = replay_buffer.get_next(sample_batch_size=50)
+    sample, info = self.evaluate((sample, info))
+    self.assertEqual((50,), sample.shape)
+    self.assertAllInSet(sample, [2, 3, 4, 5, 6, 102, 103, 104, 105, 106])
+    self.assertAllClose(np.full([50], 0.1), info.probabilities)
+    self.assertAllClose(np.ones([50]), info.importance_weights)
+    # The ids identify both the item and its batch segment.
+    self.assertAllEqual(sample % 100 * 2 + sample // 100, info.ids)
+
+  @test_util.run_in_graph_and_eager_modes()
+  def testSampleNumStepsDoesNotCrossHead(self):
+    replay_buffer = self._create_replay_buffer()
+    self.evaluate(tf.compat.v1.global_variables_initializer())
+    self._fill(replay_buffer, 7)
+
+    sample, info = replay_buffer.get_next(sample_batch_size=200, num_steps=3)
+    sample, info = self.evaluate((sample, info))
+    self.assertEqual((200, 3), sample.shape)
+    self.assertEqual((200, 3), info.ids.shape)
+    self.assertAllEqual(sample[:, :1] + np.arange(3), sample)
+    self.assertAllInSet(sample[:, 0], [2, 3, 4, 102, 103, 104])
+    self.assertAllClose(np.full([200], 1. / 6), info.probabilities)
+
+    sample, _ = replay_buffer.get_next(
+        sample_batch_size=4, num_steps=2, time_stacked=False)
+    first, second = self.evaluate(sample)
+    self.assertAllEqual(first + 1, second)
+
+  @test_util.run_in_graph_and_eager_modes()
+  def testUpdatePriorities(self):
+    replay_buffer = self._create_replay_buffer(
+        priority_exponent=1.0, importance_sampling_exponent=1.0,
+        priority_epsilon=0.0)
+    self.evaluate(tf.compat.v1.global_variables_initializer())
+    self._fill(replay_buffer, 5)
+
+    # Item 3 of the first segment has id 3 * batch_size.
+    ids = tf.constant([0, 1, 2, 3, 4, 5, 6, 7, 8, 9], dtype=tf.int64)
+    priorities = tf.constant([0, 0, 0, 0, 0, 0, 3, 0, 1, 0], dtype=tf.float32)
+    self.evaluate(replay_buffer.update_priorities(ids, priorities))
+
+    sample, info = replay_buffer.get_next(sample_batch_size=2000)
+    sample, info = self.evaluate((sample, info))
+    self.assertAllInSet(sample, [3, 4])
+    self.assertAllClose(0.75, np.mean(sample == 3), atol=0.05)
+    self.assertAllClose(np.where(sample == 3, 0.75, 0.25), info.probabilities)
+    self.assertAllClose(np.where(sample == 3, 1. / 3, 1.),
+                        info.importance_weights)
+
+    # New items get the maximum priority seen so far.
+    self._fill(replay_buffer, 1)
+    sample, info = replay_buffer.get_next(sample_batch_size=100)
+    sample, info = self.evaluate((sample, info))
+    self.assertAllInSet(sample, [0, 3, 4, 100])
+    self.assertAllClose(np.where(sample == 4, 0.1, 0.3), info.probabilities)
+
+  @test_util.run_in_graph_and_eager_modes()
+  def testUpdatePrioritiesIgnoresOverwrittenItems(self):
+    replay_buffer = self._create_replay_buffer(
+        priority_exponent=1.0, priority_epsilon=0.0)
+    self.evaluate(tf.compat.v1.global_variables_initializer())
+    self._fill(replay_buffer, 5)
+    # Overwrite item 0 of both segments.
+    self._fill(replay_buffer, 1)
+
+    ids = tf.constant([0, 1], dtype=tf.int64)
+    self.evaluate(replay_buffer.update_priorities(ids, [10., 10.]))
+    _, info = replay_buffer.get_next(sample_batch_size=10)
+    self.assertAllClose(np.full([10], 0.1), self.evaluate(info.probabilities))
+
+  @test_util.run_in_graph_and_eager_modes()
+  def testClear(self):
+    replay_buffer = self._create_replay_buffer(
+        priority_exponent=1.0, priority_epsilon=0.0)
+    self.evaluate(tf.compat.v1.global_variables_initializer())
+    self._fill(replay_buffer, 5)
+    self.evaluate(replay_buffer.update_priorities([0], [10.]))
+    self.evaluate(replay_buffer.clear())
+    self._fill(replay_buffer, 2)
+
+    sample, info = replay_buffer.get_next(sample_batch_size=10)
+    sample, info = self.evaluate((sample, info))
+    self.assertAllInSet(sample, [0, 1, 100, 101])
+    self.assertAllClose(np.full([10], 0.25), info.probabilities)
+
+  def testAsDataset(self):
+    replay_buffer = self._create_replay_buffer()
+    self._fill(replay_buffer, 7)
+    dataset = replay_buffer.as_dataset(sample_batch_size=3, num_steps=2)
+    sample, info = next(iter(dataset))
+    self.assertEqual((3, 2), sample.shape)
+    self.assertEqual((3,), info.importance_weights.shape)
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -130,6 +130,158 @@ def check_arrays_nest(arrays, spec):
   return all(tf.nest.flatten(checks))
 
 
+# Global validation levels used by `ArraysNestChecker.maybe_check`.
+VALIDATION_FULL = 'full'
+VALIDATION_SAMPLED = 'sampled'
+VALIDATION_OFF = 'off'
+_VALIDATION_LEVELS = (VALIDATION_FULL, VALIDATION_SAMPLED, VALIDATION_OFF)
+
+_validation_level = VALIDATION_FULL
+_validation_sample_every_n = 100
+
+
+@gin.configurable
+def set_validation_level(level, sample_every_n=100):
+  """Sets how often per-step spec validation runs.
+
+  Per-step validation (see `ArraysNestChecker.maybe_check`) is on by default,
+  which is what tests want. Production collection can turn it down to only
+  check every `sample_every_n`-th call of each checker, or turn it off.
+
+  Args:
+    level: One of `VALIDATION_FULL`, `VALIDATION_SAMPLED` and `VALIDATION_OFF`.
+    sample_every_n: (int) When `level` is `VALIDATION_SAMPLED`, the number of
+      calls between two checks.
+
+  Raises:
+    ValueError: If `level` is unknown or `sample_every_n` is not positive.
+  """
+  global _validation_level, _validation_sample_every_n
+  if level not in _VALIDATION_LEVELS:
+    raise ValueError('Unknown validation level {!r}; expected one of '
+                     '{}.'.format(level, _VALIDATION_LEVELS))
+  if sample_every_n < 1:
+    raise ValueError(
+        'sample_every_n must be positive; got {}.'.format(sample_every_n))
+  _validation_level = level
+  _validation_sample_every_n = sample_every_n
+
+
+def get_validation_level():
+  """Returns the current global validation level."""
+  return _validation_level
+
+
+class ArraysNestChecker(object):
+  """Checks that nests of arrays conform to a fixed nest of specs.
+
+  Equivalent to `check_arrays_nest`, except that the spec is flattened once at
+  construction time: the shape, dtype and bounds of every leaf are
+  precomputed, so a check only flattens the arrays and compares each leaf with
+  a few vectorized NumPy comparisons.
+
+  Example usage:
+  ```python
+  checker = ArraysNestChecker(env.time_step_spec())
+  if not checker.maybe_check(time_step):
+    raise ValueError(...)
+  ```
+  """
+
+  def __init__(self, spec, outer_dims=()):
+    """Initializes a new `ArraysNestChecker`.
+
+    Args:
+      spec: An `ArraySpec`, or a nested dict, list or tuple of `ArraySpec`s.
+      outer_dims: An optional list/tuple of outer dimensions that the arrays
+        have in addition to the spec shapes, e.g. the batch size.
+    """
+    self._spec = spec
+    self._outer_dims = tuple(outer_dims)
+    self._leaves = [self._compile_leaf(leaf) for leaf in tf.nest.flatten(spec)]
+    self._num_calls = 0
+
+  def _compile_leaf(self, spec):
+    """Returns the precomputed `(shape, dtype, minimum, maximum)` of `spec`."""
+    if not isinstance(spec, ArraySpec):
+      return None
+    shape = self._outer_dims + spec.shape
+    if not is_bounded(spec):
+      return shape, spec.dtype, None, None
+    minimum, maximum = spec.minimum, spec.maximum
+    # Uniform bounds are compared against the array min and max, which avoids
+    # materializing two boolean arrays per check.
+    if np.all(minimum == minimum.flat[0]):
+      minimum = minimum.flat[0]
+    if np.all(maximum == maximum.flat[0]):
+      maximum = maximum.flat[0]
+    return shape, spec.dtype, minimum, maximum
+
+  @property
+  def spec(self):
+    return self._spec
+
+  def check(self, arrays):
+    """Returns whether `arrays` conforms to the spec.
+
+    Args:
+      arrays: A NumPy array, or a nested dict, list or tuple of arrays.
+
+    Returns:
+      True if the arrays conform to the spec, False otherwise.
+    """
+    try:
+      tf.nest.assert_same_structure(arrays, self._spec)
+    except (TypeError, ValueError):
+      return False
+    for leaf, array in zip(self._leaves, tf.nest.flatten(arrays)):
+      if leaf is None:
+        return False
+      shape, dtype, minimum, maximum = leaf
+      if isinstance(array, np.ndarray):
+        if array.shape != shape or array.dtype != dtype:
+          return False
+      elif isinstance(array, numbers.Number):
+        if shape or np.dtype(type(array)) != dtype:
+          return False
+      else:
+        return False
+      if minimum is None or np.size(array) == 0:
+        continue
+      # `np.min` and `np.max` propagate NaNs, and the negated comparisons
+      # reject them like the elementwise ones do.
+      if np.ndim(minimum) == 0:
+        if not np.min(array) >= minimum:
+          return False
+      elif not np.all(array >= minimum):
+        return False
+      if np.ndim(maximum) == 0:
+        if not np.max(array) <= maximum:
+          return False
+      elif not np.all(array <= maximum):
+        return False
+    return True
+
+  def maybe_check(self, arrays):
+    """Like `check`, but only runs as often as the global validation level.
+
+    Args:
+      arrays: A NumPy array, or a nested dict, list or tuple of arrays.
+
+    Returns:
+      True if the arrays conform to the spec or the check was skipped, False
+      otherwise.
+    """
+    if _validation_level == VALIDATION_OFF:
+      return True
+    if _validation_level == VALIDATION_SAMPLED:
+      # Checks the first call and then every `sample_every_n`-th one.
+      self._num_calls += 1
+      if (self._num_calls - 1) % _validation_sample_every_n:
+        return True
+    return self.check(arrays)
+
+
 def add_outer_dims_nest(structure, outer_dims):
   def add_outer_dims(spec):
     name = spec.name
@@ -210,6 +210,88 @@ class CheckArraysNestTest(parameterized.TestCase):
     self.assertFalse(array_spec.check_arrays_nest(arrays, spec))
 
 
+class ArraysNestCheckerTest(parameterized.TestCase):
+
+  def tearDown(self):
+    array_spec.set_validation_level(array_spec.VALIDATION_FULL)
+    super(ArraysNestCheckerTest, self).tearDown()
+
+  @parameterized.named_parameters(*TYPE_PARAMETERS)
+  def testMatch(self, dtype):
+    spec = example_nested_spec(dtype)
+    sample = array_spec.sample_spec_nest(spec, np.random.RandomState())
+    checker = array_spec.ArraysNestChecker(spec)
+    self.assertTrue(checker.check(sample))
+
+  @parameterized.named_parameters(*TYPE_PARAMETERS)
+  def testMatchOuterDims(self, dtype):
+    spec = example_nested_spec(dtype)
+    sample = array_spec.sample_spec_nest(
+        spec, np.random.RandomState(), outer_dims=[2, 3])
+    checker = array_spec.ArraysNestChecker(spec, outer_dims=(2, 3))
+    self.assertTrue(checker.check(sample))
+
+  @parameterized.named_parameters(
+      ("different keys", {"foo": np.array([1])}, {"bar": example_basic_spec()}),
+      ("different types 1", {"foo": np.array([1])}, [example_basic_spec()]),
+      ("different types 2", [np.array([1])], {"foo": example_basic_spec()}),
+      ("different lengths", [np.array([1])], [example_basic_spec(),
+                                              example_basic_spec()]),
+      ("array mismatch 1",
+       {"foo": np.array([1, 2])}, {"foo": example_basic_spec()}),
+      ("array mismatch 2", [np.array([1, 2])], [example_basic_spec()]),
+      ("not an array", "a string", example_basic_spec()),
+      ("not a spec", np.array([1]), "a string"),
+  )
+  def testNoMatch(self, arrays, spec):
+    self.assertFalse(array_spec.ArraysNestChecker(spec).check(arrays))
+
+  @parameterized.named_parameters(
+      ("uniform bounds", 5, 15),
+      ("per element bounds", [5, 4], [15, 16]))
+  def testBounds(self, minimum, maximum):
+    spec = array_spec.BoundedArraySpec(
+        (2,), np.int64, minimum=minimum, maximum=maximum)
+    checker = array_spec.ArraysNestChecker(spec)
+    self.assertTrue(checker.check(np.array([5, 15], np.int64)))
+    self.assertFalse(checker.check(np.array([1, 10], np.int64)))
+    self.assertFalse(checker.check(np.array([5, 20], np.int64)))
+
+  @parameterized.named_parameters(
+      ("uniform bounds", -1., 1.),
+      ("per element bounds", [-1., -2.], [1., 2.]))
+  def testRejectsNaN(self, minimum, maximum):
+    spec = array_spec.BoundedArraySpec(
+        (2,), np.float32, minimum=minimum, maximum=maximum)
+    checker = array_spec.ArraysNestChecker(spec)
+    nan_array = np.array([0., np.nan], np.float32)
+    self.assertFalse(spec.check_array(nan_array))
+    self.assertFalse(checker.check(nan_array))
+
+  def testValidationLevels(self):
+    spec = example_basic_spec()
+    checker = array_spec.ArraysNestChecker(spec)
+    wrong_array = np.array([1, 2])
+
+    self.assertFalse(checker.maybe_check(wrong_array))
+
+    array_spec.set_validation_level(array_spec.VALIDATION_OFF)
+    self.assertTrue(checker.maybe_check(wrong_array))
+    # Explicit checks ignore the validation level.
+    self.assertFalse(checker.check(wrong_array))
+
+    array_spec.set_validation_level(
+        array_spec.VALIDATION_SAMPLED, sample_every_n=3)
+    self.assertEqual(array_spec.VALIDATION_SAMPLED,
+                     array_spec.get_validation_level())
+    results = [checker.maybe_check(wrong_array) for _ in range(6)]
+    self.assertEqual([False, True, True, False, True, True], results)
+
+  def testInvalidValidationLevel(self):
+    with self.assertRaisesRegexp(ValueError, "Unknown validation level"):
+      array_spec.set_validation_level("sometimes")
+
+
 class ArraySpecTest(parameterized.TestCase):
 
   def testShapeTypeError(self):
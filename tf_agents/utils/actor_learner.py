@@ -0,0 +1,295 @@
+# coding=utf-8
+# Copyright 2018 The TF-Agents Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Runs collection and training concurrently.
+
+The train_eval loops alternate `collect_driver.run()` and `train_step()` in a
+single thread, so environment stepping and learning never overlap.
+`ActorLearnerRunner` instead runs collection in a background thread that keeps
+writing to the replay buffer, while the caller's thread trains on
+`replay_buffer.as_dataset()`. A `SamplesPerInsertRateLimiter` keeps the two
+sides at a fixed ratio of sampled to inserted items.
+
+Example usage:
+```python
+runner = actor_learner.ActorLearnerRunner(
+    collect_fn=collect_driver.run,
+    train_fn=train_step,
+    rate_limiter=actor_learner.SamplesPerInsertRateLimiter(
+        samples_per_insert=4.0, min_size_to_sample=1000),
+    inserts_per_collect=collect_steps_per_iteration,
+    samples_per_train=batch_size)
+runner.start()
+for _ in range(num_iterations):
+  loss_info = runner.train_step()
+runner.stop()
+```
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import sys
+import threading
+import time
+
+from absl import logging
+import six
+
+
+class SamplesPerInsertRateLimiter(object):
+  """Keeps the ratio of sampled to inserted items close to a target.
+
+  The actor calls `await_insert()` before every insertion and the learner calls
+  `await_sample()` before every sampling. Let
+  `diff = num_inserts * samples_per_insert - num_samples`. Inserting blocks
+  while `diff > error_buffer` (the actor is too far ahead) and sampling blocks
+  while `diff < -error_buffer` (the learner is too far ahead) or while fewer
+  than `min_size_to_sample` items have been inserted. Both conditions are
+  checked before the operation, so one side can always make progress.
+
+  This class is thread safe.
+  """
+
+  def __init__(self, samples_per_insert, min_size_to_sample=1,
+               error_buffer=None):
+    """Creates a `SamplesPerInsertRateLimiter`.
+
+    Args:
+      samples_per_insert: (float) Target number of sampled items per inserted
+        item.
+      min_size_to_sample: (int) Minimum number of inserted items before
+        sampling is allowed. Inserting never blocks before that.
+      error_buffer: (float) Allowed deviation from the target, in sampled
+        items. Defaults to `max(1.0, samples_per_insert)`.
+
+    Raises:
+      ValueError: If `samples_per_insert` is not positive or `error_buffer` is
+        negative.
+    """
+    if samples_per_insert <= 0:
+      raise ValueError('samples_per_insert must be positive; got {}.'.format(
+          samples_per_insert))
+    if error_buffer is None:
+      error_buffer = max(1.0, samples_per_insert)
+    if error_buffer < 0:
+      raise ValueError(
+          'error_buffer must be non-negative; got {}.'.format(error_buffer))
+    self._samples_per_insert = float(samples_per_insert)
+    self._min_size_to_sample = min_size_to_sample
+    self._error_buffer = float(error_buffer)
+    self._num_inserts = 0
+    self._num_samples = 0
+    self._stopped = False
+    self._condition = threading.Condition()
+
+  @property
+  def num_inserts(self):
+    return self._num_inserts
+
+  @property
+  def num_samples(self):
+    return self._num_samples
+
+  def _diff(self):
+    return self._num_inserts * self._samples_per_insert - self._num_samples
+
+  def _can_insert(self):
+    return (self._num_inserts < self._min_size_to_sample or
+            self._diff() <= self._error_buffer)
+
+  def _can_sample(self):
+    return (self._num_inserts >= self._min_size_to_sample and
+            self._diff() >= -self._error_buffer)
+
+  def _await(self, predicate, timeout):
+    """Waits until `predicate` holds. Returns False if stopped or timed out."""
+    deadline = None if timeout is None else time.time() + timeout
+    with self._condition:
+      while not self._stopped and not predicate():
+        if deadline is None:
+          self._condition.wait()
+        else:
+          remaining = deadline - time.time()
+          if remaining <= 0:
+            return False
+          self._condition.wait(remaining)
+      return not self._stopped
+
+  def await_insert(self, timeout=None):
+    """Blocks until inserting is allowed.
+
+    Args:
+      timeout: Optional timeout in seconds.
+
+    Returns:
+      True if inserting is allowed, False if the limiter was stopped or the
+      call timed out.
+    """
+    return self._await(self._can_insert, timeout)
+
+  def await_sample(self, timeout=None):
+    """Blocks until sampling is allowed. See `await_insert`."""
+    return self._await(self._can_sample, timeout)
+
+  def insert(self, num_items=1):
+    """Records `num_items` inserted items and wakes up waiting samplers."""
+    with self._condition:
+      self._num_inserts += num_items
+      self._condition.notify_all()
+
+  def sample(self, num_items=1):
+    """Records `num_items` sampled items and wakes up waiting inserters."""
+    with self._condition:
+      self._num_samples += num_items
+      self._condition.notify_all()
+
+  def stop(self):
+    """Releases all the waiting calls, which then return False."""
+    with self._condition:
+      self._stopped = True
+      self._condition.notify_all()
+
+
+class ActorLearnerRunner(object):
+  """Runs collection in a background thread while the caller trains.
+
+  The actor thread repeatedly waits for the rate limiter and calls
+  `collect_fn()`, which should add `inserts_per_collect` items to the replay
+  buffer (e.g. a driver `run` with `replay_buffer.add_batch` as an observer).
+  `train_step()` waits for the rate limiter and calls `train_fn()` in the
+  caller's thread, which should consume `samples_per_train` items from the
+  replay buffer dataset.
+
+  If the actor uses its own copy of the policy variables, `update_actor_fn`
+  copies the learner's variables into it every `update_actor_interval` train
+  steps, e.g. with `common.soft_variables_update(learner_policy.variables(),
+  actor_policy.variables(), tau=1.0)`. Updates never overlap with a
+  `collect_fn()` call.
+
+  An exception raised by `collect_fn` stops the actor and is re-raised by the
+  next `train_step()` or `stop()`.
+  """
+
+  def __init__(self,
+               collect_fn,
+               train_fn,
+               rate_limiter,
+               inserts_per_collect,
+               samples_per_train,
+               update_actor_fn=None,
+               update_actor_interval=1):
+    """Creates an `ActorLearnerRunner`.
+
+    Args:
+      collect_fn: A function without arguments that runs one round of
+        collection.
+      train_fn: A function without arguments that runs one train step and
+        returns its result, e.g. a `LossInfo`.
+      rate_limiter: A `SamplesPerInsertRateLimiter`.
+      inserts_per_collect: (int) Number of items added to the replay buffer by
+        one `collect_fn()` call.
+      samples_per_train: (int) Number of items sampled from the replay buffer
+        by one `train_fn()` call.
+      update_actor_fn: Optional function without arguments that pushes the
+        learner's policy variables to the actor.
+      update_actor_interval: (int) Number of train steps between two calls of
+        `update_actor_fn`.
+    """
+    self._collect_fn = collect_fn
+    self._train_fn = train_fn
+    self._rate_limiter = rate_limiter
+    self._inserts_per_collect = inserts_per_collect
+    self._samples_per_train = samples_per_train
+    self._update_actor_fn = update_actor_fn
+    self._update_actor_interval = update_actor_interval
+    self._num_train_steps = 0
+    # Held by the actor during `collect_fn()` and by the learner while it
+    # updates the actor's variables.
+    self._actor_lock = threading.Lock()
+    self._actor_thread = None
+    self._actor_exc_info = None
+    self._stop_event = threading.Event()
+
+  @property
+  def rate_limiter(self):
+    return self._rate_limiter
+
+  @property
+  def num_train_steps(self):
+    return self._num_train_steps
+
+  def start(self):
+    """Starts the actor thread."""
+    if self._actor_thread is not None:
+      raise RuntimeError('ActorLearnerRunner was already started.')
+    self._actor_thread = threading.Thread(
+        target=self._run_actor, name='ActorLearnerRunner_actor')
+    self._actor_thread.daemon = True
+    self._actor_thread.start()
+
+  def _run_actor(self):
+    try:
+      while not self._stop_event.is_set():
+        if not self._rate_limiter.await_insert():
+          break
+        with self._actor_lock:
+          self._collect_fn()
+        self._rate_limiter.insert(self._inserts_per_collect)
+    except Exception:  # pylint: disable=broad-except
+      logging.exception('Collection failed in the actor thread.')
+      self._actor_exc_info = sys.exc_info()
+      self._rate_limiter.stop()
+
+  def _maybe_reraise_actor_exception(self):
+    if self._actor_exc_info is not None:
+      six.reraise(*self._actor_exc_info)
+
+  def train_step(self):
+    """Runs one train step once the rate limiter allows it.
+
+    Returns:
+      The result of `train_fn()`.
+
+    Raises:
+      RuntimeError: If the runner was not started or was stopped.
+      Exception: Any exception raised by `collect_fn` in the actor thread.
+    """
+    if self._actor_thread is None:
+      raise RuntimeError('ActorLearnerRunner.start() must be called first.')
+    if not self._rate_limiter.await_sample():
+      self._maybe_reraise_actor_exception()
+      raise RuntimeError('ActorLearnerRunner was stopped.')
+    result = self._train_fn()
+    self._rate_limiter.sample(self._samples_per_train)
+    self._num_train_steps += 1
+    if (self._update_actor_fn is not None and
+        self._num_train_steps % self._update_actor_interval == 0):
+      with self._actor_lock:
+        self._update_actor_fn()
+    return result
+
+  def stop(self):
+    """Stops the actor thread and waits for its current collection to end.
+
+    Raises:
+      Exception: Any exception raised by `collect_fn` in the actor thread.
+    """
+    self._stop_event.set()
+    self._rate_limiter.stop()
+    if self._actor_thread is not None:
+      self._actor_thread.join()
+    self._maybe_reraise_actor_exception()
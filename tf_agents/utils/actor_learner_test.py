@@ -0,0 +1,126 @@
+# coding=utf-8
+# Copyright 2018 The TF-Agents Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for tf_agents.utils.actor_learner."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import threading
+
+import tensorflow as tf  # pylint: disable=g-explicit-tensorflow-version-import
+from tf_agents.utils import actor_learner
+
+
+class SamplesPerInsertRateLimiterTest(tf.test.TestCase):
+
+  def testInvalidArguments(self):
+    with self.assertRaisesRegexp(ValueError, 'samples_per_insert'):
+      actor_learner.SamplesPerInsertRateLimiter(0)
+    with self.assertRaisesRegexp(ValueError, 'error_buffer'):
+      actor_learner.SamplesPerInsertRateLimiter(1.0, error_buffer=-1)
+
+  def testMinSizeToSample(self):
+    limiter = actor_learner.SamplesPerInsertRateLimiter(
+        samples_per_insert=1.0, min_size_to_sample=10, error_buffer=0)
+    self.assertFalse(limiter.await_sample(timeout=0))
+    limiter.insert(9)
+    # Inserting never blocks before `min_size_to_sample` items.
+    self.assertTrue(limiter.await_insert(timeout=0))
+    self.assertFalse(limiter.await_sample(timeout=0))
+    limiter.insert(1)
+    self.assertTrue(limiter.await_sample(timeout=0))
+
+  def testRatio(self):
+    limiter = actor_learner.SamplesPerInsertRateLimiter(
+        samples_per_insert=2.0, error_buffer=4)
+    limiter.insert(3)
+    # diff = 3 * 2 - 0 = 6 > 4: the actor is too far ahead.
+    self.assertFalse(limiter.await_insert(timeout=0))
+    self.assertTrue(limiter.await_sample(timeout=0))
+    limiter.sample(2)
+    self.assertTrue(limiter.await_insert(timeout=0))
+    limiter.sample(9)
+    # diff = 6 - 11 = -5 < -4: the learner is too far ahead.
+    self.assertFalse(limiter.await_sample(timeout=0))
+
+  def testStopReleasesWaiters(self):
+    limiter = actor_learner.SamplesPerInsertRateLimiter(1.0)
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.append(limiter.await_sample()))
+    thread.start()
+    limiter.stop()
+    thread.join()
+    self.assertEqual([False], results)
+
+
+class ActorLearnerRunnerTest(tf.test.TestCase):
+
+  def testRunsAtSamplesPerInsertRatio(self):
+    limiter = actor_learner.SamplesPerInsertRateLimiter(
+        samples_per_insert=2.0, min_size_to_sample=4, error_buffer=8)
+    collected = []
+    updates = []
+    runner = actor_learner.ActorLearnerRunner(
+        collect_fn=lambda: collected.append(1),
+        train_fn=lambda: len(collected),
+        rate_limiter=limiter,
+        inserts_per_collect=2,
+        samples_per_train=4,
+        update_actor_fn=lambda: updates.append(1),
+        update_actor_interval=5)
+    runner.start()
+    for _ in range(20):
+      num_collected = runner.train_step()
+      self.assertGreaterEqual(num_collected, 2)
+      self.assertLessEqual(
+          abs(limiter.num_inserts * 2.0 - limiter.num_samples), 8 + 4)
+    runner.stop()
+    self.assertEqual(20, runner.num_train_steps)
+    self.assertEqual(80, limiter.num_samples)
+    self.assertEqual(4, len(updates))
+    # The actor stays within one collection of the error buffer.
+    self.assertLessEqual(limiter.num_inserts * 2.0, 80 + 8 + 4)
+
+  def testActorExceptionIsReraised(self):
+
+    def collect_fn():
+      raise ValueError('collect failed')
+
+    runner = actor_learner.ActorLearnerRunner(
+        collect_fn=collect_fn,
+        train_fn=lambda: None,
+        rate_limiter=actor_learner.SamplesPerInsertRateLimiter(1.0),
+        inserts_per_collect=1,
+        samples_per_train=1)
+    runner.start()
+    with self.assertRaisesRegexp(ValueError, 'collect failed'):
+      runner.train_step()
+
+  def testTrainStepBeforeStartRaises(self):
+    runner = actor_learner.ActorLearnerRunner(
+        collect_fn=lambda: None,
+        train_fn=lambda: None,
+        rate_limiter=actor_learner.SamplesPerInsertRateLimiter(1.0),
+        inserts_per_collect=1,
+        samples_per_train=1)
+    with self.assertRaisesRegexp(RuntimeError, 'start'):
+      runner.train_step()
+
+
+if __name__ == '__main__':
+  tf.test.main()
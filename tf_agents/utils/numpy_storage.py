@@ -19,6 +19,9 @@ from __future__ import division
 from __future__ import print_function
 
 import io
+import json
+import os
+
 import numpy as np
 import tensorflow as tf  # pylint: disable=g-explicit-tensorflow-version-import
 
@@ -190,6 +193,10 @@ class NumpyStorage(tf.Module):
                        'array_spec.ArraySpec. Got: {}'.format(data_spec))
     self._data_spec = data_spec
     self._flat_specs = tf.nest.flatten(data_spec)
+    self._init_buffers()
+
+  def _init_buffers(self):
+    """Sets up the (lazily created) buffers backing the storage."""
     self._np_state = NumpyState()
 
     self._buf_names = data_structures.NoDependency([])
@@ -223,3 +230,115 @@ class NumpyStorage(tf.Module):
     """Set table_idx to value."""
     for nest_idx, element in enumerate(tf.nest.flatten(value)):
       self._array(nest_idx)[table_idx] = element
+
+
+class MemmapNumpyStorage(NumpyStorage):
+  """A NumpyStorage whose arrays are memory-mapped `.npy` files.
+
+  Each flattened field of the data_spec is stored in `directory/buffer{i}.npy`.
+  Existing files with the expected shape and dtype are reused, so a storage can
+  be re-created on top of the files of a previous run without loading them in
+  RAM.
+
+  Checkpoints do not contain the data: saving flushes the dirty pages of each
+  array to its file and records a reference to the file (path, shape and
+  dtype), and restoring re-opens the referenced file. Writes made after a
+  checkpoint are therefore visible after restoring it; the checkpoint is not a
+  snapshot of the data.
+  """
+
+  def __init__(self, data_spec, capacity, directory):
+    """Creates a MemmapNumpyStorage object.
+
+    Args:
+      data_spec: An ArraySpec or a list/tuple/nest of ArraySpecs describing a
+        single item that can be stored in this table.
+      capacity: The maximum number of items that can be stored in the buffer.
+      directory: Directory in which the memory-mapped files are created.
+
+    Raises:
+      ValueError: If data_spec is not an instance or nest of ArraySpecs.
+    """
+    self._directory = directory
+    super(MemmapNumpyStorage, self).__init__(data_spec, capacity)
+
+  def _init_buffers(self):
+    if not os.path.isdir(self._directory):
+      os.makedirs(self._directory)
+    self._buffers = [
+        _MemmapWrapper(
+            os.path.join(self._directory, 'buffer{}.npy'.format(idx)),
+            (self._capacity,) + tuple(spec.shape), spec.dtype)
+        for idx, spec in enumerate(self._flat_specs)
+    ]
+
+  def _array(self, index):
+    return self._buffers[index].array
+
+  def flush(self):
+    """Writes the modified pages of all the arrays to disk."""
+    for buf in self._buffers:
+      buf.flush()
+
+
+class _MemmapWrapper(tf.train.experimental.PythonState):
+  """Saves a reference to a memory-mapped array in object-based checkpoints."""
+
+  def __init__(self, path, shape, dtype):
+    """Specify the file backing the array.
+
+    Args:
+      path: Path of the `.npy` file. It is created if it does not exist.
+      shape: Shape of the array.
+      dtype: Dtype of the array.
+    """
+    self._path = path
+    self._shape = tuple(shape)
+    self._dtype = np.dtype(dtype)
+    self._array = None
+
+  @property
+  def array(self):
+    if self._array is None:
+      self._array = self._open(self._path)
+    return self._array
+
+  def flush(self):
+    if self._array is not None:
+      self._array.flush()
+
+  def _open(self, path):
+    """Opens (or creates) the memory-mapped array stored at `path`."""
+    if not os.path.exists(path):
+      return np.lib.format.open_memmap(
+          path, mode='w+', dtype=self._dtype, shape=self._shape)
+    array = np.lib.format.open_memmap(path, mode='r+')
+    if array.shape != self._shape or array.dtype != self._dtype:
+      raise ValueError(
+          'Existing file {} holds an array of shape {} and dtype {}, expected '
+          'shape {} and dtype {}.'.format(path, array.shape, array.dtype,
+                                          self._shape, self._dtype))
+    return array
+
+  def serialize(self):
+    """Callback to flush the array and serialize a reference to its file."""
+    self.flush()
+    return json.dumps({
+        'path': os.path.abspath(self._path),
+        'shape': list(self._shape),
+        'dtype': self._dtype.str,
+    })
+
+  def deserialize(self, string_value):
+    """Callback to re-open the array referenced by a checkpoint."""
+    reference = json.loads(string_value)
+    if (tuple(reference['shape']) != self._shape or
+        np.dtype(reference['dtype']) != self._dtype):
+      raise ValueError(
+          'Checkpointed array reference {} does not match the expected shape '
+          '{} and dtype {}.'.format(reference, self._shape, self._dtype))
+    if self._array is not None and reference['path'] == os.path.abspath(
+        self._path):
+      return
+    self._path = reference['path']
+    self._array = self._open(self._path)
@@ -23,6 +23,7 @@ import os
 import numpy as np
 import tensorflow as tf  # pylint: disable=g-explicit-tensorflow-version-import
 
+from tf_agents.specs import array_spec
 from tf_agents.utils import numpy_storage
 
 from tensorflow.python.framework import test_util  # pylint:disable=g-direct-tensorflow-import  # TF internal
@@ -50,5 +51,55 @@ class NumpyStorageTest(tf.test.TestCase):
     self.assertAllEqual(np.ones([3, 4]), second_checkpoint.numpy_arrays.x)
 
 
+class MemmapNumpyStorageTest(tf.test.TestCase):
+
+  def _data_spec(self):
+    return {
+        'obs': array_spec.ArraySpec((32, 32), np.uint8),
+        'reward': array_spec.ArraySpec((), np.float32),
+    }
+
+  def testSetAndGet(self):
+    directory = os.path.join(self.get_temp_dir(), 'set_get')
+    storage = numpy_storage.MemmapNumpyStorage(
+        self._data_spec(), capacity=5, directory=directory)
+    storage.set([1, 2], {'obs': np.full((2, 32, 32), 7, np.uint8),
+                         'reward': np.array([1., 2.], np.float32)})
+    item = storage.get(np.array([2, 1]))
+    self.assertAllEqual(np.full((2, 32, 32), 7, np.uint8), item['obs'])
+    self.assertAllEqual([2., 1.], item['reward'])
+    self.assertTrue(os.path.exists(os.path.join(directory, 'buffer0.npy')))
+
+    # A new storage on the same directory reuses the existing files.
+    storage.flush()
+    reopened = numpy_storage.MemmapNumpyStorage(
+        self._data_spec(), capacity=5, directory=directory)
+    self.assertAllEqual([0., 1., 2., 0., 0.], reopened.get(np.arange(5))[
+        'reward'])
+
+    with self.assertRaises(ValueError):
+      numpy_storage.MemmapNumpyStorage(
+          self._data_spec(), capacity=6, directory=directory).get(0)
+
+  def testSaveRestore(self):
+    directory = os.path.join(self.get_temp_dir(), 'save_restore')
+    storage = numpy_storage.MemmapNumpyStorage(
+        self._data_spec(), capacity=3, directory=directory)
+    storage.set(0, {'obs': np.ones((32, 32), np.uint8), 'reward': 3.})
+    checkpoint = tf.train.Checkpoint(storage=storage)
+    save_path = checkpoint.save(os.path.join(self.get_temp_dir(), 'ckpt'))
+    # Only a reference to the file is stored in the checkpoint.
+    self.assertLess(
+        sum(os.path.getsize(f) for f in tf.io.gfile.glob(save_path + '*')),
+        32 * 32 * 3)
+
+    restored = numpy_storage.MemmapNumpyStorage(
+        self._data_spec(), capacity=3,
+        directory=os.path.join(self.get_temp_dir(), 'unused'))
+    tf.train.Checkpoint(storage=restored).restore(save_path).assert_consumed()
+    self.assertAllEqual(np.ones((32, 32), np.uint8), restored.get(0)['obs'])
+    self.assertEqual(3., restored.get(0)['reward'])
+
+
 if __name__ == '__main__':
   tf.test.main()
@@ -14,16 +14,79 @@
 # limitations under the License.
 
 """Methods for computing advantages and target values.
+
+The returns and advantages below are discounted cumulative sums computed
+backwards in time, i.e. solutions of the linear recurrence
+`x_t = b_t + a_t * x_{t+1}`. By default they are computed with a sequential
+`tf.scan`, which runs `T` dependent steps. Passing `use_associative_scan=True`
+instead computes them with a parallel prefix scan over the associative
+operator `(a, b) * (a', b') = (a * a', b + a * b')`, which only needs
+`ceil(log2(T))` vectorized steps at the cost of `O(T log(T))` work.
+
+`numpy_discounted_return` and `numpy_generalized_advantage_estimation` compute
+the same values for NumPy arrays, e.g. in Python-side data pipelines.
 """
 
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
 import tensorflow as tf  # pylint: disable=g-explicit-tensorflow-version-import
 
 
+def _reverse_linear_recurrence(coefficients, offsets, final_value):
+  """Solves `x_t = offsets_t + coefficients_t * x_{t+1}` with a parallel scan.
+
+  Args:
+    coefficients: Tensor with shape [T, ...].
+    offsets: Tensor with the same shape as `coefficients`.
+    final_value: Tensor broadcastable to `offsets[0]`, representing `x_T`.
+
+  Returns:
+    A tensor with shape [T, ...] holding `x_0, ..., x_{T-1}`.
+  """
+  num_steps = tf.shape(offsets)[0]
+
+  def _shift(t, shift, fill_value):
+    # Returns t[shift:] padded at the end to the length of t with fill_value.
+    shifted = tf.concat(
+        [t[shift:], tf.fill(tf.shape(t[:shift]), fill_value)], axis=0)
+    shifted.set_shape(t.shape)
+    return shifted
+
+  def _combine(shift, a, b):
+    # After this step a_t and b_t combine the elements [t, t + 2 * shift).
+    b = b + a * _shift(b, shift, tf.constant(0, b.dtype))
+    a = a * _shift(a, shift, tf.constant(1, a.dtype))
+    return shift * 2, a, b
+
+  _, coefficients, offsets = tf.while_loop(
+      cond=lambda shift, *_: shift < num_steps,
+      body=_combine,
+      loop_vars=(tf.constant(1), coefficients, offsets))
+  return offsets + coefficients * final_value
+
+
+def _numpy_reverse_linear_recurrence(coefficients, offsets, final_value):
+  """NumPy version of `_reverse_linear_recurrence`."""
+  coefficients = np.array(coefficients)
+  offsets = np.array(offsets)
+  num_steps = len(offsets)
+  shift = 1
+  while shift < num_steps:
+    offsets[:-shift] += coefficients[:-shift] * offsets[shift:]
+    coefficients[:-shift] *= coefficients[shift:]
+    shift *= 2
+  return offsets + coefficients * final_value
+
+
 def discounted_return(rewards,
                       discounts,
                       final_value=None,
                       time_major=True,
-                      provide_all_returns=True):
+                      provide_all_returns=True,
+                      use_associative_scan=False):
   """Computes discounted return.
 
   ```
@@ -49,6 +112,9 @@ def discounted_return(rewards,
     provide_all_returns: A boolean; if True, this will provide all of the
       returns by time dimension; if False, this will only give the single
       complete discounted return.
+    use_associative_scan: A boolean; if True, the returns are computed with a
+      parallel prefix scan taking O(log(T)) sequential steps instead of a
+      `tf.scan` taking T steps.
 
   Returns:
     If provide_all_returns is True:
@@ -69,7 +135,14 @@ def discounted_return(rewards,
     reward, discount = reward_discount
     return accumulated_discounted_reward * discount + reward
 
-  if provide_all_returns:
+  if use_associative_scan:
+    returns = _reverse_linear_recurrence(discounts, rewards, final_value)
+    if not provide_all_returns:
+      returns = returns[0]
+    elif not time_major:
+      with tf.name_scope("to_batch_major_tensors"):
+        returns = tf.transpose(returns)
+  elif provide_all_returns:
     returns = tf.nest.map_structure(
         tf.stop_gradient,
         tf.scan(
@@ -96,7 +169,8 @@ def generalized_advantage_estimation(values,
                                      discounts,
                                      rewards,
                                      td_lambda=1.0,
-                                     time_major=True):
+                                     time_major=True,
+                                     use_associative_scan=False):
   """Computes generalized advantage estimation (GAE).
 
   For theory, see
@@ -119,6 +193,9 @@ def generalized_advantage_estimation(values,
       in temporal difference.
     time_major: A boolean indicating whether input tensors are time major.
       False means input tensors have shape [B, T].
+    use_associative_scan: A boolean; if True, the advantages are computed with
+      a parallel prefix scan taking O(log(T)) sequential steps instead of a
+      `tf.scan` taking T steps.
 
   Returns:
     A tensor with shape [T, B] representing advantages. Shape is [B, T] when
@@ -142,16 +219,99 @@ def generalized_advantage_estimation(values,
       weighted_discount, td = reversed_weights_td_tuple
       return td + weighted_discount * accumulated_td
 
-    advantages = tf.nest.map_structure(
-        tf.stop_gradient,
-        tf.scan(
-            fn=weighted_cumulative_td_fn,
-            elems=(weighted_discounts, delta),
-            initializer=tf.zeros_like(final_value),
-            reverse=True))
+    if use_associative_scan:
+      advantages = _reverse_linear_recurrence(
+          weighted_discounts, delta, tf.zeros_like(final_value))
+    else:
+      advantages = tf.nest.map_structure(
+          tf.stop_gradient,
+          tf.scan(
+              fn=weighted_cumulative_td_fn,
+              elems=(weighted_discounts, delta),
+              initializer=tf.zeros_like(final_value),
+              reverse=True))
 
   if not time_major:
     with tf.name_scope("to_batch_major_tensors"):
       advantages = tf.transpose(advantages)
 
   return tf.stop_gradient(advantages)
+
+
+def numpy_discounted_return(rewards,
+                            discounts,
+                            final_value=None,
+                            time_major=True,
+                            provide_all_returns=True):
+  """NumPy version of `discounted_return`.
+
+  Args:
+    rewards: `np.array` with shape [T, B] (or [T]) representing rewards.
+    discounts: `np.array` with shape [T, B] (or [T]) representing discounts.
+    final_value: Optional `np.array` with shape [B] (or [1]) representing value
+      estimate at t=T. Zero if not set.
+    time_major: A boolean indicating whether input arrays are time major. False
+      means input arrays have shape [B, T].
+    provide_all_returns: A boolean; if True, this will provide all of the
+      returns by time dimension; if False, this will only give the single
+      complete discounted return.
+
+  Returns:
+    If provide_all_returns is True:
+      An `np.array` with shape [T, B] (or [T]) representing the discounted
+      returns. Shape is [B, T] when time_major is false.
+    If provide_all_returns is False:
+      An `np.array` with shape [B] (or []) representing the discounted returns.
+  """
+  rewards = np.asarray(rewards)
+  discounts = np.asarray(discounts)
+  if not time_major:
+    rewards = rewards.T
+    discounts = discounts.T
+  if final_value is None:
+    final_value = np.zeros_like(rewards[-1])
+
+  returns = _numpy_reverse_linear_recurrence(discounts, rewards, final_value)
+  if not provide_all_returns:
+    return returns[0]
+  return returns if time_major else returns.T
+
+
+def numpy_generalized_advantage_estimation(values,
+                                           final_value,
+                                           discounts,
+                                           rewards,
+                                           td_lambda=1.0,
+                                           time_major=True):
+  """NumPy version of `generalized_advantage_estimation`.
+
+  Args:
+    values: `np.array` with shape [T, B] representing value estimates.
+    final_value: `np.array` with shape [B] representing value estimate at t=T.
+    discounts: `np.array` with shape [T, B] representing discounts received by
+      following the behavior policy.
+    rewards: `np.array` with shape [T, B] representing rewards received by
+      following the behavior policy.
+    td_lambda: A float scalar between [0, 1]. It's used for variance reduction
+      in temporal difference.
+    time_major: A boolean indicating whether input arrays are time major.
+      False means input arrays have shape [B, T].
+
+  Returns:
+    An `np.array` with shape [T, B] representing advantages. Shape is [B, T]
+    when time_major is false.
+  """
+  values = np.asarray(values)
+  final_value = np.asarray(final_value)
+  discounts = np.asarray(discounts)
+  rewards = np.asarray(rewards)
+  if not time_major:
+    values = values.T
+    discounts = discounts.T
+    rewards = rewards.T
+
+  next_values = np.concatenate([values[1:], final_value[None]], axis=0)
+  delta = rewards + discounts * next_values - values
+  advantages = _numpy_reverse_linear_recurrence(
+      discounts * td_lambda, delta, np.zeros_like(final_value))
+  return advantages if time_major else advantages.T
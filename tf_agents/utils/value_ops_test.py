@@ -229,5 +229,106 @@ class GeneralizedAdvantageEstimationTest(tf.test.TestCase,
     self.assertAllClose(advantages, ground_truth)
 
 
+class AssociativeScanTest(tf.test.TestCase, parameterized.TestCase):
+
+  def _random_inputs(self, num_time_steps, batch_size):
+    rewards = np.random.rand(num_time_steps, batch_size).astype(np.float32)
+    # Zero discounts mark episode boundaries.
+    discounts = (np.random.rand(num_time_steps, batch_size) *
+                 (np.random.rand(num_time_steps, batch_size) > 0.1)).astype(
+                     np.float32)
+    values = np.random.rand(num_time_steps, batch_size).astype(np.float32)
+    final_value = np.random.rand(batch_size).astype(np.float32)
+    return rewards, discounts, values, final_value
+
+  @parameterized.named_parameters(
+      ('single_step', 1, 1),
+      ('power_of_two_steps', 8, 3),
+      ('multiple_steps', 13, 5),
+      ('long_rollout', 300, 2),
+  )
+  def testDiscountedReturnMatchesScan(self, num_time_steps, batch_size):
+    rewards, discounts, _, final_value = self._random_inputs(
+        num_time_steps, batch_size)
+    for time_major in (True, False):
+      for provide_all_returns in (True, False):
+        kwargs = dict(
+            rewards=rewards if time_major else rewards.T,
+            discounts=discounts if time_major else discounts.T,
+            final_value=final_value,
+            time_major=time_major,
+            provide_all_returns=provide_all_returns)
+        expected = self.evaluate(value_ops.discounted_return(**kwargs))
+        self.assertAllClose(
+            expected,
+            value_ops.discounted_return(use_associative_scan=True, **kwargs),
+            rtol=1e-4, atol=1e-4)
+        self.assertAllClose(
+            expected, value_ops.numpy_discounted_return(**kwargs),
+            rtol=1e-4, atol=1e-4)
+
+  def testDiscountedReturnWithoutBatchOrFinalValue(self):
+    rewards, discounts, _, _ = self._random_inputs(9, 1)
+    expected = _numpy_discounted_return(rewards[:, 0], discounts[:, 0], None)
+    self.assertAllClose(
+        expected,
+        value_ops.discounted_return(
+            rewards[:, 0], discounts[:, 0], use_associative_scan=True))
+    self.assertAllClose(
+        expected,
+        value_ops.numpy_discounted_return(rewards[:, 0], discounts[:, 0]))
+
+  @parameterized.named_parameters(
+      ('single_step', 1, 1, 0.95),
+      ('multiple_steps', 13, 5, 0.95),
+      ('lambda_0', 13, 5, 0.),
+      ('lambda_1', 13, 5, 1.),
+      ('long_rollout', 300, 2, 0.95),
+  )
+  def testAdvantagesMatchScan(self, num_time_steps, batch_size, td_lambda):
+    rewards, discounts, values, final_value = self._random_inputs(
+        num_time_steps, batch_size)
+    for time_major in (True, False):
+      transpose = (lambda x: x) if time_major else np.transpose
+      kwargs = dict(
+          values=transpose(values),
+          final_value=final_value,
+          discounts=transpose(discounts),
+          rewards=transpose(rewards),
+          td_lambda=td_lambda,
+          time_major=time_major)
+      expected = self.evaluate(
+          value_ops.generalized_advantage_estimation(**kwargs))
+      self.assertAllClose(
+          expected,
+          value_ops.generalized_advantage_estimation(
+              use_associative_scan=True, **kwargs),
+          rtol=1e-4, atol=1e-4)
+      self.assertAllClose(
+          expected,
+          value_ops.numpy_generalized_advantage_estimation(**kwargs),
+          rtol=1e-4, atol=1e-4)
+
+  def testUnknownNumberOfTimeSteps(self):
+    rewards, discounts, values, final_value = self._random_inputs(11, 3)
+
+    @tf.function(input_signature=[tf.TensorSpec([None, 3], tf.float32)] * 3)
+    def compute(rewards, discounts, values):
+      return (value_ops.discounted_return(
+          rewards, discounts, final_value, use_associative_scan=True),
+              value_ops.generalized_advantage_estimation(
+                  values, final_value, discounts, rewards, td_lambda=0.9,
+                  use_associative_scan=True))
+
+    returns, advantages = compute(rewards, discounts, values)
+    self.assertAllClose(
+        returns,
+        _numpy_discounted_return(rewards, discounts, final_value))
+    self.assertAllClose(
+        advantages,
+        _naive_gae_as_ground_truth(discounts, rewards, values, final_value,
+                                   0.9))
+
+
 if __name__ == '__main__':
   tf.test.main()